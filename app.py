@@ -6,6 +6,7 @@ from flask import Flask, render_template_string, jsonify
 import time
 import psutil
 import datetime
+import json
 
 app = Flask(__name__)
 
@@ -328,6 +329,20 @@ def api_status():
         "last_update": datetime.datetime.now().isoformat()
     })
 
+@app.route('/api/perf')
+def api_perf():
+    """API con las métricas de rendimiento que exporta el bot"""
+    perf_path = os.environ.get("PERF_EXPORT_PATH", "perf_stats.json")
+    
+    if not os.path.exists(perf_path):
+        return jsonify({"status": "unavailable", "message": "El bot aún no ha exportado métricas"}), 404
+    
+    try:
+        with open(perf_path, "r") as f:
+            return jsonify(json.load(f))
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 if __name__ == '__main__':
     # Iniciar el hilo de monitoreo del bot
     monitor_thread = threading.Thread(target=check_bot_status, daemon=True)
@@ -0,0 +1,92 @@
+"""Benchmark: retraso del event loop durante una avalancha de mensajes
+
+Cada mensaje simulado hace una consulta a la base de datos. La consulta es falsa: su
+.execute() bloquea durante --latency-ms, igual que una petición HTTP síncrona de supabase-py,
+pero no sale de la máquina. Se comparan dos formas de ejecutarla:
+
+  - blocking:  query.execute() directamente en el event loop (el comportamiento original)
+  - run_query: utils.database.run_query, en el pool de hilos de la base de datos
+
+Para cada una se mide el tiempo total y el retraso del loop con una tarea que intenta
+despertar cada milisegundo (lo que notaría el heartbeat del gateway de Discord).
+
+Uso:
+    python benchmarks/bench_run_query.py [--messages 500] [--latency-ms 20]
+
+utils.database crea el cliente de Supabase al importarse, así que necesita las
+dependencias del bot y las variables URL_SUPABASE/SUPABASE_KEY (no se hace ninguna consulta).
+"""
+import os
+import sys
+import argparse
+import asyncio
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import run_query, get_pool_stats
+
+class FakeQuery:
+    """Consulta simulada: bloquea el hilo que la ejecuta como una petición HTTP"""
+
+    http_method = 'GET'
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def execute(self):
+        time.sleep(self.latency)
+        return {'data': []}
+
+async def measure_lag(stop, samples):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        samples.append(max(loop.time() - start - 0.001, 0.0))
+
+async def flood(mode, messages, latency):
+    async def handle_message():
+        query = FakeQuery(latency)
+        if mode == "blocking":
+            query.execute()
+        else:
+            await run_query(query)
+
+    stop = asyncio.Event()
+    samples = []
+    sampler = asyncio.create_task(measure_lag(stop, samples))
+    await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handle_message() for _ in range(messages)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await sampler
+    samples.sort()
+    return {
+        'elapsed': elapsed,
+        'max_lag': samples[-1] if samples else 0.0,
+        'p95_lag': samples[int(len(samples) * 0.95)] if samples else 0.0,
+        'lag_samples': len(samples)
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    print(f"{args.messages} mensajes, {args.latency_ms:.0f} ms por consulta, {get_pool_stats()['workers']} hilos de base de datos")
+    for mode in ("blocking", "run_query"):
+        result = await flood(mode, args.messages, latency)
+        print(
+            f"{mode:>10}: total {result['elapsed']:.2f} s | "
+            f"retraso del loop p95 {result['p95_lag'] * 1000:.1f} ms, máximo {result['max_lag'] * 1000:.1f} ms "
+            f"({result['lag_samples']} muestras)"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Benchmark: backends de almacenamiento con una colección grande de recordatorios
+
+Genera un config/reminders.json con --reminders recordatorios (100 000 por defecto) en un
+directorio temporal y mide, para cada backend de utils.storage:
+
+  - el arranque: cargar la colección (en SQLite incluye la migración única del JSON);
+  - el coste por cambio: crear --changes recordatorios nuevos, escribiendo cada uno
+    en disco (en JSON cada cambio reescribe el fichero completo al hacer flush);
+  - archivar --archive recordatorios completados.
+
+El backend SQLite necesita aiosqlite; si no está instalado solo se mide el JSON.
+
+Uso:
+    python benchmarks/bench_storage.py [--reminders 100000] [--changes 50] [--archive 1000]
+"""
+import os
+import sys
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.storage as storage
+from utils.config_store import ConfigStore
+
+def make_reminder(rng, now, completed=False):
+    return {
+        "user_id": str(rng.randint(10 ** 17, 10 ** 18)),
+        "channel_id": str(rng.randint(10 ** 17, 10 ** 18)),
+        "content": " ".join(rng.choice(["comprar", "pan", "reunión", "llamar", "revisar", "PR", "mañana"]) for _ in range(6)),
+        "created_time": now - rng.uniform(0, 86400),
+        "due_time": now + rng.uniform(-86400, 30 * 86400),
+        "completed": completed,
+        "public": False
+    }
+
+def use_directory(directory):
+    """Apunta las colecciones y el archivo a un directorio temporal"""
+    storage.ARCHIVE_DIR = os.path.join(directory, "archive")
+    for name, spec in storage.COLLECTIONS.items():
+        spec['file'] = os.path.join(directory, f"{name}.json")
+
+async def run_backend(backend, args):
+    rng = random.Random(args.seed)
+    now = time.time()
+
+    start = time.perf_counter()
+    if backend.name == "sqlite":
+        await backend.open()
+    reminders = await backend.load("reminders")
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.changes):
+        await backend.put("reminders", f"new-{i}", make_reminder(rng, now))
+        if backend.name == "json":
+            await backend.config_store.flush()
+    change_time = (time.perf_counter() - start) / args.changes
+
+    keys = list(reminders)[:args.archive]
+    start = time.perf_counter()
+    await backend.archive("reminders", keys)
+    if backend.name == "json":
+        await backend.config_store.flush()
+    archive_time = time.perf_counter() - start
+
+    await backend.close()
+    print(
+        f"{backend.name:>6}: arranque {load_time * 1000:.0f} ms ({len(reminders)} recordatorios) | "
+        f"{change_time * 1000:.1f} ms por cambio | archivar {len(keys)}: {archive_time * 1000:.0f} ms"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=50)
+    parser.add_argument("--archive", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    reminders = {str(i): make_reminder(rng, now, completed=i < args.archive) for i in range(args.reminders)}
+    payload = json.dumps(reminders, indent=4)
+    print(f"{args.reminders} recordatorios ({len(payload) / 1e6:.1f} MB de JSON)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_directory(directory)
+        with open(storage.COLLECTIONS['reminders']['file'], 'w') as f:
+            f.write(payload)
+
+        config_store = ConfigStore(flush_delay=3600)
+        await run_backend(storage.JsonStorage(config_store), args)
+        await config_store.close()
+
+        # El backend JSON ha reescrito el fichero: se restaura para que SQLite migre lo mismo
+        with open(storage.COLLECTIONS['reminders']['file'], 'w') as f:
+            f.write(payload)
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError:
+            print("sqlite: aiosqlite no está instalado, se omite")
+            return
+        await run_backend(storage.SQLiteStorage(os.path.join(directory, "zenshell.db")), args)
+
+if __name__ == "__main__":
+    asyncio.run(main())
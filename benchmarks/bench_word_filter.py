@@ -0,0 +1,79 @@
+"""Benchmark: BannedWordMatcher frente al bucle original de AutoMod
+
+Genera una lista de palabras prohibidas aleatorias (10 000 por defecto) y mensajes
+de chat aleatorios, y mide:
+
+  - el tiempo de construir el matcher (se paga solo cuando cambia la lista);
+  - el tiempo por mensaje del matcher, con y sin whole_word;
+  - el tiempo por mensaje del bucle original:
+        for word in banned_words: if word.lower() in content_lower
+
+Uso:
+    python benchmarks/bench_word_filter.py [--words 10000] [--messages 2000]
+"""
+import os
+import sys
+import argparse
+import random
+import string
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.word_filter import BannedWordMatcher
+
+def random_word(rng, min_length=4, max_length=10):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_length, max_length)))
+
+def random_message(rng, length=120):
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(random_word(rng, 2, 9))
+    return " ".join(words)
+
+def naive_search(banned_words, content):
+    content_lower = content.lower()
+    for word in banned_words:
+        if word.lower() in content_lower:
+            return word
+    return None
+
+def per_message(search, messages):
+    start = time.perf_counter()
+    hits = sum(1 for message in messages if search(message))
+    return (time.perf_counter() - start) / len(messages), hits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    banned_words = list({random_word(rng, 5, 10) for _ in range(args.words)})
+    # Algunos comodines, como los que se añaden con !automod addword
+    banned_words += [random_word(rng, 3, 4) + "*" + random_word(rng, 3, 4) for _ in range(args.words // 100)]
+    messages = [random_message(rng) for _ in range(args.messages)]
+    # Un 5% de los mensajes contiene una palabra prohibida con leetspeak
+    for i in range(0, len(messages), 20):
+        messages[i] += " " + rng.choice(banned_words).replace("*", "").replace("e", "3").replace("o", "0")
+
+    print(f"{len(banned_words)} palabras prohibidas, {len(messages)} mensajes de ~120 caracteres")
+
+    for whole_word in (False, True):
+        start = time.perf_counter()
+        matcher = BannedWordMatcher(banned_words, whole_word=whole_word)
+        build_time = time.perf_counter() - start
+        lookup, hits = per_message(matcher.search, messages)
+        print(
+            f"matcher (whole_word={whole_word!s:>5}): construcción {build_time * 1000:.0f} ms | "
+            f"{lookup * 1e6:.1f} µs/mensaje | {hits} coincidencias"
+        )
+
+    naive_messages = messages[:max(len(messages) // 10, 1)]
+    lookup, hits = per_message(lambda message: naive_search(banned_words, message), naive_messages)
+    print(f"bucle original: {lookup * 1e6:.1f} µs/mensaje | {hits} coincidencias en {len(naive_messages)} mensajes (sin normalización)")
+
+if __name__ == "__main__":
+    main()
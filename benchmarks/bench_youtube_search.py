@@ -0,0 +1,144 @@
+"""Benchmark: latencia de la búsqueda en YouTube contra una página de resultados local
+
+Genera una página HTML parecida a la de youtube.com/results (~1 MB, con los enlaces
+/watch?v= de los resultados repartidos por el JSON inicial) y la sirve desde un servidor
+HTTP local en otro hilo, limitando el ancho de banda a --kbps. Se comparan:
+
+  - urllib:  el código original, urlopen + leer la página entera + re.findall, en el loop
+  - aiohttp: utils.youtube_search.YouTubeSearch, que lee por bloques y corta al tener 5 IDs
+
+Para cada una se mide la latencia por búsqueda (media y p95) y el retraso máximo del
+event loop mientras se hacen las búsquedas.
+
+Uso:
+    python benchmarks/bench_youtube_search.py [--searches 20] [--kbps 8000] [--page-kb 1024]
+"""
+import os
+import sys
+import argparse
+import asyncio
+import random
+import re
+import string
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.youtube_search as youtube_search
+from utils.youtube_search import YouTubeSearch, YOUTUBE_SEARCH_CHUNK_SIZE
+
+ID_ALPHABET = string.ascii_letters + string.digits + "_-"
+
+def make_page(rng, size, results=20):
+    """Página con la cabecera de la web, luego los resultados y luego el resto de la página"""
+    def filler(length):
+        return "".join(rng.choice(string.ascii_letters + ' ":{},') for _ in range(length))
+
+    header = f"<html><head><script>{filler(size // 5)}</script></head><body><script>var ytInitialData = "
+    entries = []
+    for _ in range(results):
+        video_id = "".join(rng.choice(ID_ALPHABET) for _ in range(11))
+        # Cada resultado enlaza a su vídeo varias veces (miniatura, título, canal)
+        link = f'{{"url":"/watch?v={video_id}","webPageType":"WEB_PAGE_TYPE_WATCH"}}'
+        entries.append(link + filler(size // (results * 4)) + link)
+    body = ",".join(entries)
+    footer = filler(max(size - len(header) - len(body), 0)) + ";</script></body></html>"
+    return (header + body + footer).encode()
+
+def start_server(page, kbps):
+    """Servidor HTTP local que envía la página por bloques al ancho de banda indicado"""
+    chunk_delay = YOUTUBE_SEARCH_CHUNK_SIZE / (kbps * 1000 / 8)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            try:
+                for offset in range(0, len(page), YOUTUBE_SEARCH_CHUNK_SIZE):
+                    time.sleep(chunk_delay)
+                    self.wfile.write(page[offset:offset + YOUTUBE_SEARCH_CHUNK_SIZE])
+            except (BrokenPipeError, ConnectionResetError):
+                # El cliente cortó la conexión al tener suficientes resultados
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def urllib_search(results_url, query):
+    """La búsqueda original del cog de música"""
+    content = urllib.request.urlopen(results_url + urllib.parse.urlencode({'search_query': query}))
+    return re.findall(r'/watch\?v=(.{11})', content.read().decode())[:5]
+
+async def measure_lag(stop, samples):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        samples.append(max(loop.time() - start - 0.001, 0.0))
+
+async def run(mode, results_url, searches):
+    youtube = YouTubeSearch()
+    latencies = []
+    stop = asyncio.Event()
+    lag = []
+    sampler = asyncio.create_task(measure_lag(stop, lag))
+    await asyncio.sleep(0.01)
+
+    for i in range(searches):
+        query = f"canción {i}"
+        start = time.perf_counter()
+        if mode == "urllib":
+            ids = urllib_search(results_url, query)
+        else:
+            ids = await youtube.search(query)
+        latencies.append(time.perf_counter() - start)
+        assert len(ids) == 5, ids
+        # Deja despertar a la tarea que mide el retraso entre búsqueda y búsqueda
+        await asyncio.sleep(0.005)
+
+    stop.set()
+    await sampler
+    await youtube.close()
+    latencies.sort()
+    return {
+        'avg': sum(latencies) / len(latencies),
+        'p95': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        'max_lag': max(lag) if lag else 0.0
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=20)
+    parser.add_argument("--kbps", type=float, default=8000, help="ancho de banda simulado en kbit/s")
+    parser.add_argument("--page-kb", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    page = make_page(random.Random(args.seed), args.page_kb * 1024)
+    server = start_server(page, args.kbps)
+    results_url = f"http://127.0.0.1:{server.server_address[1]}/results?"
+    youtube_search.YOUTUBE_RESULTS_URL = results_url
+    print(f"Página de {len(page) / 1024:.0f} KiB servida a {args.kbps:.0f} kbit/s, {args.searches} búsquedas")
+
+    try:
+        for mode in ("urllib", "aiohttp"):
+            result = await run(mode, results_url, args.searches)
+            print(
+                f"{mode:>7}: latencia media {result['avg'] * 1000:.0f} ms, p95 {result['p95'] * 1000:.0f} ms | "
+                f"retraso máximo del loop {result['max_lag'] * 1000:.0f} ms"
+            )
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,7 @@
 import discord
 from discord.ext import commands
-import json
-import os
 import random
-from utils.database import get_user, create_user
+from utils.database import ensure_user
 
 class Greetings(commands.Cog):
     def __init__(self, bot):
@@ -13,23 +11,11 @@ class Greetings(commands.Cog):
     
     def load_config(self):
         """Load greetings configuration from file"""
-        config_path = 'config/greetings.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.greetings_config = json.load(f)
-            except Exception as e:
-                print(f"Error loading greetings config: {e}")
+        self.greetings_config = self.bot.config_store.load('config/greetings.json', self.greetings_config)
     
     def save_config(self):
         """Save greetings configuration to file"""
-        config_path = 'config/greetings.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.greetings_config, f, indent=4)
-        except Exception as e:
-            print(f"Error saving greetings config: {e}")
+        self.bot.config_store.save('config/greetings.json', self.greetings_config)
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -39,12 +25,8 @@ class Greetings(commands.Cog):
         if guild_id not in self.greetings_config:
             return
         
-        # Create user in database
-        await create_user(
-            member.id,
-            member.name,
-            member.discriminator
-        )
+        # Create user in database (no-op if they already exist)
+        await ensure_user(member.id, member.name, member.discriminator)
         
         # Check if welcome messages are enabled
         if not self.greetings_config[guild_id].get("welcome_enabled", False):
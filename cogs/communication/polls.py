@@ -2,8 +2,6 @@ import discord
 from discord.ext import commands
 import asyncio
 import datetime
-import json
-import os
 
 class PollView(discord.ui.View):
     def __init__(self, options, timeout=None):
@@ -55,27 +53,10 @@ class Polls(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.active_polls = {}
-        self.load_polls()
     
-    def load_polls(self):
-        """Load active polls from file"""
-        config_path = 'config/polls.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.active_polls = json.load(f)
-            except Exception as e:
-                print(f"Error loading polls: {e}")
-    
-    def save_polls(self):
-        """Save active polls to file"""
-        config_path = 'config/polls.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.active_polls, f, indent=4)
-        except Exception as e:
-            print(f"Error saving polls: {e}")
+    async def cog_load(self):
+        """Load active polls from storage"""
+        self.active_polls = await self.bot.storage.load("polls")
     
     @commands.group(invoke_without_command=True)
     async def poll(self, ctx):
@@ -118,7 +99,7 @@ class Polls(commands.Cog):
             "created_at": datetime.datetime.now().timestamp()
         }
         
-        self.save_polls()
+        await self.bot.storage.put("polls", poll_id, self.active_polls[poll_id])
     
     @poll.command()
     async def quickpoll(self, ctx, *, question: str):
@@ -152,7 +133,7 @@ class Polls(commands.Cog):
             "created_at": datetime.datetime.now().timestamp()
         }
         
-        self.save_polls()
+        await self.bot.storage.put("polls", poll_id, self.active_polls[poll_id])
     
     @poll.command()
     async def end(self, ctx, message_id: str):
@@ -235,9 +216,12 @@ class Polls(commands.Cog):
             # Update the original message
             await message.edit(embed=results_embed, view=None)
             
-            # Remove from active polls
+            # Move from active polls to the archive, together with the final results
+            poll_data["results"] = votes
+            poll_data["ended_at"] = datetime.datetime.now().timestamp()
+            await self.bot.storage.put("polls", message_id, poll_data)
             del self.active_polls[message_id]
-            self.save_polls()
+            await self.bot.storage.archive("polls", [message_id])
             
             await ctx.send("Poll ended and results displayed.")
             
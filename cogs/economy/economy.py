@@ -3,9 +3,8 @@ from discord.ext import commands
 import random
 import asyncio
 import datetime
-import json
-import os
-from utils.database import get_user, create_user, get_user_balance, update_user_balance
+from utils.database import run_query, ensure_user, get_user_balance, increment_user_balance, transfer_balance
+from utils.message_pipeline import STAGE_COMMANDS
 
 class Economy(commands.Cog):
     def __init__(self, bot):
@@ -14,39 +13,20 @@ class Economy(commands.Cog):
         self.work_cooldown = commands.CooldownMapping.from_cooldown(1, 3600, commands.BucketType.user)  # 1 hour
         self.streak_data = {}
         self.shop_items = {}
-        self.load_streak_data()
         self.load_shop_items()
+        self.bot.message_pipeline.add_stage("custom_commands", self.run_custom_command, STAGE_COMMANDS, cog=self.qualified_name)
     
-    def load_streak_data(self):
-        """Load streak data from file"""
-        config_path = 'config/streaks.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.streak_data = json.load(f)
-            except Exception as e:
-                print(f"Error loading streak data: {e}")
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage("custom_commands")
     
-    def save_streak_data(self):
-        """Save streak data to file"""
-        config_path = 'config/streaks.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.streak_data, f, indent=4)
-        except Exception as e:
-            print(f"Error saving streak data: {e}")
+    async def cog_load(self):
+        """Load streak data from storage"""
+        self.streak_data = await self.bot.storage.load("streaks")
     
     def load_shop_items(self):
         """Load shop items from file"""
-        config_path = 'config/shop.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.shop_items = json.load(f)
-            except Exception as e:
-                print(f"Error loading shop items: {e}")
-        else:
+        self.shop_items = self.bot.config_store.load('config/shop.json')
+        if self.shop_items is None:
             # Create default shop items
             self.shop_items = {
                 "roles": {},
@@ -69,28 +49,15 @@ class Economy(commands.Cog):
     
     def save_shop_items(self):
         """Save shop items to file"""
-        config_path = 'config/shop.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.shop_items, f, indent=4)
-        except Exception as e:
-            print(f"Error saving shop items: {e}")
+        self.bot.config_store.save('config/shop.json', self.shop_items)
     
     @commands.command(aliases=["bal"])
     async def balance(self, ctx, member: discord.Member = None):
         """Check your or someone else's balance"""
         member = member or ctx.author
         
-        # Get user data
-        user = await get_user(member.id)
-        if not user:
-            # Create user if they don't exist
-            await create_user(
-                member.id,
-                member.name,
-                member.discriminator
-            )
+        # Make sure the user exists
+        await ensure_user(member.id, member.name, member.discriminator)
         
         # Get balance
         balance = await get_user_balance(member.id)
@@ -127,15 +94,8 @@ class Economy(commands.Cog):
             
             return await ctx.send(f"You've already claimed your daily reward. Try again in {time_str}.")
         
-        # Get user data
-        user = await get_user(ctx.author.id)
-        if not user:
-            # Create user if they don't exist
-            await create_user(
-                ctx.author.id,
-                ctx.author.name,
-                ctx.author.discriminator
-            )
+        # Make sure the user exists
+        await ensure_user(ctx.author.id, ctx.author.name, ctx.author.discriminator)
         
         # Check streak
         user_id = str(ctx.author.id)
@@ -159,7 +119,7 @@ class Economy(commands.Cog):
             
             self.streak_data[user_id]["last_claim"] = current_time
         
-        self.save_streak_data()
+        await self.bot.storage.put("streaks", user_id, self.streak_data[user_id])
         
         # Calculate reward
         streak = self.streak_data[user_id]["streak"]
@@ -167,8 +127,15 @@ class Economy(commands.Cog):
         streak_bonus = min(streak * 10, 200)  # Cap streak bonus at 200
         total_reward = base_reward + streak_bonus
         
-        # Update balance
-        await update_user_balance(ctx.author.id, total_reward)
+        # Streak milestone bonuses
+        milestone_bonus = 0
+        if streak == 7:
+            milestone_bonus = 500
+        elif streak == 30:
+            milestone_bonus = 2000
+        
+        # Update balance (reward and milestone bonus in a single update)
+        await increment_user_balance(ctx.author.id, total_reward + milestone_bonus)
         
         # Create embed
         embed = discord.Embed(
@@ -181,14 +148,8 @@ class Economy(commands.Cog):
         embed.add_field(name="Current Streak", value=f"🔥 {streak} day{'s' if streak != 1 else ''}", inline=False)
         
         # Add streak milestone bonuses
-        if streak == 7:
-            bonus = 500
-            await update_user_balance(ctx.author.id, bonus)
-            embed.add_field(name="7-Day Streak Bonus!", value=f"🎉 +{bonus} coins", inline=False)
-        elif streak == 30:
-            bonus = 2000
-            await update_user_balance(ctx.author.id, bonus)
-            embed.add_field(name="30-Day Streak Bonus!", value=f"🎉 +{bonus} coins", inline=False)
+        if milestone_bonus:
+            embed.add_field(name=f"{streak}-Day Streak Bonus!", value=f"🎉 +{milestone_bonus} coins", inline=False)
         
         await ctx.send(embed=embed)
     
@@ -211,15 +172,8 @@ class Economy(commands.Cog):
             
             return await ctx.send(f"You're still on break. You can work again in {time_str}.")
         
-        # Get user data
-        user = await get_user(ctx.author.id)
-        if not user:
-            # Create user if they don't exist
-            await create_user(
-                ctx.author.id,
-                ctx.author.name,
-                ctx.author.discriminator
-            )
+        # Make sure the user exists
+        await ensure_user(ctx.author.id, ctx.author.name, ctx.author.discriminator)
         
         # List of possible jobs
         jobs = [
@@ -242,7 +196,7 @@ class Economy(commands.Cog):
         earnings = random.randint(job["min"], job["max"])
         
         # Update balance
-        await update_user_balance(ctx.author.id, earnings)
+        await increment_user_balance(ctx.author.id, earnings)
         
         # Create embed
         embed = discord.Embed(
@@ -259,9 +213,9 @@ class Economy(commands.Cog):
         if amount <= 0:
             return await ctx.send("Amount must be positive.")
         
-        # Get current balance
-        balance = await get_user_balance(ctx.author.id)
-        if not balance or balance < amount:
+        # Take the bet atomically first; fails if the user can't cover it
+        new_balance = await increment_user_balance(ctx.author.id, -amount, required=amount)
+        if new_balance is None:
             return await ctx.send("You don't have enough coins.")
         
         # Roll the dice (1-100)
@@ -275,28 +229,34 @@ class Economy(commands.Cog):
         # Determine outcome
         if roll <= 40:  # 40% chance to lose everything
             # Lose the bet
-            await update_user_balance(ctx.author.id, -amount)
+            winnings = 0
             embed.description = f"You rolled **{roll}** and lost **{amount}** coins!"
             embed.color = discord.Color.red()
         elif roll <= 60:  # 20% chance to break even
             # Break even
+            winnings = amount
             embed.description = f"You rolled **{roll}** and broke even. Your bet has been returned."
             embed.color = discord.Color.blue()
         elif roll <= 90:  # 30% chance to win 1.5x
             # Win 1.5x
             winnings = int(amount * 1.5)
-            await update_user_balance(ctx.author.id, winnings - amount)
             embed.description = f"You rolled **{roll}** and won **{winnings}** coins! (1.5x your bet)"
             embed.color = discord.Color.green()
         else:  # 10% chance to win 2x
             # Win 2x
             winnings = amount * 2
-            await update_user_balance(ctx.author.id, winnings - amount)
             embed.description = f"You rolled **{roll}** and won **{winnings}** coins! (2x your bet)"
             embed.color = discord.Color.green()
         
+        # Pay out the winnings (the bet was already taken)
+        if winnings:
+            paid_balance = await increment_user_balance(ctx.author.id, winnings)
+            if paid_balance is None:
+                print(f"Error paying out {winnings} gamble winnings to {ctx.author.id}")
+                return await ctx.send("Something went wrong paying out your winnings. Please contact an administrator.")
+            new_balance = paid_balance
+        
         # Show new balance
-        new_balance = await get_user_balance(ctx.author.id)
         embed.add_field(name="New Balance", value=f"💰 {new_balance} coins")
         
         await ctx.send(embed=embed)
@@ -310,18 +270,15 @@ class Economy(commands.Cog):
         if amount <= 0:
             return await ctx.send("You must give a positive amount of coins.")
         
-        # Get user balance
-        balance = await get_user_balance(ctx.author.id)
+        # Move the coins in a single transaction
+        try:
+            result = await transfer_balance(ctx.author.id, member.id, amount)
+        except ValueError as e:
+            return await ctx.send(f"❌ {e}.")
         
-        if amount > balance:
+        if result is None:
             return await ctx.send("You don't have enough coins to give that amount.")
         
-        # Deduct from sender
-        await update_user_balance(ctx.author.id, -amount)
-        
-        # Add to receiver
-        await update_user_balance(member.id, amount)
-        
         # Create embed
         embed = discord.Embed(
             title="Coins Transferred",
@@ -470,12 +427,6 @@ class Economy(commands.Cog):
             price = item["price"]
             role_id = item["role_id"]
             
-            # Check if user has enough coins
-            balance = await get_user_balance(ctx.author.id)
-            
-            if balance < price:
-                return await ctx.send(f"You don't have enough coins. You need {price} coins, but you only have {balance}.")
-            
             # Get the role
             role = ctx.guild.get_role(int(role_id))
             if not role:
@@ -485,8 +436,11 @@ class Economy(commands.Cog):
             if role in ctx.author.roles:
                 return await ctx.send(f"You already have the {role.name} role.")
             
-            # Deduct coins
-            await update_user_balance(ctx.author.id, -price)
+            # Deduct coins (fails if the user doesn't have enough)
+            new_balance = await increment_user_balance(ctx.author.id, -price)
+            
+            if new_balance is None:
+                return await ctx.send(f"You don't have enough coins. You need {price} coins.")
             
             # Add role
             try:
@@ -494,7 +448,7 @@ class Economy(commands.Cog):
                 await ctx.send(f"You purchased the {role.mention} role for {price} coins!")
             except Exception as e:
                 # Refund if role couldn't be added
-                await update_user_balance(ctx.author.id, price)
+                await increment_user_balance(ctx.author.id, price)
                 await ctx.send(f"Error adding role: {e}")
         
         # Check if it's an item
@@ -503,14 +457,11 @@ class Economy(commands.Cog):
             item = self.shop_items["items"][item_id]
             price = item["price"]
             
-            # Check if user has enough coins
-            balance = await get_user_balance(ctx.author.id)
-            
-            if balance < price:
-                return await ctx.send(f"You don't have enough coins. You need {price} coins, but you only have {balance}.")
+            # Deduct coins (fails if the user doesn't have enough)
+            new_balance = await increment_user_balance(ctx.author.id, -price)
             
-            # Deduct coins
-            await update_user_balance(ctx.author.id, -price)
+            if new_balance is None:
+                return await ctx.send(f"You don't have enough coins. You need {price} coins.")
             
             # Handle item purchase
             await ctx.send(f"You purchased {item['name']} for {price} coins!")
@@ -610,7 +561,7 @@ class Economy(commands.Cog):
         try:
             # Intentar obtener comandos de la base de datos
             try:
-                response = self.bot.supabase.table('custom_commands').select('*').execute()
+                response = await run_query(self.bot.supabase.table('custom_commands').select('*'))
                 
                 commands = {}
                 for command in response.data:
@@ -659,7 +610,7 @@ class Economy(commands.Cog):
                     'response': response
                 }
                 
-                self.bot.supabase.table('custom_commands').insert(command_data).execute()
+                await run_query(self.bot.supabase.table('custom_commands').insert(command_data))
                 return True
             except Exception as db_error:
                 # Si hay error con la base de datos, usar archivo JSON local
@@ -695,7 +646,7 @@ class Economy(commands.Cog):
         try:
             # Intentar editar en la base de datos
             try:
-                self.bot.supabase.table('custom_commands').update({'response': response}).eq('name', name).execute()
+                await run_query(self.bot.supabase.table('custom_commands').update({'response': response}).eq('name', name))
                 return True
             except Exception as db_error:
                 # Si hay error con la base de datos, usar archivo JSON local
@@ -730,7 +681,7 @@ class Economy(commands.Cog):
         try:
             # Intentar eliminar de la base de datos
             try:
-                self.bot.supabase.table('custom_commands').delete().eq('name', name).execute()
+                await run_query(self.bot.supabase.table('custom_commands').delete().eq('name', name))
                 return True
             except Exception as db_error:
                 # Si hay error con la base de datos, usar archivo JSON local
@@ -760,23 +711,19 @@ class Economy(commands.Cog):
             print(f"Error deleting custom command: {e}")
             return False
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Listen for custom commands"""
-        if message.author.bot:
-            return
-        
-        if not message.content.startswith('!'):
+    async def run_custom_command(self, ctx):
+        """Answer custom commands (message pipeline stage)"""
+        if not ctx.is_command:
             return
         
         # Extract command name
-        command_name = message.content[1:].split(' ')[0].lower()
+        command_name = ctx.content_lower[1:].split(' ')[0]
         
         # Check if it's a custom command
         custom_commands = await self.get_custom_commands()
         
         if command_name in custom_commands:
-            await message.channel.send(custom_commands[command_name]["response"])
+            await ctx.channel.send(custom_commands[command_name]["response"])
     
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -786,7 +733,7 @@ class Economy(commands.Cog):
             return await ctx.send("Amount must be positive.")
         
         # Update balance
-        await update_user_balance(member.id, amount)
+        await increment_user_balance(member.id, amount)
         
         await ctx.send(f"Added {amount} coins to {member.mention}.")
     
@@ -797,14 +744,14 @@ class Economy(commands.Cog):
         if amount <= 0:
             return await ctx.send("Amount must be positive.")
         
-        # Get current balance
-        balance = await get_user_balance(member.id)
-        
-        # Make sure we don't go negative
-        amount = min(amount, balance)
-        
         # Update balance
-        await update_user_balance(member.id, -amount)
+        new_balance = await increment_user_balance(member.id, -amount)
+        
+        if new_balance is None:
+            # Not enough coins: make sure we don't go negative and remove what they have
+            balance = await get_user_balance(member.id)
+            amount = balance
+            await increment_user_balance(member.id, -amount)
         
         await ctx.send(f"Removed {amount} coins from {member.mention}.")
     
@@ -813,7 +760,7 @@ class Economy(commands.Cog):
         """Show the server's economy leaderboard"""
         try:
             # Get all users from the database
-            response = self.bot.supabase.table('economy').select('*').order('balance', desc=True).execute()
+            response = await run_query(self.bot.supabase.table('economy').select('*').order('balance', desc=True))
             
             if not response.data:
                 return await ctx.send("No users found in the economy leaderboard.")
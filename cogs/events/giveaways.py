@@ -1,62 +1,75 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import datetime
-import json
-import os
 import random
+from utils.storage import GIVEAWAY_REROLL_WINDOW
 
 class Giveaways(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.giveaways = {}
-        self.load_giveaways()
-        self.check_giveaways.start()
+    
+    async def cog_load(self):
+        """Load giveaways from storage, schedule the running ones and archive the old ended ones"""
+        self.giveaways = await self.bot.storage.load("giveaways")
+        
+        expired = []
+        current_time = datetime.datetime.now().timestamp()
+        for giveaway_id, giveaway in self.giveaways.items():
+            if not giveaway.get("ended", False):
+                self.schedule_giveaway(giveaway_id)
+            elif giveaway.get("ended_at", giveaway["end_time"]) + GIVEAWAY_REROLL_WINDOW <= current_time:
+                expired.append(giveaway_id)
+            else:
+                self.schedule_archive(giveaway_id)
+        
+        if expired:
+            await self.archive_giveaways(expired)
     
     def cog_unload(self):
-        self.check_giveaways.cancel()
+        self.bot.scheduler.cancel_namespace("giveaways")
+        self.bot.scheduler.cancel_namespace("giveaways.archive")
     
-    def load_giveaways(self):
-        """Load giveaways from file"""
-        config_path = 'config/giveaways.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.giveaways = json.load(f)
-            except Exception as e:
-                print(f"Error loading giveaways: {e}")
+    async def save_giveaway(self, giveaway_id):
+        """Save a single giveaway"""
+        await self.bot.storage.put("giveaways", giveaway_id, self.giveaways[giveaway_id])
     
-    def save_giveaways(self):
-        """Save giveaways to file"""
-        config_path = 'config/giveaways.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.giveaways, f, indent=4)
-        except Exception as e:
-            print(f"Error saving giveaways: {e}")
+    def schedule_giveaway(self, giveaway_id):
+        """Schedule a giveaway to end at its end time"""
+        end_time = self.giveaways[giveaway_id]["end_time"]
+        self.bot.scheduler.schedule(("giveaways", giveaway_id), end_time, self.finish_giveaway, giveaway_id)
     
-    @tasks.loop(seconds=30)
-    async def check_giveaways(self):
-        """Check for ended giveaways"""
-        current_time = datetime.datetime.now().timestamp()
-        ended_giveaways = []
-        
-        for giveaway_id, giveaway in self.giveaways.items():
-            if giveaway["end_time"] <= current_time and not giveaway.get("ended", False):
-                # Mark as ended
-                self.giveaways[giveaway_id]["ended"] = True
-                ended_giveaways.append(giveaway_id)
+    async def finish_giveaway(self, giveaway_id):
+        """Mark a giveaway as ended and pick the winners (scheduler callback)"""
+        await self.bot.wait_until_ready()
         
-        self.save_giveaways()
+        giveaway = self.giveaways.get(giveaway_id)
+        if giveaway is None or giveaway.get("ended", False):
+            return
         
-        # Process ended giveaways
-        for giveaway_id in ended_giveaways:
-            await self.end_giveaway(giveaway_id)
+        await self.mark_ended(giveaway_id)
+        await self.end_giveaway(giveaway_id)
     
-    @check_giveaways.before_loop
-    async def before_check_giveaways(self):
-        await self.bot.wait_until_ready()
+    async def mark_ended(self, giveaway_id):
+        """Mark a giveaway as ended; it stays available for rerolls during the reroll window"""
+        giveaway = self.giveaways[giveaway_id]
+        giveaway["ended"] = True
+        giveaway["ended_at"] = datetime.datetime.now().timestamp()
+        await self.save_giveaway(giveaway_id)
+        self.schedule_archive(giveaway_id)
+    
+    def schedule_archive(self, giveaway_id):
+        """Move an ended giveaway to the archive once the reroll window is over"""
+        giveaway = self.giveaways[giveaway_id]
+        archive_time = giveaway.get("ended_at", giveaway["end_time"]) + GIVEAWAY_REROLL_WINDOW
+        self.bot.scheduler.schedule(("giveaways.archive", giveaway_id), archive_time, self.archive_giveaways, [giveaway_id])
+    
+    async def archive_giveaways(self, giveaway_ids):
+        """Remove ended giveaways from the working set and append them to the archive"""
+        for giveaway_id in giveaway_ids:
+            self.giveaways.pop(giveaway_id, None)
+        await self.bot.storage.archive("giveaways", giveaway_ids)
     
     async def end_giveaway(self, giveaway_id):
         """End a giveaway and select winner(s)"""
@@ -186,7 +199,8 @@ class Giveaways(commands.Cog):
             "ended": False
         }
         
-        self.save_giveaways()
+        await self.save_giveaway(giveaway_id)
+        self.schedule_giveaway(giveaway_id)
         
         await ctx.send(f"Giveaway started! ID: {giveaway_id}", delete_after=5)
     
@@ -201,8 +215,8 @@ class Giveaways(commands.Cog):
             return await ctx.send("This giveaway has already ended.")
         
         # Mark as ended
-        self.giveaways[giveaway_id]["ended"] = True
-        self.save_giveaways()
+        self.bot.scheduler.cancel(("giveaways", giveaway_id))
+        await self.mark_ended(giveaway_id)
         
         # End the giveaway
         await self.end_giveaway(giveaway_id)
@@ -213,6 +227,8 @@ class Giveaways(commands.Cog):
     async def reroll(self, ctx, giveaway_id: str):
         """Reroll a giveaway winner"""
         if giveaway_id not in self.giveaways:
+            if await self.bot.storage.get_archived("giveaways", giveaway_id):
+                return await ctx.send("This giveaway ended too long ago and can no longer be rerolled.")
             return await ctx.send("Giveaway not found.")
         
         if not self.giveaways[giveaway_id].get("ended", False):
@@ -309,7 +325,8 @@ class Giveaways(commands.Cog):
         
         # Remove from giveaways
         del self.giveaways[giveaway_id]
-        self.save_giveaways()
+        self.bot.scheduler.cancel(("giveaways", giveaway_id))
+        await self.bot.storage.delete("giveaways", giveaway_id)
         
         await ctx.send("Giveaway cancelled.")
 
@@ -5,8 +5,8 @@ import asyncio
 import datetime
 from PIL import Image, ImageDraw, ImageFont
 import io
-import os
-from utils.database import get_user, create_user, update_user_xp, add_achievement
+from utils.database import run_query, get_user, update_user_xp
+from utils.message_pipeline import STAGE_ACCOUNTING
 
 class Leveling(commands.Cog):
     def __init__(self, bot):
@@ -14,34 +14,25 @@ class Leveling(commands.Cog):
         self.xp_cooldown = commands.CooldownMapping.from_cooldown(1, 60, commands.BucketType.user)
         self.level_roles = {}
         self.load_level_roles()
+        self.bot.message_pipeline.add_stage("leveling", self.award_xp, STAGE_ACCOUNTING, cog=self.qualified_name)
+    
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage("leveling")
     
     def load_level_roles(self):
         """Load level roles from config file"""
-        config_path = 'config/level_roles.json'
-        if os.path.exists(config_path):
-            try:
-                import json
-                with open(config_path, 'r') as f:
-                    self.level_roles = json.load(f)
-            except Exception as e:
-                print(f"Error loading level roles config: {e}")
+        self.level_roles = self.bot.config_store.load('config/level_roles.json', self.level_roles)
     
     def save_level_roles(self):
         """Save level roles to config file"""
-        config_path = 'config/level_roles.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            import json
-            with open(config_path, 'w') as f:
-                json.dump(self.level_roles, f, indent=4)
-        except Exception as e:
-            print(f"Error saving level roles config: {e}")
+        self.bot.config_store.save('config/level_roles.json', self.level_roles)
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Award XP for messages"""
-        # Ignore bot messages and commands
-        if message.author.bot or message.content.startswith(self.bot.command_prefix):
+    async def award_xp(self, ctx):
+        """Award XP for messages (message pipeline stage)"""
+        message = ctx.message
+        
+        # Ignore commands (bot messages never reach the pipeline)
+        if ctx.is_command:
             return
         
         # Check cooldown
@@ -53,20 +44,16 @@ class Leveling(commands.Cog):
         # Award XP
         xp_to_add = random.randint(15, 25)
         
-        # Get or create user
-        user = await get_user(message.author.id)
-        if not user:
-            await create_user(
-                message.author.id,
-                message.author.name,
-                message.author.discriminator
-            )
-        
-        # Update user XP
-        updated_user = await update_user_xp(message.author.id, xp_to_add)
+        # Update user XP (creates the user if needed)
+        updated_user = await update_user_xp(message.author.id, xp_to_add, message.author.name)
+        if updated_user:
+            # Later stages (achievements) reuse the updated row instead of querying it again
+            ctx.set_user(updated_user)
+            if updated_user.get('level_up'):
+                ctx.new_level = updated_user['level']
         
         # Check if user leveled up
-        if updated_user and user and updated_user['level'] > user['level']:
+        if updated_user and updated_user.get('level_up'):
             # Send level up message
             embed = discord.Embed(
                 title="Level Up!",
@@ -88,18 +75,6 @@ class Leveling(commands.Cog):
                             await message.channel.send(f"You've been awarded the {role.mention} role!")
                         except Exception as e:
                             print(f"Error adding role: {e}")
-            
-            # Check for achievements
-            if updated_user['level'] == 5:
-                await add_achievement(message.author.id, "Reached Level 5")
-            elif updated_user['level'] == 10:
-                await add_achievement(message.author.id, "Reached Level 10")
-            elif updated_user['level'] == 25:
-                await add_achievement(message.author.id, "Reached Level 25")
-            elif updated_user['level'] == 50:
-                await add_achievement(message.author.id, "Reached Level 50")
-            elif updated_user['level'] == 100:
-                await add_achievement(message.author.id, "Reached Level 100")
     
     @commands.command()
     async def rank(self, ctx, member: discord.Member = None):
@@ -223,7 +198,7 @@ class Leveling(commands.Cog):
         """
         try:
             # Get all users from the database
-            response = self.bot.supabase.table('users').select('*').order('xp', desc=True).execute()
+            response = await run_query(self.bot.supabase.table('users').select('*').order('xp', desc=True))
             
             if not response.data:
                 return await ctx.send("No users found in the leaderboard.")
@@ -363,17 +338,8 @@ class Leveling(commands.Cog):
         if amount <= 0:
             return await ctx.send("Amount must be positive.")
         
-        # Get or create user
-        user = await get_user(member.id)
-        if not user:
-            await create_user(
-                member.id,
-                member.name,
-                member.discriminator
-            )
-        
-        # Update user XP
-        updated_user = await update_user_xp(member.id, amount)
+        # Update user XP (creates the user if needed)
+        updated_user = await update_user_xp(member.id, amount, member.name)
         
         if updated_user:
             await ctx.send(f"Added {amount} XP to {member.mention}. They are now level {updated_user['level']} with {updated_user['xp']} XP.")
@@ -1,39 +1,51 @@
 import discord
 from discord.ext import commands
-import re
-import json
-import os
-from utils.database import add_punishment
+from utils.message_pipeline import STAGE_MODERATION
+from utils.automod_rules import GuildRules
+from utils.spam_detector import SpamDetector
+from utils.enforcement import Enforcement, PunishmentExecutor
 
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = {}
+        self.rules = {}  # Reglas compiladas por servidor (se reconstruyen al cambiar la configuración)
+        self.spam_detector = SpamDetector()  # Contadores de ventana deslizante (flood, duplicados, menciones, raids)
+        self.enforcer = PunishmentExecutor(bot)  # Las sanciones se aplican en segundo plano, por lotes
         self.load_config()
+        self.bot.message_pipeline.add_stage("automod", self.check_message, STAGE_MODERATION, cog=self.qualified_name)
+    
+    async def cog_unload(self):
+        self.bot.message_pipeline.remove_stage("automod")
+        await self.enforcer.close()
     
     def load_config(self):
         """Load automod configuration from file"""
-        config_path = 'config/automod.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.config = json.load(f)
-            except Exception as e:
-                print(f"Error loading automod config: {e}")
-        else:
+        self.rules.clear()
+        self.config = self.bot.config_store.load('config/automod.json')
+        if self.config is None:
             # Create default config
             self.config = {}
             self.save_config()
     
-    def save_config(self):
-        """Save automod configuration to file"""
-        config_path = 'config/automod.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.config, f, indent=4)
-        except Exception as e:
-            print(f"Error saving automod config: {e}")
+    def save_config(self, guild_id=None):
+        """Save automod configuration to file
+        
+        guild_id is the server whose settings changed: only its rules are recompiled
+        (on its next message). Without it every server's rules are dropped.
+        """
+        if guild_id is None:
+            self.rules.clear()
+        else:
+            self.rules.pop(guild_id, None)
+        self.bot.config_store.save('config/automod.json', self.config)
+    
+    def get_rules(self, guild_id):
+        """Get the compiled rules for a guild (None if automod isn't configured there)"""
+        if guild_id not in self.rules:
+            guild_config = self.config.get(str(guild_id))
+            self.rules[guild_id] = GuildRules(guild_config) if guild_config is not None else None
+        return self.rules[guild_id]
     
     @commands.group(invoke_without_command=True)
     @commands.has_permissions(administrator=True)
@@ -62,7 +74,8 @@ class AutoMod(commands.Cog):
         
         if filters.get("banned_words", {}).get("enabled", False):
             word_count = len(filters.get("banned_words", {}).get("words", []))
-            filter_status.append(f"✅ Banned Words: {word_count} words")
+            mode = "whole words" if filters.get("banned_words", {}).get("whole_word", False) else "substring"
+            filter_status.append(f"✅ Banned Words: {word_count} words ({mode})")
         else:
             filter_status.append("❌ Banned Words: Disabled")
         
@@ -79,6 +92,29 @@ class AutoMod(commands.Cog):
         else:
             filter_status.append("❌ Anti-Spam: Disabled")
         
+        if filters.get("duplicates", {}).get("enabled", False):
+            limit = filters.get("duplicates", {}).get("duplicate_limit", 3)
+            channel_limit = filters.get("duplicates", {}).get("channel_limit", 5)
+            seconds = filters.get("duplicates", {}).get("time_window", 30)
+            filter_status.append(f"✅ Duplicates: {limit} per user / {channel_limit} per channel in {seconds}s")
+        else:
+            filter_status.append("❌ Duplicates: Disabled")
+        
+        if filters.get("mentions", {}).get("enabled", False):
+            limit = filters.get("mentions", {}).get("mention_limit", 5)
+            seconds = filters.get("mentions", {}).get("time_window", 10)
+            filter_status.append(f"✅ Mass Mentions: {limit} mentions in {seconds}s")
+        else:
+            filter_status.append("❌ Mass Mentions: Disabled")
+        
+        if filters.get("raid", {}).get("enabled", False):
+            limit = filters.get("raid", {}).get("join_limit", 10)
+            seconds = filters.get("raid", {}).get("time_window", 60)
+            days = filters.get("raid", {}).get("account_age_days", 7)
+            filter_status.append(f"✅ Anti-Raid: {limit} new accounts (<{days}d) joining in {seconds}s")
+        else:
+            filter_status.append("❌ Anti-Raid: Disabled")
+        
         if filters.get("links", {}).get("enabled", False):
             filter_status.append("✅ Link Filter: Enabled")
         else:
@@ -136,7 +172,7 @@ class AutoMod(commands.Cog):
     @filter.command()
     @commands.has_permissions(administrator=True)
     async def words(self, ctx, action="list"):
-        """Manage banned words filter"""
+        """Manage banned words filter (list, enable, disable, wholeword, substring)"""
         guild_id = str(ctx.guild.id)
         
         if guild_id not in self.config:
@@ -174,18 +210,25 @@ class AutoMod(commands.Cog):
         
         elif action.lower() == "enable":
             self.config[guild_id]["filters"]["banned_words"]["enabled"] = True
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Banned words filter has been enabled.")
         
         elif action.lower() == "disable":
             self.config[guild_id]["filters"]["banned_words"]["enabled"] = False
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Banned words filter has been disabled.")
+        
+        elif action.lower() in ["wholeword", "substring"]:
+            whole_word = action.lower() == "wholeword"
+            self.config[guild_id]["filters"]["banned_words"]["whole_word"] = whole_word
+            self.save_config(ctx.guild.id)
+            mode = "whole words only" if whole_word else "any part of a word"
+            await ctx.send(f"Banned words will now match {mode}.")
     
     @filter.command()
     @commands.has_permissions(administrator=True)
     async def addword(self, ctx, *, word):
-        """Add a word to the banned words list"""
+        """Add a word to the banned words list (use * as a wildcard, e.g. `spam*`)"""
         guild_id = str(ctx.guild.id)
         
         if guild_id not in self.config:
@@ -203,7 +246,7 @@ class AutoMod(commands.Cog):
         # Add the word if it's not already in the list
         if word.lower() not in [w.lower() for w in self.config[guild_id]["filters"]["banned_words"]["words"]]:
             self.config[guild_id]["filters"]["banned_words"]["words"].append(word.lower())
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send(f"Added `{word}` to the banned words list.")
         else:
             await ctx.send(f"`{word}` is already in the banned words list.")
@@ -228,7 +271,7 @@ class AutoMod(commands.Cog):
         for i, banned_word in enumerate(words):
             if banned_word.lower() == word.lower():
                 words.pop(i)
-                self.save_config()
+                self.save_config(ctx.guild.id)
                 return await ctx.send(f"Removed `{banned_word}` from the banned words list.")
         
         await ctx.send(f"`{word}` is not in the banned words list.")
@@ -261,12 +304,12 @@ class AutoMod(commands.Cog):
         elif action.lower() == "enable":
             self.config[guild_id]["filters"]["caps"]["enabled"] = True
             self.config[guild_id]["filters"]["caps"]["threshold"] = threshold
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send(f"Excessive caps filter has been enabled with a threshold of {threshold}%.")
         
         elif action.lower() == "disable":
             self.config[guild_id]["filters"]["caps"]["enabled"] = False
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Excessive caps filter has been disabled.")
     
     @filter.command()
@@ -294,12 +337,12 @@ class AutoMod(commands.Cog):
         
         elif action.lower() == "enable":
             self.config[guild_id]["filters"]["links"]["enabled"] = True
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Link filter has been enabled.")
         
         elif action.lower() == "disable":
             self.config[guild_id]["filters"]["links"]["enabled"] = False
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Link filter has been disabled.")
     
     @filter.command()
@@ -327,14 +370,174 @@ class AutoMod(commands.Cog):
         
         elif action.lower() == "enable":
             self.config[guild_id]["filters"]["invites"]["enabled"] = True
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Discord invites filter has been enabled.")
         
         elif action.lower() == "disable":
             self.config[guild_id]["filters"]["invites"]["enabled"] = False
-            self.save_config()
+            self.save_config(ctx.guild.id)
             await ctx.send("Discord invites filter has been disabled.")
     
+    @filter.command()
+    @commands.has_permissions(administrator=True)
+    async def spam(self, ctx, action="status", message_limit: int = 5, time_window: int = 5):
+        """Configure the anti-spam filter (more than message_limit messages in time_window seconds)"""
+        guild_id = str(ctx.guild.id)
+        
+        if guild_id not in self.config:
+            self.config[guild_id] = {}
+        
+        if "filters" not in self.config[guild_id]:
+            self.config[guild_id]["filters"] = {}
+        
+        if "spam" not in self.config[guild_id]["filters"]:
+            self.config[guild_id]["filters"]["spam"] = {
+                "enabled": False,
+                "message_limit": 5,
+                "time_window": 5
+            }
+        
+        spam_config = self.config[guild_id]["filters"]["spam"]
+        
+        if action.lower() == "status":
+            status = "Enabled" if spam_config.get("enabled", False) else "Disabled"
+            await ctx.send(f"Anti-spam filter: {status}\nLimit: {spam_config.get('message_limit', 5)} messages in {spam_config.get('time_window', 5)}s")
+        
+        elif action.lower() == "enable":
+            spam_config["enabled"] = True
+            spam_config["message_limit"] = message_limit
+            spam_config["time_window"] = time_window
+            self.save_config(ctx.guild.id)
+            await ctx.send(f"Anti-spam filter has been enabled: {message_limit} messages in {time_window}s.")
+        
+        elif action.lower() == "disable":
+            spam_config["enabled"] = False
+            self.save_config(ctx.guild.id)
+            await ctx.send("Anti-spam filter has been disabled.")
+    
+    @filter.command()
+    @commands.has_permissions(administrator=True)
+    async def duplicates(self, ctx, action="status", duplicate_limit: int = 3, channel_limit: int = 5, time_window: int = 30):
+        """Configure the duplicate messages filter (same text repeated by a user or pasted across a channel)"""
+        guild_id = str(ctx.guild.id)
+        
+        if guild_id not in self.config:
+            self.config[guild_id] = {}
+        
+        if "filters" not in self.config[guild_id]:
+            self.config[guild_id]["filters"] = {}
+        
+        if "duplicates" not in self.config[guild_id]["filters"]:
+            self.config[guild_id]["filters"]["duplicates"] = {
+                "enabled": False,
+                "duplicate_limit": 3,
+                "channel_limit": 5,
+                "time_window": 30
+            }
+        
+        duplicates_config = self.config[guild_id]["filters"]["duplicates"]
+        
+        if action.lower() == "status":
+            status = "Enabled" if duplicates_config.get("enabled", False) else "Disabled"
+            await ctx.send(
+                f"Duplicate messages filter: {status}\n"
+                f"Limit: {duplicates_config.get('duplicate_limit', 3)} per user, "
+                f"{duplicates_config.get('channel_limit', 5)} per channel in {duplicates_config.get('time_window', 30)}s"
+            )
+        
+        elif action.lower() == "enable":
+            duplicates_config["enabled"] = True
+            duplicates_config["duplicate_limit"] = duplicate_limit
+            duplicates_config["channel_limit"] = channel_limit
+            duplicates_config["time_window"] = time_window
+            self.save_config(ctx.guild.id)
+            await ctx.send(f"Duplicate messages filter has been enabled: {duplicate_limit} per user, {channel_limit} per channel in {time_window}s.")
+        
+        elif action.lower() == "disable":
+            duplicates_config["enabled"] = False
+            self.save_config(ctx.guild.id)
+            await ctx.send("Duplicate messages filter has been disabled.")
+    
+    @filter.command()
+    @commands.has_permissions(administrator=True)
+    async def mentions(self, ctx, action="status", mention_limit: int = 5, time_window: int = 10):
+        """Configure the mass mentions filter (mention_limit mentions in time_window seconds)"""
+        guild_id = str(ctx.guild.id)
+        
+        if guild_id not in self.config:
+            self.config[guild_id] = {}
+        
+        if "filters" not in self.config[guild_id]:
+            self.config[guild_id]["filters"] = {}
+        
+        if "mentions" not in self.config[guild_id]["filters"]:
+            self.config[guild_id]["filters"]["mentions"] = {
+                "enabled": False,
+                "mention_limit": 5,
+                "time_window": 10
+            }
+        
+        mentions_config = self.config[guild_id]["filters"]["mentions"]
+        
+        if action.lower() == "status":
+            status = "Enabled" if mentions_config.get("enabled", False) else "Disabled"
+            await ctx.send(f"Mass mentions filter: {status}\nLimit: {mentions_config.get('mention_limit', 5)} mentions in {mentions_config.get('time_window', 10)}s")
+        
+        elif action.lower() == "enable":
+            mentions_config["enabled"] = True
+            mentions_config["mention_limit"] = mention_limit
+            mentions_config["time_window"] = time_window
+            self.save_config(ctx.guild.id)
+            await ctx.send(f"Mass mentions filter has been enabled: {mention_limit} mentions in {time_window}s.")
+        
+        elif action.lower() == "disable":
+            mentions_config["enabled"] = False
+            self.save_config(ctx.guild.id)
+            await ctx.send("Mass mentions filter has been disabled.")
+    
+    @filter.command()
+    @commands.has_permissions(administrator=True)
+    async def raid(self, ctx, action="status", join_limit: int = 10, time_window: int = 60, account_age_days: int = 7):
+        """Configure raid protection (join_limit new accounts joining in time_window seconds)"""
+        guild_id = str(ctx.guild.id)
+        
+        if guild_id not in self.config:
+            self.config[guild_id] = {}
+        
+        if "filters" not in self.config[guild_id]:
+            self.config[guild_id]["filters"] = {}
+        
+        if "raid" not in self.config[guild_id]["filters"]:
+            self.config[guild_id]["filters"]["raid"] = {
+                "enabled": False,
+                "join_limit": 10,
+                "time_window": 60,
+                "account_age_days": 7
+            }
+        
+        raid_config = self.config[guild_id]["filters"]["raid"]
+        
+        if action.lower() == "status":
+            status = "Enabled" if raid_config.get("enabled", False) else "Disabled"
+            await ctx.send(
+                f"Raid protection: {status}\n"
+                f"Limit: {raid_config.get('join_limit', 10)} accounts younger than "
+                f"{raid_config.get('account_age_days', 7)} days in {raid_config.get('time_window', 60)}s"
+            )
+        
+        elif action.lower() == "enable":
+            raid_config["enabled"] = True
+            raid_config["join_limit"] = join_limit
+            raid_config["time_window"] = time_window
+            raid_config["account_age_days"] = account_age_days
+            self.save_config(ctx.guild.id)
+            await ctx.send(f"Raid protection has been enabled: {join_limit} accounts younger than {account_age_days} days in {time_window}s.")
+        
+        elif action.lower() == "disable":
+            raid_config["enabled"] = False
+            self.save_config(ctx.guild.id)
+            await ctx.send("Raid protection has been disabled.")
+    
     @automod.command()
     @commands.has_permissions(administrator=True)
     async def exempt(self, ctx, target_type, target: discord.Role | discord.TextChannel):
@@ -353,7 +556,7 @@ class AutoMod(commands.Cog):
             
             if str(target.id) not in self.config[guild_id]["exempt_roles"]:
                 self.config[guild_id]["exempt_roles"].append(str(target.id))
-                self.save_config()
+                self.save_config(ctx.guild.id)
                 await ctx.send(f"Role {target.mention} is now exempt from automod.")
             else:
                 await ctx.send(f"Role {target.mention} is already exempt from automod.")
@@ -364,7 +567,7 @@ class AutoMod(commands.Cog):
             
             if str(target.id) not in self.config[guild_id]["exempt_channels"]:
                 self.config[guild_id]["exempt_channels"].append(str(target.id))
-                self.save_config()
+                self.save_config(ctx.guild.id)
                 await ctx.send(f"Channel {target.mention} is now exempt from automod.")
             else:
                 await ctx.send(f"Channel {target.mention} is already exempt from automod.")
@@ -387,7 +590,7 @@ class AutoMod(commands.Cog):
             
             if str(target.id) in self.config[guild_id]["exempt_roles"]:
                 self.config[guild_id]["exempt_roles"].remove(str(target.id))
-                self.save_config()
+                self.save_config(ctx.guild.id)
                 await ctx.send(f"Role {target.mention} is no longer exempt from automod.")
             else:
                 await ctx.send(f"Role {target.mention} is not exempt from automod.")
@@ -398,7 +601,7 @@ class AutoMod(commands.Cog):
             
             if str(target.id) in self.config[guild_id]["exempt_channels"]:
                 self.config[guild_id]["exempt_channels"].remove(str(target.id))
-                self.save_config()
+                self.save_config(ctx.guild.id)
                 await ctx.send(f"Channel {target.mention} is no longer exempt from automod.")
             else:
                 await ctx.send(f"Channel {target.mention} is not exempt from automod.")
@@ -415,7 +618,7 @@ class AutoMod(commands.Cog):
         if "punishments" not in self.config[guild_id]:
             self.config[guild_id]["punishments"] = {}
         
-        valid_violations = ["banned_words", "caps", "spam", "links", "invites"]
+        valid_violations = ["banned_words", "caps", "spam", "duplicates", "mentions", "links", "invites", "raid"]
         valid_actions = ["delete", "warn", "mute", "kick", "ban"]
         
         if violation not in valid_violations:
@@ -425,114 +628,54 @@ class AutoMod(commands.Cog):
             return await ctx.send(f"Invalid action. Valid actions: {', '.join(valid_actions)}")
         
         self.config[guild_id]["punishments"][violation] = action
-        self.save_config()
+        self.save_config(ctx.guild.id)
         
         await ctx.send(f"Punishment for {violation} has been set to {action}.")
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Check messages for automod violations"""
-        # Ignore messages from bots
-        if message.author.bot:
-            return
+    async def check_message(self, ctx):
+        """Check messages for automod violations (message pipeline stage)
+        
+        Runs first in the message pipeline; a violation stops the remaining stages.
+        """
+        message = ctx.message
         
         # Ignore DMs
-        if not message.guild:
+        if not ctx.guild:
             return
         
-        guild_id = str(message.guild.id)
-        
         # Check if automod is configured for this guild
-        if guild_id not in self.config:
+        rules = self.get_rules(message.guild.id)
+        if rules is None:
             return
         
         # Check if user or channel is exempt
-        if "exempt_roles" in self.config[guild_id]:
-            user_roles = [str(role.id) for role in message.author.roles]
-            if any(role_id in self.config[guild_id]["exempt_roles"] for role_id in user_roles):
-                return
-        
-        if "exempt_channels" in self.config[guild_id]:
-            if str(message.channel.id) in self.config[guild_id]["exempt_channels"]:
-                return
-        
-        # Check for violations
-        violation = None
-        
-        # Check banned words
-        if "filters" in self.config[guild_id] and "banned_words" in self.config[guild_id]["filters"]:
-            if self.config[guild_id]["filters"]["banned_words"].get("enabled", False):
-                banned_words = self.config[guild_id]["filters"]["banned_words"].get("words", [])
-                content_lower = message.content.lower()
-                
-                for word in banned_words:
-                    if word.lower() in content_lower:
-                        violation = "banned_words"
-                        break
-        
-        # Check excessive caps
-        if not violation and "filters" in self.config[guild_id] and "caps" in self.config[guild_id]["filters"]:
-            if self.config[guild_id]["filters"]["caps"].get("enabled", False):
-                threshold = self.config[guild_id]["filters"]["caps"].get("threshold", 70)
-                
-                if len(message.content) >= 8:  # Only check messages with at least 8 characters
-                    caps_count = sum(1 for c in message.content if c.isupper())
-                    total_chars = sum(1 for c in message.content if c.isalpha())
-                    
-                    if total_chars > 0 and (caps_count / total_chars) * 100 >= threshold:
-                        violation = "caps"
-        
-        # Check links
-        if not violation and "filters" in self.config[guild_id] and "links" in self.config[guild_id]["filters"]:
-            if self.config[guild_id]["filters"]["links"].get("enabled", False):
-                # Simple URL pattern
-                url_pattern = re.compile(r'https?://\S+')
-                if url_pattern.search(message.content):
-                    violation = "links"
-        
-        # Check Discord invites
-        if not violation and "filters" in self.config[guild_id] and "invites" in self.config[guild_id]["filters"]:
-            if self.config[guild_id]["filters"]["invites"].get("enabled", False):
-                invite_pattern = re.compile(r'discord(?:\.gg|app\.com/invite)/\S+')
-                if invite_pattern.search(message.content):
-                    violation = "invites"
+        if rules.is_exempt(message):
+            return
+        
+        # Check for violations (filters run in order, first match wins),
+        # then the rate-based detectors (flood, duplicates, mass mentions)
+        violation = rules.check(message.content) or self.spam_detector.check_message(message, rules)
         
         # Apply punishment if violation found
         if violation:
-            punishment = self.config[guild_id].get("punishments", {}).get(violation, "delete")
+            # The message won't be processed as a command or count for XP
+            ctx.stop(violation)
             
-            # Delete message
-            if punishment in ["delete", "warn", "mute", "kick", "ban"]:
-                try:
-                    await message.delete()
-                except:
-                    pass
+            punishment = rules.punishment_for(violation)
             
-            # Apply additional punishment
-            if punishment == "warn":
-                await add_punishment(message.author.id, "warn", f"AutoMod: {violation}")
-                await message.channel.send(f"{message.author.mention} has been warned for violating the {violation} filter.", delete_after=5)
-            
-            elif punishment == "mute":
-                # Get moderation cog to handle mute
-                mod_cog = self.bot.get_cog("Moderation")
-                if mod_cog:
-                    ctx = await self.bot.get_context(message)
-                    await mod_cog.mute(ctx, message.author, 3600, reason=f"AutoMod: {violation}")
-            
-            elif punishment == "kick":
-                try:
-                    await message.author.kick(reason=f"AutoMod: {violation}")
-                    await message.channel.send(f"{message.author.mention} has been kicked for violating the {violation} filter.", delete_after=5)
-                except:
-                    pass
-            
-            elif punishment == "ban":
-                try:
-                    await message.author.ban(reason=f"AutoMod: {violation}")
-                    await message.channel.send(f"{message.author.mention} has been banned for violating the {violation} filter.", delete_after=5)
-                except:
-                    pass
+            # Enforcement runs in the per-guild queue so detection never waits on the API
+            self.enforcer.submit(Enforcement(message.guild, message.author, violation, punishment, channel=message.channel, message=message))
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Detect join raids: too many new accounts joining in a short time"""
+        rules = self.get_rules(member.guild.id)
+        if rules is None or not self.spam_detector.check_join(member, rules):
+            return
+        
+        # Joins can't be deleted, so the default action for raids is a kick
+        punishment = rules.punishments.get("raid", "kick")
+        self.enforcer.submit(Enforcement(member.guild, member, "raid", punishment))
 
 async def setup(bot):
     await bot.add_cog(AutoMod(bot))
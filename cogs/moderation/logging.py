@@ -1,8 +1,6 @@
 import discord
 from discord.ext import commands
 import datetime
-import json
-import os
 
 class Logging(commands.Cog):
     def __init__(self, bot):
@@ -12,23 +10,11 @@ class Logging(commands.Cog):
     
     def load_config(self):
         """Load logging configuration from file"""
-        config_path = 'config/logging.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.log_channels = json.load(f)
-            except Exception as e:
-                print(f"Error loading logging config: {e}")
+        self.log_channels = self.bot.config_store.load('config/logging.json', self.log_channels)
     
     def save_config(self):
         """Save logging configuration to file"""
-        config_path = 'config/logging.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.log_channels, f, indent=4)
-        except Exception as e:
-            print(f"Error saving logging config: {e}")
+        self.bot.config_store.save('config/logging.json', self.log_channels)
     
     @commands.group(invoke_without_command=True)
     @commands.has_permissions(administrator=True)
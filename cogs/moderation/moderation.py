@@ -135,7 +135,7 @@ class Moderation(commands.Cog):
             return await ctx.send("You cannot ban someone with a higher or equal role.")
         
         # Add ban to database
-        await add_punishment(member.id, "ban", reason)
+        await add_punishment(member.id, "ban", reason, guild_id=ctx.guild.id)
         
         # Send DM to the member
         try:
@@ -205,7 +205,7 @@ class Moderation(commands.Cog):
             # Add unban record to database
             try:
                 # Record the unban in the database
-                await add_punishment(user.id, "unban", reason)
+                await add_punishment(user.id, "unban", reason, guild_id=ctx.guild.id)
             except Exception as db_error:
                 print(f"Error recording unban in database: {db_error}")
                 # Continue with the unban even if database update fails
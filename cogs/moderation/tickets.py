@@ -1,8 +1,6 @@
 import discord
 from discord.ext import commands
 import asyncio
-import json
-import os
 import datetime
 
 class TicketView(discord.ui.View):
@@ -49,23 +47,11 @@ class Tickets(commands.Cog):
     
     def load_config(self):
         """Load ticket configuration from file"""
-        config_path = 'config/tickets.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.tickets_config = json.load(f)
-            except Exception as e:
-                print(f"Error loading tickets config: {e}")
+        self.tickets_config = self.bot.config_store.load('config/tickets.json', self.tickets_config)
     
     def save_config(self):
         """Save ticket configuration to file"""
-        config_path = 'config/tickets.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.tickets_config, f, indent=4)
-        except Exception as e:
-            print(f"Error saving tickets config: {e}")
+        self.bot.config_store.save('config/tickets.json', self.tickets_config)
     
     @commands.group(invoke_without_command=True)
     @commands.has_permissions(administrator=True)
@@ -7,17 +7,19 @@ from spotipy.oauth2 import SpotifyClientCredentials
 import os
 from dotenv import load_dotenv
 import re
-import urllib.request
-import urllib.parse
 import random
+import time
 from aiohttp import ClientSession
+from utils.youtube_search import YouTubeSearch
+from utils.track_cache import TrackCache, MatchCache, video_id_from_url, spotify_search_query
+from utils.extraction_pool import ExtractionPool, PRIORITY_NOW_PLAYING, PRIORITY_PREFETCH, PRIORITY_BACKGROUND
+from utils.rate_limiter import TokenBucket
 
 # Load environment variables
 load_dotenv()
 
 # YouTube and yt-dlp configuration
 youtube_base_url = 'https://www.youtube.com/'
-youtube_results_url = youtube_base_url + 'results?'
 youtube_watch_url = youtube_base_url + 'watch?v='
 
 yt_dl_options = {
@@ -43,6 +45,17 @@ ffmpeg_options = {
 
 ytdl = yt_dlp.YoutubeDL(yt_dl_options)
 
+# Precarga: URLs de audio resueltas por adelantado y segundos antes del final en que se abre la siguiente pista
+PREFETCH_TRACKS = 2
+PREFETCH_LEAD = 15
+
+# Carga de playlists de Spotify: canciones resueltas a la vez y ritmo de búsquedas en YouTube
+SPOTIFY_PLAYLIST_LIMIT = int(os.getenv("SPOTIFY_PLAYLIST_LIMIT", "100"))
+SPOTIFY_RESOLVE_CONCURRENCY = int(os.getenv("SPOTIFY_RESOLVE_CONCURRENCY", "4"))
+YOUTUBE_SEARCH_RATE = float(os.getenv("YOUTUBE_SEARCH_RATE", "2"))  # búsquedas por segundo
+YOUTUBE_SEARCH_BURST = int(os.getenv("YOUTUBE_SEARCH_BURST", "5"))
+PLAYLIST_PROGRESS_INTERVAL = 5  # segundos entre actualizaciones del mensaje de progreso
+
 # Spotify API setup
 sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
     client_id=os.getenv("SPOTIFY_CLIENT_ID"),
@@ -97,6 +110,18 @@ class MusicQueue:
             return None
         return self.queue[self.position]
     
+    def upcoming(self, count):
+        """Las siguientes count pistas, en el orden en que las reproducirá play_next"""
+        tracks = []
+        for offset in range(1, count + 1):
+            index = self.position + offset
+            if index >= len(self.queue):
+                if self.loop_mode != "queue" or not self.queue:
+                    break
+                index %= len(self.queue)
+            tracks.append(self.queue[index])
+        return tracks
+    
     def clear(self):
         self.queue = []
         self.position = 0
@@ -128,6 +153,20 @@ class Music(commands.Cog):
         self.voice_clients = {}
         self.current_songs = {}
         self.loading_playlists = set()
+        self.youtube = YouTubeSearch()  # Búsqueda asíncrona con una sesión HTTP compartida
+        self.track_cache = TrackCache(bot.config_store)  # Metadatos y URLs de audio ya extraídos por yt-dlp
+        self.extractor = ExtractionPool()  # Hilos dedicados y con prioridad para yt-dlp
+        self.spotify_matches = MatchCache(bot.config_store)  # Canción de Spotify -> ID de vídeo
+        self.search_limiter = TokenBucket(YOUTUBE_SEARCH_RATE, YOUTUBE_SEARCH_BURST)
+        self.prefetched = {}  # guild_id -> (pista, FFmpegOpusAudio) de la siguiente canción, ya abierta
+        self.prefetch_tasks = {}
+        self.track_started = {}
+    
+    async def cog_unload(self):
+        for guild_id in list(self.prefetched) + list(self.prefetch_tasks):
+            self.invalidate_prefetch(guild_id)
+        await self.youtube.close()
+        await self.extractor.close()
     
     async def get_random_image(self):
         """Get a random anime image for embeds"""
@@ -213,21 +252,21 @@ class Music(commands.Cog):
         try:
             guild_id = ctx.guild.id
             
-            # Extract audio URL using yt-dlp
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(song['url'], download=False))
-            
-            if data is None:
-                await self.send_embed(ctx, "Error", f"Could not retrieve data for the song: {song['title']}", discord.Color.red())
-                return
-            
-            song_url = data.get('url')
-            if song_url is None:
-                await self.send_embed(ctx, "Error", f"Could not get playable URL for the song: {song['title']}", discord.Color.red())
-                return
-            
-            # Create FFmpeg audio source
-            player = discord.FFmpegOpusAudio(song_url, **ffmpeg_options)
+            # Use the audio source opened in advance for this track, if there is one
+            prefetched = self.prefetched.pop(guild_id, None)
+            if prefetched and prefetched[0] is song:
+                player = prefetched[1]
+            else:
+                if prefetched:
+                    prefetched[1].cleanup()
+                
+                song_url = await self.resolve_stream_url(song, guild_id, PRIORITY_NOW_PLAYING)
+                if song_url is None:
+                    await self.send_embed(ctx, "Error", f"Could not get playable URL for the song: {song['title']}", discord.Color.red())
+                    return
+                
+                # Create FFmpeg audio source
+                player = discord.FFmpegOpusAudio(song_url, **ffmpeg_options)
             
             # Play the song
             if guild_id in self.voice_clients:
@@ -241,6 +280,10 @@ class Music(commands.Cog):
                 
                 # Store current song info
                 self.current_songs[guild_id] = song
+                self.track_started[guild_id] = time.time()
+                
+                # Resolve the next tracks while this one plays
+                self.start_prefetch(guild_id)
                 
                 # Send now playing message
                 embed = discord.Embed(
@@ -276,6 +319,79 @@ class Music(commands.Cog):
         except Exception as e:
             await self.send_embed(ctx, "Error", f"An error occurred: {str(e)}", discord.Color.red())
     
+    async def extract_info(self, url, guild_id=None, priority=PRIORITY_BACKGROUND):
+        """Run ytdl.extract_info in the dedicated extraction pool"""
+        return await self.extractor.run(
+            lambda: ytdl.extract_info(url, download=False), priority=priority, guild_id=guild_id
+        )
+    
+    async def resolve_stream_url(self, song, guild_id=None, priority=PRIORITY_NOW_PLAYING):
+        """Playable audio URL for a track: cached while still valid, otherwise extracted with yt-dlp"""
+        video_id = video_id_from_url(song['url'])
+        song_url = self.track_cache.get_stream_url(video_id) if video_id else None
+        if song_url is not None:
+            return song_url
+        
+        data = await self.extract_info(song['url'], guild_id, priority)
+        if data is None or data.get('url') is None:
+            return None
+        
+        if video_id:
+            self.track_cache.set_stream_url(video_id, data['url'])
+        return data['url']
+    
+    def start_prefetch(self, guild_id):
+        """Resolve the upcoming tracks in the background and open the next one shortly before the current ends"""
+        self.invalidate_prefetch(guild_id)
+        self.prefetch_tasks[guild_id] = asyncio.create_task(self.prefetch_upcoming(guild_id))
+        
+        current = self.current_songs.get(guild_id)
+        if current and current.get('duration') and guild_id in self.track_started:
+            prepare_at = self.track_started[guild_id] + current['duration'] - PREFETCH_LEAD
+            self.bot.scheduler.schedule(("music.prefetch", guild_id), prepare_at, self.prepare_next_source, guild_id)
+    
+    async def prefetch_upcoming(self, guild_id):
+        """Fill the stream URL cache for the next PREFETCH_TRACKS tracks"""
+        for track in self.get_queue(guild_id).upcoming(PREFETCH_TRACKS):
+            try:
+                await self.resolve_stream_url(track, guild_id, PRIORITY_PREFETCH)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"Error prefetching track: {e}")
+        if self.prefetch_tasks.get(guild_id) is asyncio.current_task():
+            del self.prefetch_tasks[guild_id]
+    
+    async def prepare_next_source(self, guild_id):
+        """Open the FFmpeg source for the next track so it starts without a gap"""
+        upcoming = self.get_queue(guild_id).upcoming(1)
+        if not upcoming or guild_id in self.prefetched:
+            return
+        
+        track = upcoming[0]
+        song_url = await self.resolve_stream_url(track, guild_id, PRIORITY_PREFETCH)
+        # The queue may have changed while resolving
+        if song_url is None or self.get_queue(guild_id).upcoming(1)[:1] != [track]:
+            return
+        self.prefetched[guild_id] = (track, discord.FFmpegOpusAudio(song_url, **ffmpeg_options))
+    
+    def invalidate_prefetch(self, guild_id):
+        """Drop prefetched work for a guild (the queue order changed or playback stopped)"""
+        task = self.prefetch_tasks.pop(guild_id, None)
+        if task:
+            task.cancel()
+        self.bot.scheduler.cancel(("music.prefetch", guild_id))
+        prefetched = self.prefetched.pop(guild_id, None)
+        if prefetched:
+            prefetched[1].cleanup()
+    
+    def queue_changed(self, guild_id):
+        """Restart prefetching after the queue order changed"""
+        if guild_id in self.current_songs:
+            self.start_prefetch(guild_id)
+        else:
+            self.invalidate_prefetch(guild_id)
+    
     async def update_bot_status(self, status_text):
         """Actualiza el estado del bot para mostrar la canción actual"""
         await self.bot.change_presence(
@@ -290,32 +406,61 @@ class Music(commands.Cog):
     
     async def get_youtube_results(self, query):
         """Search for videos on YouTube"""
-        try:
-            search_query = urllib.parse.urlencode({'search_query': query})
-            content = urllib.request.urlopen(youtube_results_url + search_query)
-            search_results = re.findall(r'/watch\?v=(.{11})', content.read().decode())
-            return search_results[:5]  # Return top 5 results
-        except Exception as e:
-            print(f"Error searching YouTube: {e}")
-            return []
+        return await self.youtube.search(query, limit=5)  # Return top 5 results
     
-    async def get_video_info(self, video_id):
+    async def get_video_info(self, video_id, guild_id=None, priority=PRIORITY_NOW_PLAYING):
         """Get video info from YouTube"""
         url = youtube_watch_url + video_id
+        
+        cached = self.track_cache.get_metadata(video_id)
+        if cached:
+            return cached
+        
         try:
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=False))
+            data = await self.extract_info(url, guild_id, priority)
             
-            return {
+            video_info = {
                 'url': url,
                 'title': data['title'],
                 'duration': data['duration'],
                 'uploader': data['uploader'],
                 'thumbnail': data['thumbnail']
             }
+            
+            # The same extraction also gives us the audio URL, so playing it later needs no extra call
+            self.track_cache.set_metadata(video_id, video_info)
+            if data.get('url'):
+                self.track_cache.set_stream_url(video_id, data['url'])
+            
+            return video_info
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error getting video info: {e}")
             return None
+    
+    async def resolve_spotify_track(self, track, guild_id=None, priority=PRIORITY_NOW_PLAYING):
+        """Find the YouTube video for a Spotify track and get its info"""
+        stale_id = self.spotify_matches.get(track)
+        if stale_id is not None:
+            video_info = await self.get_video_info(stale_id, guild_id, priority)
+            if video_info:
+                self.spotify_matches.set(track, stale_id)
+                return video_info
+            # The saved video is gone (deleted, private, blocked): forget it and search again
+            self.spotify_matches.invalidate(track, stale_id)
+        
+        await self.search_limiter.acquire()
+        results = await self.get_youtube_results(spotify_search_query(track))
+        results = [video_id for video_id in results if video_id != stale_id]
+        if not results:
+            return None
+        
+        video_id = results[0]
+        video_info = await self.get_video_info(video_id, guild_id, priority)
+        if video_info:
+            self.spotify_matches.set(track, video_id)
+        return video_info
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -329,6 +474,9 @@ class Music(commands.Cog):
         if member.id == self.bot.user.id:
             # Si el bot salió de un canal de voz
             if before.channel is not None and after.channel is None:
+                # Cancelar las extracciones pendientes de este servidor
+                self.extractor.cancel_guild(member.guild.id)
+                self.invalidate_prefetch(member.guild.id)
                 # Restaurar el estado del bot
                 self.bot.music_playing = False
                 # Reiniciar la rotación de estado
@@ -387,6 +535,7 @@ class Music(commands.Cog):
             return
         
         await ctx.voice_client.disconnect()
+        self.invalidate_prefetch(ctx.guild.id)
         await ctx.send("👋 Me he desconectado del canal de voz.")
         
         # Restaurar el estado del bot
@@ -427,18 +576,11 @@ class Music(commands.Cog):
                 # Get track info from Spotify
                 try:
                     track_info = sp.track(spotify_id)
-                    search_query = f"{track_info['name']} {' '.join([artist['name'] for artist in track_info['artists']])}"
-                    
-                    # Search for the track on YouTube
-                    results = await self.get_youtube_results(search_query)
-                    if not results:
-                        return await ctx.send("Could not find the track on YouTube.")
                     
-                    # Get video info
-                    video_id = results[0]
-                    video_info = await self.get_video_info(video_id)
+                    # Find the track on YouTube and get its video info
+                    video_info = await self.resolve_spotify_track(track_info, ctx.guild.id)
                     if not video_info:
-                        return await ctx.send("Could not get video info.")
+                        return await ctx.send("Could not find the track on YouTube.")
                     
                     # Add to queue
                     queue = self.get_queue(ctx.guild.id)
@@ -469,17 +611,9 @@ class Music(commands.Cog):
                         return await ctx.send(f"No tracks found in the {content_type}.")
                     
                     # Process the first track immediately
-                    first_track = tracks[0]
-                    search_query = f"{first_track['name']} {' '.join([artist['name'] for artist in first_track['artists']])}"
-                    
-                    results = await self.get_youtube_results(search_query)
-                    if not results:
-                        return await ctx.send("Could not find the first track on YouTube.")
-                    
-                    video_id = results[0]
-                    video_info = await self.get_video_info(video_id)
+                    video_info = await self.resolve_spotify_track(tracks[0], ctx.guild.id)
                     if not video_info:
-                        return await ctx.send("Could not get video info for the first track.")
+                        return await ctx.send("Could not find the first track on YouTube.")
                     
                     # Add to queue
                     queue = self.get_queue(ctx.guild.id)
@@ -492,9 +626,8 @@ class Music(commands.Cog):
                         await ctx.send(f"Added **{video_info['title']}** to the queue")
                     
                     # Process remaining tracks in the background
-                    remaining_tracks = tracks[1:25]  # Limit to 25 tracks total
+                    remaining_tracks = tracks[1:SPOTIFY_PLAYLIST_LIMIT]
                     if remaining_tracks:
-                        await ctx.send(f"Loading the remaining {len(remaining_tracks)} tracks in the background...")
                         asyncio.create_task(self.load_playlist_tracks(ctx, remaining_tracks))
                 
                 except Exception as e:
@@ -512,9 +645,8 @@ class Music(commands.Cog):
             
             try:
                 # Extract playlist info using yt-dlp
-                loop = asyncio.get_event_loop()
                 playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
-                data = await loop.run_in_executor(None, lambda: ytdl.extract_info(playlist_url, download=False))
+                data = await self.extract_info(playlist_url, ctx.guild.id, PRIORITY_NOW_PLAYING)
                 
                 if not data or 'entries' not in data:
                     return await ctx.send("Could not retrieve playlist data.")
@@ -566,7 +698,7 @@ class Music(commands.Cog):
             
             # Get video info for the first result
             video_id = results[0]
-            video_info = await self.get_video_info(video_id)
+            video_info = await self.get_video_info(video_id, ctx.guild.id)
             if not video_info:
                 return await ctx.send("Could not get video info.")
             
@@ -584,31 +716,71 @@ class Music(commands.Cog):
             await ctx.send(f"Error: {str(e)}")
     
     async def load_playlist_tracks(self, ctx, tracks):
-        """Load tracks from a Spotify playlist in the background"""
+        """Load tracks from a Spotify playlist in the background
+        
+        Tracks are resolved concurrently (YouTube searches are paced by a token bucket) but
+        added to the queue in playlist order, as soon as every earlier track is resolved.
+        """
         guild_id = ctx.guild.id
         queue = self.get_queue(guild_id)
+        semaphore = asyncio.Semaphore(SPOTIFY_RESOLVE_CONCURRENCY)
         
-        tracks_added = 0
-        for track in tracks:
-            try:
-                search_query = f"{track['name']} {' '.join([artist['name'] for artist in track['artists']])}"
-                results = await self.get_youtube_results(search_query)
-                
-                if results:
-                    video_id = results[0]
-                    video_info = await self.get_video_info(video_id)
-                    
-                    if video_info:
-                        queue.add(video_info)
-                        tracks_added += 1
-                
-                # Add a small delay to avoid rate limiting
-                await asyncio.sleep(0.5)
+        results = [None] * len(tracks)
+        finished = [False] * len(tracks)
+        state = {'next': 0, 'resolved': 0, 'added': 0}
+        
+        async def resolve(index, track):
+            async with semaphore:
+                try:
+                    # Nothing left to do once the bot has left the voice channel
+                    if ctx.voice_client is not None:
+                        results[index] = await self.resolve_spotify_track(track, guild_id, PRIORITY_BACKGROUND)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error processing track: {e}")
             
-            except Exception as e:
-                print(f"Error processing track: {e}")
+            finished[index] = True
+            state['resolved'] += 1
+            # Add every track that is now at the front of the unresolved range, keeping playlist order
+            while state['next'] < len(tracks) and finished[state['next']]:
+                video_info = results[state['next']]
+                if video_info:
+                    queue.add(video_info)
+                    state['added'] += 1
+                state['next'] += 1
+        
+        def progress_text():
+            return f"Loading the remaining tracks in the background... {state['resolved']}/{len(tracks)} resolved, {state['added']} added to the queue"
         
-        print(f"Added {tracks_added} tracks from playlist to queue")
+        async def report_progress(message):
+            while True:
+                await asyncio.sleep(PLAYLIST_PROGRESS_INTERVAL)
+                try:
+                    await message.edit(content=progress_text())
+                except discord.HTTPException:
+                    pass
+        
+        message = await ctx.send(progress_text())
+        reporter = asyncio.create_task(report_progress(message))
+        tasks = [asyncio.create_task(resolve(index, track)) for index, track in enumerate(tracks)]
+        
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # The bot left the voice channel: stop resolving the rest of the playlist
+            for task in tasks:
+                task.cancel()
+            print(f"Stopped loading playlist after adding {state['added']} tracks")
+            return
+        finally:
+            reporter.cancel()
+        
+        try:
+            await message.edit(content=f"Added {state['added']}/{len(tracks)} remaining tracks from the playlist to the queue")
+        except discord.HTTPException:
+            pass
+        print(f"Added {state['added']} tracks from playlist to queue")
     
     async def load_youtube_playlist_tracks(self, ctx, entries):
         """Load tracks from a YouTube playlist in the background"""
@@ -683,6 +855,9 @@ class Music(commands.Cog):
                 queue.position = 0
         else:
             queue.position -= 1
+        
+        # The next track is no longer the one that was prefetched
+        self.invalidate_prefetch(guild_id)
             
         if ctx.voice_client and ctx.voice_client.is_playing():
             ctx.voice_client.stop()
@@ -783,6 +958,7 @@ class Music(commands.Cog):
         """Clear the music queue"""
         queue = self.get_queue(ctx.guild.id)
         queue.clear()
+        self.invalidate_prefetch(ctx.guild.id)
         await ctx.send("Cleared the queue")
     
     @commands.command()
@@ -796,6 +972,7 @@ class Music(commands.Cog):
             return await ctx.send("Invalid track number")
         
         queue.remove(index-1)
+        self.queue_changed(ctx.guild.id)
         await ctx.send(f"Removed track #{index}")
     
     @commands.command()
@@ -803,6 +980,7 @@ class Music(commands.Cog):
         """Shuffle the queue"""
         queue = self.get_queue(ctx.guild.id)
         queue.shuffle()
+        self.queue_changed(ctx.guild.id)
         await ctx.send("Shuffled the queue")
     
     @commands.command()
@@ -820,6 +998,7 @@ class Music(commands.Cog):
         
         queue = self.get_queue(ctx.guild.id)
         queue.loop_mode = mode
+        self.queue_changed(ctx.guild.id)
         await ctx.send(f"Set loop mode to '{mode}'")
     
     @commands.command()
@@ -878,6 +1057,7 @@ class Music(commands.Cog):
         # Limpiar la cola y detener la reproducción
         if ctx.guild.id in self.queues:
             self.queues[ctx.guild.id] = []
+        self.invalidate_prefetch(ctx.guild.id)
         
         ctx.voice_client.stop()
         await ctx.send("⏹️ Reproducción detenida y cola limpiada.")
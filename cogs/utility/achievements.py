@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 import asyncio
-from utils.database import get_user, get_user_achievements, get_user_balance
+from utils.database import run_query, get_user, get_user_achievements, get_user_balance
 
 class Achievements(commands.Cog):
     """Comandos relacionados con logros y estadísticas de usuario"""
@@ -234,23 +234,23 @@ class Achievements(commands.Cog):
         # Obtener datos según el tipo
         try:
             if tipo == "nivel":
-                response = self.bot.supabase.table('users').select('discord_id, username, level').order('level', desc=True).limit(10).execute()
+                response = await run_query(self.bot.supabase.table('users').select('discord_id, username, level').order('level', desc=True).limit(10))
                 title = "Top 10 - Nivel"
                 field_name = "Nivel"
                 field_value = lambda user: user.get('level', 0)
             elif tipo == "xp":
-                response = self.bot.supabase.table('users').select('discord_id, username, xp').order('xp', desc=True).limit(10).execute()
+                response = await run_query(self.bot.supabase.table('users').select('discord_id, username, xp').order('xp', desc=True).limit(10))
                 title = "Top 10 - Experiencia"
                 field_name = "XP"
                 field_value = lambda user: user.get('xp', 0)
             elif tipo == "monedas":
-                response = self.bot.supabase.table('economy').select('user_id, balance').order('balance', desc=True).limit(10).execute()
+                response = await run_query(self.bot.supabase.table('economy').select('user_id, balance').order('balance', desc=True).limit(10))
                 title = "Top 10 - Monedas"
                 field_name = "Monedas"
                 field_value = lambda user: user.get('balance', 0)
             elif tipo == "logros":
                 # Contar logros por usuario
-                response = self.bot.supabase.table('achievements').select('user_id, count').execute()
+                response = await run_query(self.bot.supabase.table('achievements').select('user_id, count'))
                 
                 # Procesar datos para contar por usuario
                 user_counts = {}
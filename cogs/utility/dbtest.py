@@ -1,5 +1,6 @@
 import discord
 from discord.ext import commands
+from utils.database import run_query, get_pool_stats
 
 class DatabaseTest(commands.Cog):
     def __init__(self, bot):
@@ -10,7 +11,7 @@ class DatabaseTest(commands.Cog):
         """Test the database connection"""
         try:
             # Try to query the database
-            response = self.bot.supabase.table('economy').select('*').limit(5).execute()
+            response = await run_query(self.bot.supabase.table('economy').select('*').limit(5))
             
             # Create an embed with the results
             embed = discord.Embed(
@@ -26,6 +27,19 @@ class DatabaseTest(commands.Cog):
                 inline=False
             )
             
+            # Add connection pool metrics
+            stats = get_pool_stats()
+            embed.add_field(
+                name="Connection Pool",
+                value=(
+                    f"In flight: {stats['in_flight']}/{stats['workers']} ({stats['utilization']:.0%})\n"
+                    f"Peak: {stats['peak_in_flight']} | Avg latency: {stats['avg_latency'] * 1000:.0f} ms\n"
+                    f"Failures: {stats['failures']} | Retries: {stats['retries']} | Rejected: {stats['rejected']}\n"
+                    f"Circuit: {stats['circuit']}"
+                ),
+                inline=False
+            )
+            
             # Show some sample data if available
             if response.data:
                 for i, record in enumerate(response.data[:5]):
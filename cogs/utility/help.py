@@ -51,6 +51,7 @@ class Help(commands.Cog):
             "help": "Muestra la lista de comandos o información detallada sobre un comando específico.",
             "reminders": "Establece un recordatorio para más tarde.",
             "dbtest": "Prueba la conexión a la base de datos.",
+            "perf": "Muestra métricas de rendimiento del bot (solo el propietario).",
             "todos": "Gestiona tu lista de tareas pendientes.",
             
             # Comunicación
@@ -124,6 +125,7 @@ class Help(commands.Cog):
             "help": "!help [comando/categoría]",
             "reminders": "!reminders <tiempo> <mensaje>",
             "dbtest": "!dbtest",
+            "perf": "!perf",
             "todos": "!todos [add/remove/list/clear] [tarea]",
             
             # Comunicación
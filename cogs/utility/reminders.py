@@ -1,104 +1,147 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import datetime
-import json
 import os
+import random
 import re
+import time
+from collections import deque
 import dateutil.parser
 from dateutil.relativedelta import relativedelta
+from utils.storage import REMINDER_RETENTION
+
+# Entrega de recordatorios: envíos simultáneos como máximo y reintentos ante errores temporales
+REMINDER_DELIVERY_CONCURRENCY = int(os.getenv("REMINDER_DELIVERY_CONCURRENCY", "10"))
+REMINDER_MAX_RETRIES = int(os.getenv("REMINDER_MAX_RETRIES", "3"))
+REMINDER_RETRY_BASE_DELAY = 1.0
 
 class Reminders(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.reminders = {}
-        self.load_reminders()
-        self.check_reminders.start()
+        # Limits concurrent deliveries so a burst of reminders due at the same time
+        # doesn't open hundreds of DM channels at once
+        self.delivery_semaphore = asyncio.Semaphore(REMINDER_DELIVERY_CONCURRENCY)
+        self.delivery_latencies = deque(maxlen=1000)
+        self.delivery_stats = {'delivered': 0, 'failed': 0, 'retries': 0}
+    
+    async def cog_load(self):
+        """Load reminders from storage, schedule the pending ones and archive the old completed ones"""
+        self.reminders = await self.bot.storage.load("reminders")
+        
+        expired = []
+        current_time = datetime.datetime.now().timestamp()
+        for reminder_id, reminder in self.reminders.items():
+            if not reminder.get("completed", False):
+                self.schedule_reminder(reminder_id)
+            elif reminder["due_time"] + REMINDER_RETENTION <= current_time:
+                expired.append(reminder_id)
+            else:
+                self.schedule_archive(reminder_id)
+        
+        if expired:
+            await self.archive_reminders(expired)
     
     def cog_unload(self):
-        self.check_reminders.cancel()
+        self.bot.scheduler.cancel_namespace("reminders")
+        self.bot.scheduler.cancel_namespace("reminders.archive")
+    
+    def schedule_reminder(self, reminder_id):
+        """Schedule a reminder to fire at its due time"""
+        due_time = self.reminders[reminder_id]["due_time"]
+        self.bot.scheduler.schedule(("reminders", reminder_id), due_time, self.fire_reminder, reminder_id)
+    
+    async def fire_reminder(self, reminder_id):
+        """Mark a reminder as completed and deliver it (scheduler callback)"""
+        await self.bot.wait_until_ready()
+        
+        reminder = self.reminders.get(reminder_id)
+        if reminder is None or reminder.get("completed", False):
+            return
+        
+        reminder["completed"] = True
+        await self.bot.storage.put("reminders", reminder_id, reminder)
+        self.schedule_archive(reminder_id)
+        await self.send_reminder(reminder_id, reminder)
     
-    def load_reminders(self):
-        """Load reminders from file"""
-        config_path = 'config/reminders.json'
-        if os.path.exists(config_path):
+    def schedule_archive(self, reminder_id):
+        """Move a completed reminder to the archive once its retention period is over"""
+        archive_time = self.reminders[reminder_id]["due_time"] + REMINDER_RETENTION
+        self.bot.scheduler.schedule(("reminders.archive", reminder_id), archive_time, self.archive_reminders, [reminder_id])
+    
+    async def archive_reminders(self, reminder_ids):
+        """Remove completed reminders from the working set and append them to the archive"""
+        for reminder_id in reminder_ids:
+            self.reminders.pop(reminder_id, None)
+        await self.bot.storage.archive("reminders", reminder_ids)
+    
+    async def send_reminder(self, reminder_id, reminder):
+        """Send a reminder notification, retrying temporary failures with backoff"""
+        for attempt in range(REMINDER_MAX_RETRIES + 1):
             try:
-                with open(config_path, 'r') as f:
-                    self.reminders = json.load(f)
+                async with self.delivery_semaphore:
+                    await self.deliver_reminder(reminder_id, reminder)
+                break
+            except discord.HTTPException as e:
+                # Rate limits and server errors are worth retrying; anything else isn't
+                retryable = e.status == 429 or e.status >= 500
+                if not retryable or attempt == REMINDER_MAX_RETRIES:
+                    self.delivery_stats['failed'] += 1
+                    print(f"Error sending reminder {reminder_id}: {e}")
+                    return
+                self.delivery_stats['retries'] += 1
+                await asyncio.sleep(REMINDER_RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, REMINDER_RETRY_BASE_DELAY))
             except Exception as e:
-                print(f"Error loading reminders: {e}")
-    
-    def save_reminders(self):
-        """Save reminders to file"""
-        config_path = 'config/reminders.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.reminders, f, indent=4)
-        except Exception as e:
-            print(f"Error saving reminders: {e}")
+                self.delivery_stats['failed'] += 1
+                print(f"Error sending reminder {reminder_id}: {e}")
+                return
+        
+        # End-to-end latency: from the due time to the message being sent
+        self.delivery_stats['delivered'] += 1
+        self.delivery_latencies.append(time.time() - reminder["due_time"])
     
-    @tasks.loop(seconds=30)
-    async def check_reminders(self):
-        """Check for due reminders"""
-        current_time = datetime.datetime.now().timestamp()
-        due_reminders = []
+    async def deliver_reminder(self, reminder_id, reminder):
+        """Send a single reminder to its user or channel"""
+        # Get user (from the cache when possible) and channel
+        user_id = int(reminder["user_id"])
+        user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
         
-        for reminder_id, reminder in self.reminders.items():
-            if reminder["due_time"] <= current_time and not reminder.get("completed", False):
-                # Mark as completed
-                self.reminders[reminder_id]["completed"] = True
-                due_reminders.append(reminder_id)
+        channel_id = reminder.get("channel_id")
+        channel = None
         
-        self.save_reminders()
+        if channel_id:
+            channel = self.bot.get_channel(int(channel_id))
         
-        # Process due reminders
-        for reminder_id in due_reminders:
-            await self.send_reminder(reminder_id)
-    
-    @check_reminders.before_loop
-    async def before_check_reminders(self):
-        await self.bot.wait_until_ready()
-    
-    async def send_reminder(self, reminder_id):
-        """Send a reminder notification"""
-        reminder = self.reminders[reminder_id]
+        # Create embed
+        embed = discord.Embed(
+            title="⏰ Reminder",
+            description=reminder["content"],
+            color=discord.Color.blue(),
+            timestamp=datetime.datetime.now()
+        )
         
-        # Get user and channel
-        try:
-            user = await self.bot.fetch_user(int(reminder["user_id"]))
-            if not user:
-                return
-            
-            channel_id = reminder.get("channel_id")
-            channel = None
-            
-            if channel_id:
-                channel = self.bot.get_channel(int(channel_id))
-            
-            # Create embed
-            embed = discord.Embed(
-                title="⏰ Reminder",
-                description=reminder["content"],
-                color=discord.Color.blue(),
-                timestamp=datetime.datetime.now()
-            )
-            
-            embed.set_footer(text=f"Reminder ID: {reminder_id}")
-            
-            # Send reminder
-            if channel and reminder.get("public", False):
-                await channel.send(f"{user.mention}, here's your reminder:", embed=embed)
-            else:
-                try:
-                    await user.send(embed=embed)
-                except discord.Forbidden:
-                    # If DMs are closed and we have a channel, send there
-                    if channel:
-                        await channel.send(f"{user.mention}, I couldn't DM you, so here's your reminder:", embed=embed)
-            
-        except Exception as e:
-            print(f"Error sending reminder: {e}")
+        embed.set_footer(text=f"Reminder ID: {reminder_id}")
+        
+        # Send reminder
+        if channel and reminder.get("public", False):
+            await channel.send(f"{user.mention}, here's your reminder:", embed=embed)
+        else:
+            try:
+                await user.send(embed=embed)
+            except discord.Forbidden:
+                # If DMs are closed and we have a channel, send there
+                if channel:
+                    await channel.send(f"{user.mention}, I couldn't DM you, so here's your reminder:", embed=embed)
+    
+    def get_delivery_stats(self):
+        """Delivery counters and latency percentiles (in seconds)"""
+        latencies = sorted(self.delivery_latencies)
+        stats = dict(self.delivery_stats)
+        stats['avg_latency'] = sum(latencies) / len(latencies) if latencies else 0.0
+        stats['p95_latency'] = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        stats['max_latency'] = latencies[-1] if latencies else 0.0
+        return stats
     
     @commands.group(invoke_without_command=True, aliases=["remind", "reminder"])
     async def reminders(self, ctx):
@@ -138,7 +181,8 @@ class Reminders(commands.Cog):
             "public": False
         }
         
-        self.save_reminders()
+        await self.bot.storage.put("reminders", reminder_id, self.reminders[reminder_id])
+        self.schedule_reminder(reminder_id)
         
         # Format due time for display
         time_str = due_time.strftime("%Y-%m-%d %H:%M:%S")
@@ -203,7 +247,9 @@ class Reminders(commands.Cog):
         # Remove the reminder
         content = reminder["content"]
         del self.reminders[reminder_id]
-        self.save_reminders()
+        self.bot.scheduler.cancel(("reminders", reminder_id))
+        self.bot.scheduler.cancel(("reminders.archive", reminder_id))
+        await self.bot.storage.delete("reminders", reminder_id)
         
         await ctx.send(f"Reminder canceled: **{content}**")
     
@@ -211,12 +257,15 @@ class Reminders(commands.Cog):
     async def clear_reminders(self, ctx):
         """Clear all your reminders"""
         # Filter reminders for this user
-        user_reminders = {}
+        user_reminders = []
         for reminder_id, reminder in list(self.reminders.items()):
             if reminder["user_id"] == str(ctx.author.id):
                 del self.reminders[reminder_id]
+                self.bot.scheduler.cancel(("reminders", reminder_id))
+                self.bot.scheduler.cancel(("reminders.archive", reminder_id))
+                user_reminders.append(reminder_id)
         
-        self.save_reminders()
+        await self.bot.storage.delete_many("reminders", user_reminders)
         
         await ctx.send("All your reminders have been cleared.")
     
@@ -252,7 +301,8 @@ class Reminders(commands.Cog):
             "public": True
         }
         
-        self.save_reminders()
+        await self.bot.storage.put("reminders", reminder_id, self.reminders[reminder_id])
+        self.schedule_reminder(reminder_id)
         
         # Format due time for display
         time_str = due_time.strftime("%Y-%m-%d %H:%M:%S")
@@ -359,27 +409,14 @@ class TodoList(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.todos = {}
-        self.load_todos()
     
-    def load_todos(self):
-        """Load todos from file"""
-        config_path = 'config/todos.json'
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    self.todos = json.load(f)
-            except Exception as e:
-                print(f"Error loading todos: {e}")
+    async def cog_load(self):
+        """Load todos from storage"""
+        self.todos = await self.bot.storage.load("todos")
     
-    def save_todos(self):
-        """Save todos to file"""
-        config_path = 'config/todos.json'
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.todos, f, indent=4)
-        except Exception as e:
-            print(f"Error saving todos: {e}")
+    async def save_todos(self, user_id):
+        """Save one user's to-do list"""
+        await self.bot.storage.put("todos", user_id, self.todos[user_id])
     
     @commands.group(invoke_without_command=True, aliases=["todo"])
     async def todos(self, ctx):
@@ -405,7 +442,7 @@ class TodoList(commands.Cog):
             "completed": False
         })
         
-        self.save_todos()
+        await self.save_todos(user_id)
         
         await ctx.send(f"✅ Added to your to-do list: **{content}**")
     
@@ -452,7 +489,7 @@ class TodoList(commands.Cog):
                     return await ctx.send("This to-do item is already marked as complete.")
                 
                 todo["completed"] = True
-                self.save_todos()
+                await self.save_todos(user_id)
                 
                 return await ctx.send(f"✅ Marked as complete: **{todo['content']}**")
         
@@ -473,7 +510,7 @@ class TodoList(commands.Cog):
                     return await ctx.send("This to-do item is not marked as complete.")
                 
                 todo["completed"] = False
-                self.save_todos()
+                await self.save_todos(user_id)
                 
                 return await ctx.send(f"📝 Marked as incomplete: **{todo['content']}**")
         
@@ -491,7 +528,7 @@ class TodoList(commands.Cog):
         for i, todo in enumerate(self.todos[user_id]):
             if todo["id"] == todo_id:
                 removed = self.todos[user_id].pop(i)
-                self.save_todos()
+                await self.save_todos(user_id)
                 
                 return await ctx.send(f"🗑️ Removed from your to-do list: **{removed['content']}**")
         
@@ -512,13 +549,13 @@ class TodoList(commands.Cog):
         
         if option.lower() == "all":
             self.todos[user_id] = []
-            self.save_todos()
+            await self.save_todos(user_id)
             
             await ctx.send("🗑️ Cleared your entire to-do list.")
         
         elif option.lower() == "completed":
             self.todos[user_id] = [todo for todo in self.todos[user_id] if not todo["completed"]]
-            self.save_todos()
+            await self.save_todos(user_id)
             
             await ctx.send("🗑️ Cleared all completed items from your to-do list.")
         
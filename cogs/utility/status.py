@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+from utils.database import get_pool_stats, user_cache
 
 class Status(commands.Cog):
     """Comandos para gestionar el estado del bot"""
@@ -174,5 +175,133 @@ class Status(commands.Cog):
             
         await ctx.send(f"✅ Estado eliminado de la rotación: **{status_type}** {status_name}")
 
+    @commands.command(name="perf")
+    @commands.is_owner()
+    async def perf(self, ctx):
+        """
+        Muestra métricas de rendimiento del bot (solo el propietario)
+        
+        Incluye el retraso del event loop, los handlers que más lo bloquean,
+        los últimos callbacks lentos y el uso del pool de la base de datos.
+        """
+        perf = self.bot.perf
+        lag = perf.lag_summary()
+        
+        embed = discord.Embed(
+            title="Rendimiento del Bot",
+            description=f"Umbral de callback lento: {perf.slow_threshold * 1000:.0f} ms",
+            color=discord.Color.blue()
+        )
+        embed.add_field(
+            name="Retraso del event loop",
+            value=(
+                f"Actual: {lag['current'] * 1000:.1f} ms | Medio: {lag['avg'] * 1000:.1f} ms\n"
+                f"p95: {lag['p95'] * 1000:.1f} ms | Máximo: {lag['max'] * 1000:.1f} ms"
+            ),
+            inline=False
+        )
+        
+        # Handlers que más bloquean el loop
+        top = perf.top_handlers(limit=5)
+        if top:
+            lines = []
+            for name, stats in top:
+                avg = stats['total_time'] / stats['calls'] * 1000
+                lines.append(
+                    f"`{name}` ({stats['cog'] or 'main'}): bloqueo máx {stats['max_blocking'] * 1000:.0f} ms, "
+                    f"media {avg:.0f} ms, {stats['calls']} llamadas, {stats['slow_calls']} lentas"
+                )
+            embed.add_field(name="Handlers", value="\n".join(lines), inline=False)
+        
+        # Últimos callbacks lentos
+        slow = list(perf.slow_callbacks)[-5:]
+        if slow:
+            lines = [
+                f"<t:{int(entry['time'])}:R> `{entry['handler']}`: {entry['blocking'] * 1000:.0f} ms bloqueando"
+                for entry in reversed(slow)
+            ]
+            embed.add_field(name="Callbacks lentos recientes", value="\n".join(lines), inline=False)
+        
+        # Pool de la base de datos
+        db = get_pool_stats()
+        users = user_cache.stats()
+        embed.add_field(
+            name="Base de datos",
+            value=(
+                f"En vuelo: {db['in_flight']}/{db['workers']} ({db['utilization']:.0%}) | Pico: {db['peak_in_flight']}\n"
+                f"Latencia media: {db['avg_latency'] * 1000:.0f} ms | Circuito: {db['circuit']}\n"
+                f"Caché de usuarios: {users['size']}/{users['maxsize']} ({users['hit_rate']:.0%} aciertos)"
+            ),
+            inline=False
+        )
+
+        # Pipeline de mensajes
+        pipeline = self.bot.message_pipeline.stats()
+        stage_lines = [
+            f"`{name}`: media {stage['avg_ms']:.1f} ms, máx {stage['max_ms']:.0f} ms"
+            for name, stage in pipeline['stages'].items()
+        ]
+        embed.add_field(
+            name="Pipeline de mensajes",
+            value="\n".join([
+                f"Procesados: {pipeline['processed']} | Detenidos: {pipeline['stopped']}"
+            ] + stage_lines),
+            inline=False
+        )
+
+        # Temporizadores de recordatorios y sorteos
+        timers = self.bot.scheduler.stats()
+        embed.add_field(
+            name="Temporizadores",
+            value=(
+                f"Pendientes: {timers['pending']} | Ejecutados: {timers['fired']}\n"
+                f"Retraso medio: {timers['avg_lateness_ms']:.0f} ms | Máximo: {timers['max_lateness_ms']:.0f} ms"
+            ),
+            inline=False
+        )
+
+        # Entrega de recordatorios
+        reminders_cog = self.bot.get_cog("Reminders")
+        if reminders_cog:
+            delivery = reminders_cog.get_delivery_stats()
+            embed.add_field(
+                name="Recordatorios",
+                value=(
+                    f"Entregados: {delivery['delivered']} | Fallidos: {delivery['failed']} | Reintentos: {delivery['retries']}\n"
+                    f"Latencia media: {delivery['avg_latency'] * 1000:.0f} ms | p95: {delivery['p95_latency'] * 1000:.0f} ms"
+                ),
+                inline=False
+            )
+
+        # Caché de pistas de música
+        music_cog = self.bot.get_cog("Music")
+        if music_cog:
+            tracks = music_cog.track_cache.stats()
+            matches = music_cog.spotify_matches.stats()
+            embed.add_field(
+                name="Caché de música",
+                value=(
+                    f"Metadatos: {tracks['metadata']['size']} ({tracks['metadata']['hit_rate']:.0%} aciertos)\n"
+                    f"URLs de audio: {tracks['streams']['size']} ({tracks['streams']['hit_rate']:.0%} aciertos)\n"
+                    f"Spotify -> YouTube: {matches['size']} ({matches['hit_rate']:.0%} aciertos)"
+                ),
+                inline=False
+            )
+
+            # Pool de extracciones de yt-dlp
+            extractor = music_cog.extractor.stats()
+            queued = extractor['queued']
+            embed.add_field(
+                name="Extracciones yt-dlp",
+                value=(
+                    f"En curso: {extractor['running']}/{extractor['workers']} | "
+                    f"En cola (actual/precarga/fondo): {queued['now_playing']}/{queued['prefetch']}/{queued['background']} | Pico: {extractor['peak_queued']}\n"
+                    f"Espera media: {extractor['avg_wait_ms']:.0f} ms | Máxima: {extractor['max_wait_ms']:.0f} ms | Canceladas: {extractor['cancelled']}"
+                ),
+                inline=False
+            )
+
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Status(bot))
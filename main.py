@@ -2,8 +2,15 @@ import os
 import discord
 from discord.ext import commands, tasks
 import asyncio
+import time
 from dotenv import load_dotenv
-from utils.database import supabase, create_tables, get_user, create_user, add_punishment, record_message, update_user_xp, add_achievement
+from utils.database import supabase, run_query, create_tables, known_users, load_known_users, bulk_create_users, recorded_bans, load_recorded_bans, bulk_add_punishments, add_achievement, get_pool_stats, user_cache
+from utils.write_buffer import WriteBehindBuffer
+from utils.perf import PerfMonitor
+from utils.config_store import ConfigStore
+from utils.storage import create_storage
+from utils.scheduler import Scheduler
+from utils.message_pipeline import MessagePipeline, STAGE_COMMANDS, STAGE_ACCOUNTING, STAGE_ACHIEVEMENTS
 
 # Load environment variables
 load_dotenv()
@@ -29,6 +36,16 @@ class ZenShellBot(commands.Bot):
             discord.Game(name="Usa !status para cambiarme"),
         ]
         self.supabase = supabase  # Assign supabase client to the bot
+        self.write_buffer = WriteBehindBuffer()  # Buffer de mensajes y XP escritos en bloque
+        self.recorded_bans_loaded = False  # Si ya se cargaron los bans registrados en la base de datos
+        self.perf = PerfMonitor()  # Monitor del retraso del event loop y de handlers lentos
+        self.perf.add_source("database", get_pool_stats)
+        self.perf.add_source("user_cache", user_cache.stats)
+        self.message_pipeline = MessagePipeline(self)  # Etapas que procesan cada mensaje
+        self.perf.add_source("pipeline", self.message_pipeline.stats)
+        self.config_store = ConfigStore()  # Escritura diferida y atómica de los ficheros config/*.json
+        self.storage = create_storage(self.config_store)  # Recordatorios, sorteos, encuestas, tareas y rachas
+        self.scheduler = Scheduler()  # Temporizadores de recordatorios y sorteos
         
     def get_total_users(self):
         """Obtiene el número total de usuarios únicos en todos los servidores"""
@@ -41,6 +58,43 @@ class ZenShellBot(commands.Bot):
     async def setup_hook(self):
         # Iniciar la tarea de rotación de estado
         self.rotate_status.start()
+        
+        # Iniciar el vaciado periódico del buffer de escritura
+        self.write_buffer.start()
+        
+        # Iniciar el monitor de rendimiento
+        self.perf.start()
+        
+        # Ejecutar los temporizadores restaurados por los cogs: hasta iniciar sesión
+        # wait_until_ready() lanza RuntimeError y los vencidos se perderían
+        self.scheduler.start()
+    
+    async def close(self):
+        # Escribir los mensajes y el XP pendientes antes de cerrar
+        await self.write_buffer.close()
+        self.perf.stop()
+        await super().close()
+        self.scheduler.stop()
+        # Los cogs ya se descargaron: cerrar el almacenamiento y escribir los ficheros pendientes
+        await self.storage.close()
+        await self.config_store.close()
+    
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Medir cada handler de evento (de main o de un cog) para el monitor de rendimiento
+        cog = getattr(getattr(coro, '__self__', None), 'qualified_name', None)
+        name = getattr(coro, '__qualname__', event_name)
+        
+        async def timed_handler(*args, **kwargs):
+            return await self.perf.measure(name, cog, coro(*args, **kwargs))
+        
+        await super()._run_event(timed_handler, event_name, *args, **kwargs)
+    
+    async def invoke(self, ctx):
+        # Medir también cada comando, atribuido a su cog
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        cog = ctx.cog.qualified_name if ctx.cog else None
+        await self.perf.measure(f"!{ctx.command.qualified_name}", cog, super().invoke(ctx))
     
     @tasks.loop(minutes=5.0)
     async def rotate_status(self):
@@ -90,12 +144,12 @@ async def on_ready():
     
     # Verificar la conexión a la base de datos
     try:
-        response = bot.supabase.table('users').select('*').limit(1).execute()
+        response = await run_query(bot.supabase.table('users').select('*').limit(1))
         print("Database connection successful!")
     except Exception as e:
         print(f"Database connection error: {e}")
     
-    # Sincronizar usuarios con la base de datos
+    # Sincronizar usuarios con la base de datos (también carga el índice de usuarios conocidos)
     await sync_all_users()
     
     # Iniciar tarea de sincronización periódica (cada 6 horas)
@@ -109,41 +163,117 @@ async def on_ready():
 async def sync_all_users():
     """Sincroniza todos los usuarios de todos los servidores con la base de datos"""
     print("Starting user synchronization...")
-    total_users = 0
+    start_time = time.perf_counter()
     
+    # Recoger los miembros de todos los servidores (sin bots ni duplicados)
+    members = {}
     for guild in bot.guilds:
-        print(f"Synchronizing users from {guild.name}...")
-        
-        # Obtener todos los miembros del servidor
-        members = guild.members
-        
-        # Sincronizar cada miembro con la base de datos
-        for member in members:
+        for member in guild.members:
             if not member.bot:  # Ignorar bots
-                # Verificar si el usuario ya existe en la base de datos
-                user = await get_user(member.id)
-                
-                if not user:
-                    # Crear el usuario si no existe
-                    discriminator = member.discriminator if hasattr(member, 'discriminator') else '0000'
-                    await create_user(member.id, member.name, discriminator)
-                    total_users += 1
+                members[member.id] = member
+    
+    # Obtener los usuarios existentes con una sola lectura y calcular los que faltan
+    try:
+        await load_known_users()
+    except Exception as e:
+        print(f"Error loading known users: {e}")
+    missing = [member for member_id, member in members.items() if member_id not in known_users]
+    
+    new_users = []
+    for member in missing:
+        discriminator = member.discriminator if hasattr(member, 'discriminator') else '0000'
+        new_users.append({
+            'discord_id': member.id,
+            'username': member.name,
+            'discriminator': discriminator
+        })
+    
+    # Crear los usuarios que faltan en bloques
+    total_users = 0
+    if new_users:
+        print(f"Creating {len(new_users)} of {len(members)} members...")
+        try:
+            total_users = await bulk_create_users(
+                new_users,
+                progress=lambda done, total: print(f"  {done}/{total} users created")
+            )
+        except Exception as e:
+            print(f"Error creating users: {e}")
     
     # Sincronizar bans
+    await sync_bans()
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"User synchronization complete! Added {total_users} new users to the database in {elapsed:.1f}s.")
+
+async def sync_bans():
+    """Registra en la base de datos los bans nuevos de todos los servidores
+    
+    Compara la lista de bans de cada servidor con recorded_bans (pares servidor-usuario):
+    solo se insertan los bans que faltan, así las sincronizaciones periódicas no duplican
+    filas en punishments, y los que ya no están se olvidan para registrar un ban posterior.
+    """
+    # Bans actuales de todos los servidores, por (servidor, usuario)
+    current_bans = {}
+    fetched_guilds = set()
     for guild in bot.guilds:
         try:
-            # Usar list() para convertir el generador asíncrono a una lista
-            bans = [ban async for ban in guild.bans()]
-            for ban_entry in bans:
-                # Registrar el ban en la base de datos si el usuario existe
-                try:
-                    await add_punishment(ban_entry.user.id, "ban", ban_entry.reason or "No reason provided")
-                except Exception as e:
-                    print(f"Error registering ban for {ban_entry.user.name}: {e}")
+            guild_bans = {}
+            async for ban_entry in guild.bans():
+                guild_bans[(guild.id, ban_entry.user.id)] = ban_entry
         except Exception as e:
             print(f"Error fetching bans from {guild.name}: {e}")
+            continue
+        current_bans.update(guild_bans)
+        fetched_guilds.add(guild.id)
+    
+    # Cargar una vez los bans ya registrados; después se mantiene en memoria
+    if not bot.recorded_bans_loaded:
+        try:
+            await load_recorded_bans(set(current_bans))
+            bot.recorded_bans_loaded = True
+        except Exception as e:
+            print(f"Error loading recorded bans: {e}")
+            return
+    
+    # Desbaneos: el próximo ban de ese usuario en ese servidor se registrará de nuevo
+    recorded_bans.difference_update([
+        key for key in recorded_bans
+        if key[0] in fetched_guilds and key not in current_bans
+    ])
+    
+    new_bans = [(key, ban_entry) for key, ban_entry in current_bans.items() if key not in recorded_bans]
+    if not new_bans:
+        return
     
-    print(f"User synchronization complete! Added {total_users} new users to the database.")
+    def mark_recorded(inserted, total):
+        # Se marcan por bloques: si falla uno, los anteriores no se insertan otra vez
+        recorded_bans.update(key for key, _ in new_bans[:inserted])
+    
+    try:
+        # Los usuarios baneados deben existir antes de registrar el castigo
+        banned_users = {ban_entry.user.id: ban_entry.user for _, ban_entry in new_bans}
+        await bulk_create_users([
+            {
+                'discord_id': user_id,
+                'username': user.name,
+                'discriminator': getattr(user, 'discriminator', '0000')
+            }
+            for user_id, user in banned_users.items()
+            if user_id not in known_users
+        ])
+        await bulk_add_punishments([
+            {
+                'user_id': user_id,
+                'punishment_type': "ban",
+                'reason': ban_entry.reason or "No reason provided",
+                'duration': None
+            }
+            for (guild_id, user_id), ban_entry in new_bans
+        ], progress=mark_recorded)
+        print(f"Registered {len(new_bans)} new bans")
+    except Exception as e:
+        print(f"Error registering bans: {e}")
 
 async def periodic_sync(interval):
     """Ejecuta la sincronización de usuarios periódicamente"""
@@ -156,45 +286,62 @@ async def on_message(message):
     # Ignore messages from bots
     if message.author.bot:
         return
-        
-    # Process commands
-    await bot.process_commands(message)
     
-    try:
-        # Record the message in the database
-        await record_message(message.author.id, message.content)
-        
-        # Add XP for the message
-        await update_user_xp(message.author.id, 1)  # 1 XP per message
-        
-        # Check for message count achievements
-        user_id = message.author.id
-        if user_id in bot.message_counts:
-            bot.message_counts[user_id] += 1
-        else:
-            bot.message_counts[user_id] = 1
-        
-        # Message count achievements
-        if bot.message_counts[user_id] == 10:
-            await add_achievement(message.author.id, "Chatty")
-            try:
-                await message.channel.send(f"🏆 {message.author.mention} ha conseguido el logro **Chatty**!")
-            except:
-                pass
-        elif bot.message_counts[user_id] == 100:
-            await add_achievement(message.author.id, "Conversador")
-            try:
-                await message.channel.send(f"🏆 {message.author.mention} ha conseguido el logro **Conversador**!")
-            except:
-                pass
-        elif bot.message_counts[user_id] == 1000:
-            await add_achievement(message.author.id, "Comunicador Experto")
-            try:
-                await message.channel.send(f"🏆 {message.author.mention} ha conseguido el logro **Comunicador Experto**!")
-            except:
-                pass
-    except Exception as e:
-        print(f"Error in on_message event: {e}")
+    # Todas las etapas (automod, comandos, XP, logros) se ejecutan en orden en el pipeline
+    await bot.message_pipeline.process(message)
+
+async def process_commands_stage(ctx):
+    """Etapa del pipeline: procesa los comandos del bot"""
+    if ctx.is_command:
+        await bot.process_commands(ctx.message)
+
+async def record_message_stage(ctx):
+    """Etapa del pipeline: registra el mensaje y suma XP"""
+    # Record the message and add XP (written to the database in batches)
+    await bot.write_buffer.add_message(ctx.author.id, ctx.author.name, ctx.content, 1)  # 1 XP per message
+
+# Logros por nivel alcanzado
+LEVEL_ACHIEVEMENTS = {
+    5: "Reached Level 5",
+    10: "Reached Level 10",
+    25: "Reached Level 25",
+    50: "Reached Level 50",
+    100: "Reached Level 100"
+}
+
+async def message_achievements_stage(ctx):
+    """Etapa del pipeline: logros por número de mensajes y por nivel"""
+    # Check for message count achievements
+    user_id = ctx.author.id
+    if user_id in bot.message_counts:
+        bot.message_counts[user_id] += 1
+    else:
+        bot.message_counts[user_id] = 1
+    
+    # Message count achievements
+    achievements = {
+        10: "Chatty",
+        100: "Conversador",
+        1000: "Comunicador Experto"
+    }
+    achievement = achievements.get(bot.message_counts[user_id])
+    if achievement:
+        await add_achievement(user_id, achievement)
+        try:
+            await ctx.channel.send(f"🏆 {ctx.author.mention} ha conseguido el logro **{achievement}**!")
+        except:
+            pass
+    
+    # Level achievements: only when the leveling stage reported a level up for this message,
+    # so ordinary messages don't look up the author's row at all
+    if ctx.new_level is not None:
+        achievement = LEVEL_ACHIEVEMENTS.get(ctx.new_level)
+        if achievement:
+            await add_achievement(user_id, achievement)
+
+bot.message_pipeline.add_stage("commands", process_commands_stage, STAGE_COMMANDS)
+bot.message_pipeline.add_stage("record_message", record_message_stage, STAGE_ACCOUNTING)
+bot.message_pipeline.add_stage("message_achievements", message_achievements_stage, STAGE_ACHIEVEMENTS)
 
 # Run the bot
 async def main():
@@ -0,0 +1,127 @@
+-- Funciones de base de datos usadas por ZenShell.
+-- Ejecuta este archivo en el editor SQL de Supabase; se invocan vía RPC desde utils/database.py.
+
+-- Suma XP a un usuario y calcula su nuevo nivel en una sola operación atómica.
+-- Fórmula: 100 * nivel^2 XP para pasar al siguiente nivel.
+-- Crea el usuario si no existe y devuelve la fila actualizada con el campo level_up.
+create or replace function add_user_xp(p_discord_id bigint, p_xp_amount integer, p_username text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_user users%rowtype;
+    v_xp integer;
+    v_level integer;
+    v_level_up boolean := false;
+begin
+    insert into users (discord_id, username, discriminator)
+    values (p_discord_id, coalesce(p_username, 'User_' || p_discord_id), '0000')
+    on conflict (discord_id) do nothing;
+
+    -- Bloquear la fila: los incrementos concurrentes del mismo usuario se serializan
+    select * into v_user from users where discord_id = p_discord_id for update;
+
+    v_xp := coalesce(v_user.xp, 0) + p_xp_amount;
+    v_level := coalesce(v_user.level, 1);
+    while v_xp >= 100 * v_level * v_level loop
+        v_xp := v_xp - 100 * v_level * v_level;
+        v_level := v_level + 1;
+        v_level_up := true;
+    end loop;
+
+    update users
+    set xp = v_xp, level = v_level, last_active = now()
+    where discord_id = p_discord_id
+    returning * into v_user;
+
+    return to_jsonb(v_user) || jsonb_build_object('level_up', v_level_up);
+end;
+$$;
+
+-- Aplica en bloque los deltas de XP acumulados por el buffer de escritura.
+-- p_deltas: [{"discord_id": ..., "xp": ..., "username": ...}, ...]
+-- Devuelve un array con las filas actualizadas (mismo formato que add_user_xp).
+drop function if exists add_users_xp(jsonb);
+create or replace function add_users_xp(p_deltas jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_delta jsonb;
+    v_users jsonb := '[]'::jsonb;
+begin
+    -- Orden fijo por discord_id para evitar interbloqueos entre lotes concurrentes
+    for v_delta in
+        select value from jsonb_array_elements(p_deltas) order by (value->>'discord_id')::bigint
+    loop
+        v_users := v_users || jsonb_build_array(add_user_xp(
+            (v_delta->>'discord_id')::bigint,
+            (v_delta->>'xp')::integer,
+            v_delta->>'username'
+        ));
+    end loop;
+
+    return v_users;
+end;
+$$;
+
+-- Suma p_delta al saldo de un usuario en una sola operación atómica y devuelve el nuevo saldo.
+-- Nunca deja el saldo en negativo: si el saldo actual es menor que max(p_required, -p_delta)
+-- no modifica nada y devuelve null. p_required permite exigir un saldo mínimo (p. ej. la apuesta).
+create or replace function increment_balance(p_user_id bigint, p_delta bigint, p_required bigint default 0)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_balance bigint;
+begin
+    if p_delta >= 0 and p_required <= 0 then
+        insert into economy (user_id, balance)
+        values (p_user_id, p_delta)
+        on conflict (user_id) do update set balance = economy.balance + excluded.balance
+        returning balance into v_balance;
+    else
+        update economy
+        set balance = balance + p_delta
+        where user_id = p_user_id and balance >= greatest(p_required, -p_delta)
+        returning balance into v_balance;
+    end if;
+
+    return v_balance;
+end;
+$$;
+
+-- Transfiere p_amount monedas de p_from a p_to en una sola transacción.
+-- Devuelve {"from_balance": ..., "to_balance": ...} o null si el emisor no tiene saldo suficiente.
+create or replace function transfer_balance(p_from bigint, p_to bigint, p_amount bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_from_balance bigint;
+    v_to_balance bigint;
+begin
+    if p_amount <= 0 or p_from = p_to then
+        return null;
+    end if;
+
+    -- Bloquear ambas filas en orden fijo para evitar interbloqueos entre transferencias cruzadas
+    perform 1 from economy where user_id in (p_from, p_to) order by user_id for update;
+
+    update economy
+    set balance = balance - p_amount
+    where user_id = p_from and balance >= p_amount
+    returning balance into v_from_balance;
+
+    if v_from_balance is null then
+        return null;
+    end if;
+
+    insert into economy (user_id, balance)
+    values (p_to, p_amount)
+    on conflict (user_id) do update set balance = economy.balance + excluded.balance
+    returning balance into v_to_balance;
+
+    return jsonb_build_object('from_balance', v_from_balance, 'to_balance', v_to_balance);
+end;
+$$;
@@ -0,0 +1,38 @@
+from utils.automod_rules import GuildRules
+
+def make_config(words, caps_enabled=False, whole_word=False):
+    return {
+        "filters": {
+            "banned_words": {"enabled": True, "words": list(words), "whole_word": whole_word},
+            "caps": {"enabled": caps_enabled, "threshold": 70}
+        },
+        "punishments": {"banned_words": "delete"}
+    }
+
+def banned_word_matcher(rules):
+    check = dict(rules.filters)["banned_words"]
+    return check.__self__
+
+def test_unrelated_setting_change_reuses_matcher():
+    words = [f"palabra{i}" for i in range(1000)]
+    before = GuildRules(make_config(words))
+    after = GuildRules(make_config(words, caps_enabled=True))
+
+    assert banned_word_matcher(after) is banned_word_matcher(before)
+    assert [name for name, _ in after.filters] == ["banned_words", "caps"]
+
+def test_word_list_change_rebuilds_matcher():
+    before = GuildRules(make_config(["uno", "dos"]))
+    after = GuildRules(make_config(["uno", "dos", "tres"]))
+
+    assert banned_word_matcher(after) is not banned_word_matcher(before)
+    assert after.check("uno dos tres") == "banned_words"
+    assert before.check("solo tres") is None
+    assert after.check("solo tres") == "banned_words"
+
+def test_whole_word_is_part_of_the_key():
+    substring = GuildRules(make_config(["spam"]))
+    whole_word = GuildRules(make_config(["spam"], whole_word=True))
+
+    assert substring.check("spammy") == "banned_words"
+    assert whole_word.check("spammy") is None
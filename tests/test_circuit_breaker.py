@@ -0,0 +1,69 @@
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_breaker(monkeypatch, threshold=2, reset_timeout=30):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return CircuitBreaker(failure_threshold=threshold, reset_timeout=reset_timeout), clock
+
+def open_circuit(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+def test_opens_after_threshold(monkeypatch):
+    breaker, _ = make_breaker(monkeypatch)
+    open_circuit(breaker)
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    assert breaker.times_opened == 1
+
+def test_half_open_admits_a_single_probe(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch)
+    open_circuit(breaker)
+    clock.now += 30
+
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    # Concurrent callers are rejected while the probe is in flight
+    assert not breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request() and breaker.allow_request()
+
+def test_failed_probe_reopens(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch)
+    open_circuit(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    assert breaker.times_opened == 2
+
+    # After another reset_timeout a new single probe is admitted
+    clock.now += 30
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+def test_lost_probe_is_replaced_after_timeout(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch)
+    open_circuit(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    clock.now += 10
+    assert not breaker.allow_request()
+    # The probe never reported back (e.g. its task was cancelled)
+    clock.now += 30
+    assert breaker.allow_request()
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import threading
+import utils.config_store as config_store
+from utils.config_store import ConfigStore
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+def test_scheduled_flush_keeps_task_reference(tmp_path):
+    path = str(tmp_path / "settings.json")
+
+    async def scenario():
+        store = ConfigStore(flush_delay=0.01)
+        store.save(path, {"a": 1})
+        await asyncio.sleep(0.02)
+        assert store._flush_task is not None
+        await store._flush_task
+        await store.close()
+        return store
+
+    store = asyncio.run(scenario())
+    assert read(path) == {"a": 1}
+    assert store.stats()['writes'] == 1
+
+def test_failed_write_is_retried(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    write_atomic = config_store._write_atomic
+    attempts = []
+
+    def flaky_write(target, payload):
+        attempts.append(target)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        write_atomic(target, payload)
+
+    monkeypatch.setattr(config_store, "_write_atomic", flaky_write)
+
+    async def scenario():
+        store = ConfigStore(flush_delay=0.01)
+        store.save(path, {"a": 1})
+        await store.flush()
+        assert path in store.dirty
+        assert store._flush_handle is not None
+        await asyncio.sleep(0.05)
+        await store.close()
+        return store
+
+    store = asyncio.run(scenario())
+    assert len(attempts) == 2
+    assert read(path) == {"a": 1}
+    assert not store.dirty
+
+def test_newer_save_wins_over_failed_write(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    write_atomic = config_store._write_atomic
+    store = None
+
+    def failing_write(target, payload):
+        # Llega un cambio nuevo mientras la escritura anterior está fallando
+        store.dirty[target] = {"a": 2}
+        raise OSError("disk full")
+
+    async def scenario():
+        nonlocal store
+        store = ConfigStore(flush_delay=10)
+        monkeypatch.setattr(config_store, "_write_atomic", failing_write)
+        store.save(path, {"a": 1})
+        await store.flush()
+        assert store.dirty[path] == {"a": 2}
+        monkeypatch.setattr(config_store, "_write_atomic", write_atomic)
+        await store.close()
+
+    asyncio.run(scenario())
+    assert read(path) == {"a": 2}
+
+def test_unserializable_data_stays_dirty(tmp_path):
+    path = str(tmp_path / "settings.json")
+
+    async def scenario():
+        store = ConfigStore(flush_delay=10)
+        store.dirty[path] = {"bad": object()}
+        await store.flush()
+        assert path in store.dirty
+        await store.close()
+        return store
+
+    store = asyncio.run(scenario())
+    assert store.stats()['writes'] == 0
+
+def test_close_does_not_block_the_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    release = threading.Event()
+    write_atomic = config_store._write_atomic
+
+    def slow_write(target, payload):
+        release.wait(1)
+        write_atomic(target, payload)
+
+    monkeypatch.setattr(config_store, "_write_atomic", slow_write)
+
+    async def scenario():
+        store = ConfigStore(flush_delay=0)
+        store.save(path, {"a": 1})
+        await asyncio.sleep(0.01)
+        closing = asyncio.create_task(store.close())
+        ticks = 0
+        while not closing.done():
+            ticks += 1
+            if ticks == 5:
+                release.set()
+            await asyncio.sleep(0.01)
+        await closing
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+    assert read(path) == {"a": 1}
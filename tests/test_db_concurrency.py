@@ -0,0 +1,108 @@
+"""Tests de concurrencia de las funciones atómicas de sql/functions.sql
+
+Lanzan muchas llamadas simultáneas a add_user_xp, increment_balance y transfer_balance
+y comprueban que no se pierde ningún incremento y que ningún saldo queda en negativo.
+
+Escriben en la base de datos configurada (URL_SUPABASE/SUPABASE_KEY) con usuarios de
+prueba que se borran al terminar, así que solo se ejecutan con ZENSHELL_DB_TESTS=1:
+
+    ZENSHELL_DB_TESTS=1 python -m pytest tests/test_db_concurrency.py
+"""
+import os
+import asyncio
+import pytest
+
+if not os.getenv("ZENSHELL_DB_TESTS"):
+    pytest.skip("database tests disabled (set ZENSHELL_DB_TESTS=1)", allow_module_level=True)
+
+database = pytest.importorskip("utils.database")
+
+# IDs fuera del rango de los snowflakes reales de Discord
+TEST_USER_A = 900000000000000001
+TEST_USER_B = 900000000000000002
+CONCURRENCY = 100
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def cleanup(*user_ids):
+    for user_id in user_ids:
+        await database.run_query(database.supabase.table('economy').delete().eq('user_id', user_id))
+        await database.run_query(database.supabase.table('users').delete().eq('discord_id', user_id))
+        database.invalidate_user(user_id)
+        database.known_users.discard(user_id)
+
+@pytest.fixture
+def test_users():
+    run(cleanup(TEST_USER_A, TEST_USER_B))
+    yield TEST_USER_A, TEST_USER_B
+    run(cleanup(TEST_USER_A, TEST_USER_B))
+
+def total_xp(user):
+    """XP acumulado desde el nivel 1 (100 * nivel^2 por nivel superado)"""
+    return sum(100 * level * level for level in range(1, user['level'])) + user['xp']
+
+def test_concurrent_xp_updates_are_not_lost(test_users):
+    user_id, _ = test_users
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            database.update_user_xp(user_id, 10, "zenshell-test") for _ in range(CONCURRENCY)
+        ))
+        assert all(result is not None for result in results)
+        database.invalidate_user(user_id)
+        return await database.get_user(user_id)
+
+    user = run(scenario())
+    assert total_xp(user) == 10 * CONCURRENCY
+
+def test_concurrent_debits_never_overdraw(test_users):
+    user_id, _ = test_users
+    starting_balance = 1000
+    bet = 15
+
+    async def scenario():
+        assert await database.increment_user_balance(user_id, starting_balance) == starting_balance
+        results = await asyncio.gather(*(
+            database.increment_user_balance(user_id, -bet, required=bet) for _ in range(CONCURRENCY)
+        ))
+        return results, await database.get_user_balance(user_id)
+
+    results, balance = run(scenario())
+    successes = [result for result in results if result is not None]
+    assert len(successes) == starting_balance // bet
+    assert balance == starting_balance - bet * len(successes)
+    assert balance >= 0
+    assert min(successes) == balance
+
+def test_concurrent_transfers_conserve_coins(test_users):
+    user_a, user_b = test_users
+    starting_balance = 500
+
+    async def scenario():
+        await database.increment_user_balance(user_a, starting_balance)
+        await database.increment_user_balance(user_b, starting_balance)
+        # Transferencias cruzadas en ambos sentidos a la vez (el caso que podría interbloquearse)
+        transfers = [(user_a, user_b, 10) if i % 2 else (user_b, user_a, 7) for i in range(CONCURRENCY * 2)]
+        results = await asyncio.gather(*(
+            database.transfer_balance(from_id, to_id, amount) for from_id, to_id, amount in transfers
+        ))
+        balances = (await database.get_user_balance(user_a), await database.get_user_balance(user_b))
+        return transfers, results, balances
+
+    transfers, results, (balance_a, balance_b) = run(scenario())
+    assert balance_a >= 0 and balance_b >= 0
+    assert balance_a + balance_b == 2 * starting_balance
+
+    # Cada transferencia que tuvo éxito se refleja exactamente una vez en los saldos finales
+    moved_to_b = sum(
+        amount if from_id == user_a else -amount
+        for (from_id, _, amount), result in zip(transfers, results)
+        if result is not None
+    )
+    assert balance_b == starting_balance + moved_to_b
+
+def test_transfer_to_self_is_rejected(test_users):
+    user_a, _ = test_users
+    with pytest.raises(ValueError):
+        run(database.transfer_balance(user_a, user_a, 10))
@@ -0,0 +1,118 @@
+"""Tests del pipeline de mensajes: fila de usuario compartida y contadores por etapa
+
+utils.database crea el cliente de Supabase al importarse, así que estos tests necesitan
+las dependencias del bot y URL_SUPABASE/SUPABASE_KEY (no se hace ninguna consulta real).
+"""
+import os
+import asyncio
+import types
+import pytest
+
+pytest.importorskip("supabase")
+if not (os.getenv("URL_SUPABASE") and os.getenv("SUPABASE_KEY")):
+    pytest.skip("URL_SUPABASE/SUPABASE_KEY not configured", allow_module_level=True)
+
+from utils import message_pipeline
+from utils.message_pipeline import MessagePipeline
+from utils.perf import PerfMonitor
+
+def make_message(content="hola"):
+    author = types.SimpleNamespace(id=42, name="alice")
+    return types.SimpleNamespace(author=author, guild=object(), channel=object(), content=content)
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    lookups = []
+
+    async def fake_get_user(discord_id):
+        lookups.append(discord_id)
+        return {'discord_id': discord_id, 'level': 1, 'xp': 0}
+
+    monkeypatch.setattr(message_pipeline, "get_user", fake_get_user)
+    bot = types.SimpleNamespace(command_prefix='!', perf=PerfMonitor())
+    return MessagePipeline(bot), lookups
+
+def test_user_row_is_loaded_once_per_message(pipeline):
+    pipeline, lookups = pipeline
+    seen = []
+
+    async def first(ctx):
+        seen.append(await ctx.get_user())
+
+    async def second(ctx):
+        seen.append(await ctx.get_user())
+
+    pipeline.add_stage("first", first, 10)
+    pipeline.add_stage("second", second, 20)
+    asyncio.run(pipeline.process(make_message()))
+
+    assert lookups == [42]
+    assert seen[0] is seen[1]
+
+def test_set_user_is_shared_with_later_stages(pipeline):
+    pipeline, lookups = pipeline
+    updated = {'discord_id': 42, 'level': 5, 'xp': 0, 'level_up': True}
+    seen = []
+
+    async def accounting(ctx):
+        ctx.set_user(updated)
+
+    async def achievements(ctx):
+        seen.append(await ctx.get_user())
+
+    pipeline.add_stage("achievements", achievements, 30)
+    pipeline.add_stage("accounting", accounting, 20)
+    asyncio.run(pipeline.process(make_message()))
+
+    assert lookups == []
+    assert seen == [updated]
+
+def test_level_up_is_flagged_without_a_lookup(pipeline):
+    pipeline, lookups = pipeline
+    levels = []
+
+    async def accounting(ctx):
+        if ctx.content == "sube":
+            ctx.set_user({'discord_id': 42, 'level': 5, 'xp': 0, 'level_up': True})
+            ctx.new_level = 5
+
+    async def achievements(ctx):
+        levels.append(ctx.new_level)
+
+    pipeline.add_stage("accounting", accounting, 20)
+    pipeline.add_stage("achievements", achievements, 30)
+
+    async def scenario():
+        await pipeline.process(make_message("hola"))
+        await pipeline.process(make_message("sube"))
+
+    asyncio.run(scenario())
+    assert levels == [None, 5]
+    assert lookups == []
+
+def test_stop_and_stage_counters(pipeline):
+    pipeline, _ = pipeline
+
+    async def moderation(ctx):
+        if "spam" in ctx.content_lower:
+            ctx.stop("spam")
+
+    async def accounting(ctx):
+        pass
+
+    pipeline.add_stage("moderation", moderation, 0)
+    pipeline.add_stage("accounting", accounting, 20)
+
+    async def scenario():
+        await pipeline.process(make_message("hola"))
+        await pipeline.process(make_message("SPAM"))
+
+    asyncio.run(scenario())
+    stats = pipeline.stats()
+
+    assert stats['processed'] == 2
+    assert stats['stopped'] == 1
+    assert stats['stop_reasons'] == {'spam': 1}
+    assert list(stats['stages']) == ["moderation", "accounting"]
+    assert stats['stages']['moderation']['calls'] == 2
+    assert stats['stages']['accounting']['calls'] == 1
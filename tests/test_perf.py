@@ -0,0 +1,31 @@
+import asyncio
+import json
+import threading
+import utils.perf as perf
+from utils.perf import PerfMonitor
+
+def test_export_loop_builds_snapshot_on_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "perf_stats.json")
+    monkeypatch.setattr(perf, "PERF_EXPORT_PATH", path)
+    monkeypatch.setattr(perf, "PERF_EXPORT_INTERVAL", 0.01)
+    loop_thread = threading.get_ident()
+    source_threads = []
+
+    def source_stats():
+        source_threads.append(threading.get_ident())
+        return {'size': 1}
+
+    async def scenario():
+        monitor = PerfMonitor(lag_interval=0.01)
+        monitor.add_source("cache", source_stats)
+        monitor.record("on_message", None, 0.2, 0.15, 0.2)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+    asyncio.run(scenario())
+    assert source_threads and set(source_threads) == {loop_thread}
+    with open(path) as f:
+        exported = json.load(f)
+    assert exported['cache'] == {'size': 1}
+    assert exported['handlers']['on_message']['slow_calls'] == 1
@@ -0,0 +1,34 @@
+"""Tests de la carga de bans registrados (pares servidor-usuario)
+
+utils.database crea el cliente de Supabase al importarse, así que estos tests necesitan
+las dependencias del bot y URL_SUPABASE/SUPABASE_KEY (no se hace ninguna consulta real).
+"""
+import os
+import asyncio
+import pytest
+
+pytest.importorskip("supabase")
+if not (os.getenv("URL_SUPABASE") and os.getenv("SUPABASE_KEY")):
+    pytest.skip("URL_SUPABASE/SUPABASE_KEY not configured", allow_module_level=True)
+
+from utils import database
+
+def load(monkeypatch, counts, current_bans):
+    async def fake_counts(punishment_types):
+        return counts
+
+    monkeypatch.setattr(database, "get_punishment_counts", fake_counts)
+    asyncio.run(database.load_recorded_bans(current_bans))
+    return set(database.recorded_bans)
+
+def test_ban_in_a_second_guild_is_not_recorded(monkeypatch):
+    recorded = load(monkeypatch, {7: {"ban": 1}}, {(1, 7), (2, 7)})
+    assert len(recorded) == 1
+
+def test_ban_after_an_unban_is_not_recorded(monkeypatch):
+    recorded = load(monkeypatch, {7: {"ban": 1, "unban": 1}}, {(1, 7)})
+    assert recorded == set()
+
+def test_recorded_bans_are_kept(monkeypatch):
+    recorded = load(monkeypatch, {7: {"ban": 2}, 8: {"ban": 1}}, {(1, 7), (2, 7), (1, 8), (1, 9)})
+    assert recorded == {(1, 7), (2, 7), (1, 8)}
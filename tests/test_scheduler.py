@@ -0,0 +1,62 @@
+import asyncio
+import time
+from utils.scheduler import Scheduler
+
+class FakeBot:
+    """Imita wait_until_ready() de discord.py: falla si el bot aún no ha iniciado sesión"""
+
+    def __init__(self):
+        self.logged_in = False
+
+    async def wait_until_ready(self):
+        if not self.logged_in:
+            raise RuntimeError("Client has not been properly initialised")
+
+def test_overdue_reminder_restored_before_login_is_delivered():
+    bot = FakeBot()
+    delivered = []
+
+    async def fire_reminder(reminder_id):
+        await bot.wait_until_ready()
+        delivered.append(reminder_id)
+
+    async def scenario():
+        scheduler = Scheduler()
+        # cog_load restaura un recordatorio que venció mientras el bot estaba apagado
+        scheduler.schedule(("reminders", "1"), time.time() - 60, fire_reminder, "1")
+        await asyncio.sleep(0.05)
+        assert delivered == []
+        assert ("reminders", "1") in scheduler
+
+        # setup_hook: el bot ya inició sesión
+        bot.logged_in = True
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        stats = scheduler.stats()
+        scheduler.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert delivered == ["1"]
+    assert stats['fired'] == 1
+    assert stats['pending'] == 0
+
+def test_timers_fire_in_order_once_started():
+    fired = []
+
+    async def callback(name):
+        fired.append(name)
+
+    async def scenario():
+        scheduler = Scheduler()
+        scheduler.start()
+        now = time.time()
+        scheduler.schedule(("test", "b"), now + 0.04, callback, "b")
+        scheduler.schedule(("test", "a"), now + 0.02, callback, "a")
+        scheduler.schedule(("test", "c"), now + 0.03, callback, "c")
+        scheduler.cancel(("test", "c"))
+        await asyncio.sleep(0.1)
+        scheduler.stop()
+
+    asyncio.run(scenario())
+    assert fired == ["a", "b"]
@@ -0,0 +1,147 @@
+import asyncio
+import copy
+import json
+import pytest
+import utils.storage as storage
+from utils.config_store import ConfigStore
+
+REMINDERS = {
+    "1": {"user_id": "111", "channel_id": "10", "content": "uno", "created_time": 100.0, "due_time": 200.0, "completed": True, "public": False},
+    "2": {"user_id": "222", "channel_id": "10", "content": "dos", "created_time": 100.0, "due_time": 300.0, "completed": False, "public": True},
+}
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    """Colecciones y archivo en un directorio temporal"""
+    collections = copy.deepcopy(storage.COLLECTIONS)
+    for name, spec in collections.items():
+        spec['file'] = str(tmp_path / f"{name}.json")
+    monkeypatch.setattr(storage, "COLLECTIONS", collections)
+    monkeypatch.setattr(storage, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    return tmp_path
+
+def write_reminders(data):
+    with open(storage.COLLECTIONS['reminders']['file'], 'w') as f:
+        json.dump(data, f)
+
+def test_json_archive_round_trip(storage_dir):
+    write_reminders(REMINDERS)
+
+    async def scenario():
+        config_store = ConfigStore(flush_delay=10)
+        backend = storage.JsonStorage(config_store)
+        await backend.archive("reminders", ["1", "missing"])
+        archived = await backend.get_archived("reminders", "1")
+        missing = await backend.get_archived("reminders", "missing")
+        await config_store.close()
+        return archived, missing
+
+    archived, missing = asyncio.run(scenario())
+    assert archived == REMINDERS["1"]
+    assert missing is None
+    with open(storage.COLLECTIONS['reminders']['file']) as f:
+        assert json.load(f) == {"2": REMINDERS["2"]}
+
+def test_json_archive_appends_to_segment(storage_dir):
+    write_reminders(REMINDERS)
+
+    async def scenario():
+        config_store = ConfigStore(flush_delay=10)
+        backend = storage.JsonStorage(config_store)
+        await backend.archive("reminders", ["1"])
+        await backend.archive("reminders", ["2"])
+        found = [await backend.get_archived("reminders", key) for key in ("1", "2")]
+        remaining = await backend.load("reminders")
+        await config_store.close()
+        return found, remaining
+
+    found, remaining = asyncio.run(scenario())
+    assert found == [REMINDERS["1"], REMINDERS["2"]]
+    assert remaining == {}
+    assert len(list((storage_dir / "archive").iterdir())) == 1
+
+def test_json_archive_after_cog_pops_item(storage_dir):
+    write_reminders(REMINDERS)
+
+    async def scenario():
+        config_store = ConfigStore(flush_delay=10)
+        backend = storage.JsonStorage(config_store)
+        # Como Reminders.archive_reminders: se quita del diccionario del cog y luego se archiva
+        reminders = await backend.load("reminders")
+        reminders.pop("1", None)
+        await backend.archive("reminders", ["1"])
+        archived = await backend.get_archived("reminders", "1")
+        await config_store.close()
+
+        # Tras un reinicio el recordatorio terminado no vuelve
+        restarted = storage.JsonStorage(ConfigStore(flush_delay=10))
+        return archived, await restarted.load("reminders")
+
+    archived, reloaded = asyncio.run(scenario())
+    assert archived == REMINDERS["1"]
+    assert reloaded == {"2": REMINDERS["2"]}
+
+def open_sqlite(storage_dir):
+    pytest.importorskip("aiosqlite")
+    return storage.SQLiteStorage(str(storage_dir / "zenshell.db"))
+
+def test_sqlite_migrates_json_once(storage_dir):
+    backend = open_sqlite(storage_dir)
+    write_reminders(REMINDERS)
+
+    async def scenario():
+        await backend.open()
+        migrated = await backend.load("reminders")
+        async with backend.db.execute("SELECT key, due, done, owner FROM reminders ORDER BY key") as cursor:
+            rows = await cursor.fetchall()
+        await backend.close()
+
+        # El fichero ya se importó: los cambios posteriores en el JSON no se vuelven a migrar
+        write_reminders({"3": REMINDERS["2"]})
+        await backend.open()
+        reopened = await backend.load("reminders")
+        await backend.close()
+        return migrated, rows, reopened
+
+    migrated, rows, reopened = asyncio.run(scenario())
+    assert migrated == REMINDERS
+    assert rows == [("1", 200.0, 1, "111"), ("2", 300.0, 0, "222")]
+    assert reopened == REMINDERS
+
+def test_sqlite_retries_migration_of_unreadable_json(storage_dir):
+    backend = open_sqlite(storage_dir)
+    with open(storage.COLLECTIONS['reminders']['file'], 'w') as f:
+        f.write('{"1": ')
+
+    async def scenario():
+        await backend.open()
+        broken = await backend.load("reminders")
+        await backend.close()
+
+        write_reminders(REMINDERS)
+        await backend.open()
+        fixed = await backend.load("reminders")
+        await backend.close()
+        return broken, fixed
+
+    broken, fixed = asyncio.run(scenario())
+    assert broken == {}
+    assert fixed == REMINDERS
+
+def test_sqlite_archive_round_trip(storage_dir):
+    backend = open_sqlite(storage_dir)
+
+    async def scenario():
+        for key, document in REMINDERS.items():
+            await backend.put("reminders", key, document)
+        await backend.archive("reminders", ["1", "missing"])
+        archived = await backend.get_archived("reminders", "1")
+        missing = await backend.get_archived("reminders", "missing")
+        remaining = await backend.load("reminders")
+        await backend.close()
+        return archived, missing, remaining
+
+    archived, missing, remaining = asyncio.run(scenario())
+    assert archived == REMINDERS["1"]
+    assert missing is None
+    assert remaining == {"2": REMINDERS["2"]}
@@ -0,0 +1,41 @@
+from utils.track_cache import MatchCache, spotify_match_keys
+
+TRACK = {'name': 'Song', 'artists': [{'name': 'Artist'}], 'external_ids': {'isrc': 'usabc1234567'}}
+
+def test_match_keys_use_isrc_and_title():
+    keys = spotify_match_keys(TRACK)
+    assert keys[0] == "isrc:USABC1234567"
+    assert keys[1].startswith("title:")
+    assert spotify_match_keys({'name': 'Song', 'artists': [{'name': 'Artist'}]}) == keys[1:]
+
+def test_invalidate_forgets_a_dead_video():
+    cache = MatchCache(None)
+    cache.set(TRACK, "dQw4w9WgXcQ")
+    assert cache.get(TRACK) == "dQw4w9WgXcQ"
+
+    assert cache.invalidate(TRACK, "dQw4w9WgXcQ")
+    assert cache.get(TRACK) is None
+    assert cache.stats()['invalidations'] == 1
+
+def test_invalidate_keeps_a_newer_match():
+    cache = MatchCache(None)
+    cache.set(TRACK, "dQw4w9WgXcQ")
+    # Otra resolución ya guardó un vídeo distinto para la misma canción
+    cache.set(TRACK, "9bZkp7q5f_I")
+
+    assert not cache.invalidate(TRACK, "dQw4w9WgXcQ")
+    assert cache.get(TRACK) == "9bZkp7q5f_I"
+
+def test_oldest_matches_are_dropped_first():
+    cache = MatchCache(None, maxsize=2)
+    first = {'name': 'One', 'artists': [{'name': 'A'}]}
+    second = {'name': 'Two', 'artists': [{'name': 'A'}]}
+    third = {'name': 'Three', 'artists': [{'name': 'A'}]}
+    cache.set(first, "aaaaaaaaaaa")
+    cache.set(second, "bbbbbbbbbbb")
+    cache.set(first, "aaaaaaaaaaa")
+    cache.set(third, "ccccccccccc")
+
+    assert cache.get(second) is None
+    assert cache.get(first) == "aaaaaaaaaaa"
+    assert cache.get(third) == "ccccccccccc"
@@ -0,0 +1,62 @@
+from utils.word_filter import BannedWordMatcher, normalize
+
+def test_normalize_accents_case_and_invisible_chars():
+    assert normalize("ÁrBOL") == "arbol"
+    assert normalize("pa​labra") == "palabra"
+    # Fullwidth and mathematical letters fold to ASCII through NFKD
+    assert normalize("ｓｐａｍ") == "spam"
+    assert normalize("𝐬𝐩𝐚𝐦") == "spam"
+
+def test_normalize_confusables_and_leetspeak():
+    # Cyrillic "а" and "о" look like the Latin letters
+    assert normalize("bаd wоrd") == "bad word"
+    assert normalize("h4ck3r") == "hacker"
+    assert normalize("$p@m") == "spam"
+
+def test_substring_match_by_default():
+    matcher = BannedWordMatcher(["spam"])
+    assert matcher.search("this is spammy") == "spam"
+    assert matcher.search("nothing here") is None
+
+def test_whole_word():
+    matcher = BannedWordMatcher(["spam"], whole_word=True)
+    assert matcher.search("no spam please") == "spam"
+    assert matcher.search("spammy") is None
+    assert matcher.search("spam.") == "spam"
+
+def test_evasion_is_normalized_before_matching():
+    matcher = BannedWordMatcher(["idiota"])
+    assert matcher.search("eres un 1d10ta") == "idiota"
+    assert matcher.search("eres un ÍDIOTA") == "idiota"
+    assert matcher.search("eres un idi​ota") == "idiota"
+
+def test_banned_words_are_normalized_too():
+    matcher = BannedWordMatcher(["Camión"])
+    assert matcher.search("un camion rojo") == "camion"
+
+def test_wildcards():
+    matcher = BannedWordMatcher(["free*nitro"], whole_word=True)
+    assert matcher.search("get freenitro now") == "freenitro"
+    assert matcher.search("get free-nitro now") is None
+    assert matcher.search("get freediscordnitro now") == "freediscordnitro"
+
+def test_shared_prefixes_in_trie():
+    matcher = BannedWordMatcher(["ab", "abc", "abd", "b"], whole_word=True)
+    for word in ("ab", "abc", "abd", "b"):
+        assert matcher.search(f"x {word} y") == word
+    assert matcher.search("abe") is None
+
+def test_empty_and_wildcard_only_words_are_ignored():
+    assert BannedWordMatcher([]).search("anything") is None
+    assert BannedWordMatcher(["", "*", " "]).search("anything") is None
+
+def test_special_characters_are_escaped():
+    matcher = BannedWordMatcher(["a.b"])
+    assert matcher.search("a.b") == "a.b"
+    assert matcher.search("axb") is None
+
+def test_large_word_list():
+    words = [f"palabra{i}" for i in range(10000)]
+    matcher = BannedWordMatcher(words, whole_word=True)
+    assert matcher.search("hola palabra9999 adiós") == "palabra9999"
+    assert matcher.search("hola palabra10000 adiós") is None
@@ -0,0 +1,91 @@
+"""Tests del vaciado del buffer de escritura cuando falla una de las dos fases
+
+utils.database crea el cliente de Supabase al importarse, así que estos tests necesitan
+las dependencias del bot y URL_SUPABASE/SUPABASE_KEY (no se hace ninguna consulta real).
+"""
+import os
+import asyncio
+import pytest
+
+pytest.importorskip("supabase")
+if not (os.getenv("URL_SUPABASE") and os.getenv("SUPABASE_KEY")):
+    pytest.skip("URL_SUPABASE/SUPABASE_KEY not configured", allow_module_level=True)
+
+import httpx
+from postgrest.exceptions import APIError
+from utils import write_buffer
+from utils.write_buffer import WriteBehindBuffer
+
+class FakeDatabase:
+    def __init__(self, xp_error=None, messages_error=None):
+        self.xp_error = xp_error
+        self.messages_error = messages_error
+        self.xp_calls = []
+        self.message_calls = []
+
+    async def apply_xp_batch(self, xp_deltas, usernames):
+        self.xp_calls.append(dict(xp_deltas))
+        if self.xp_error:
+            raise self.xp_error
+
+    async def insert_messages_batch(self, messages):
+        self.message_calls.append(list(messages))
+        if self.messages_error:
+            raise self.messages_error
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(**errors):
+        db = FakeDatabase(**errors)
+        monkeypatch.setattr(write_buffer, "apply_xp_batch", db.apply_xp_batch)
+        monkeypatch.setattr(write_buffer, "insert_messages_batch", db.insert_messages_batch)
+        return db
+    return install
+
+def fill_and_flush(buffer):
+    async def scenario():
+        await buffer.add_message(1, "alice", "hola", 5)
+        await buffer.add_message(2, "bob", "adiós", 3)
+        await buffer.flush()
+    asyncio.run(scenario())
+
+def test_failed_message_insert_does_not_requeue_xp(fake_db):
+    db = fake_db(messages_error=httpx.ConnectError("down"))
+    buffer = WriteBehindBuffer()
+    fill_and_flush(buffer)
+
+    assert db.xp_calls == [{1: 5, 2: 3}]
+    assert buffer.xp_deltas == {}
+    assert [message['user_id'] for message in buffer.messages] == [1, 2]
+
+def test_xp_not_sent_is_requeued(fake_db):
+    fake_db(xp_error=httpx.ConnectError("down"))
+    buffer = WriteBehindBuffer()
+    fill_and_flush(buffer)
+
+    assert buffer.xp_deltas == {1: 5, 2: 3}
+    assert buffer.messages == []
+
+def test_ambiguous_xp_failure_is_not_retried(fake_db):
+    fake_db(xp_error=httpx.ReadTimeout("no response"))
+    buffer = WriteBehindBuffer()
+    fill_and_flush(buffer)
+
+    assert buffer.xp_deltas == {}
+    assert buffer.xp_dropped == 8
+
+def test_ambiguous_message_insert_is_not_retried(fake_db):
+    fake_db(messages_error=httpx.ReadTimeout("no response"))
+    buffer = WriteBehindBuffer()
+    fill_and_flush(buffer)
+
+    assert buffer.messages == []
+    assert buffer.messages_dropped == 2
+
+def test_gateway_error_on_xp_is_not_retried(fake_db):
+    fake_db(xp_error=APIError({'message': 'Bad Gateway', 'code': 502, 'hint': None, 'details': None}))
+    buffer = WriteBehindBuffer()
+    fill_and_flush(buffer)
+
+    assert buffer.xp_deltas == {}
+    assert buffer.xp_dropped == 8
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from utils.youtube_search import VideoIdScanner
+
+IDS = ["dQw4w9WgXcQ", "9bZkp7q5f_I", "kJQP7kiw5-k", "OPf0YbXqDm0", "JGwWNGJdvx8", "RgKAFK5djSk"]
+
+def results_page(ids, repeat=2):
+    links = "".join(f'<a href="/watch?v={video_id}">x</a>' * repeat for video_id in ids)
+    return f"<html><body>{'relleno ' * 50}{links}</body></html>".encode()
+
+def feed_chunks(scanner, data, size):
+    for offset in range(0, len(data), size):
+        if scanner.feed(data[offset:offset + size]):
+            return True
+    return False
+
+def test_whole_page_in_one_chunk():
+    scanner = VideoIdScanner(limit=5)
+    assert scanner.feed(results_page(IDS))
+    assert scanner.ids == IDS[:5]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 11, 19, 20, 21, 64])
+def test_ids_split_across_chunks(size):
+    scanner = VideoIdScanner(limit=5)
+    assert feed_chunks(scanner, results_page(IDS), size)
+    assert scanner.ids == IDS[:5]
+
+@pytest.mark.parametrize("split", range(1, len("/watch?v=dQw4w9WgXcQ")))
+def test_every_split_point_inside_an_id(split):
+    link = b"/watch?v=dQw4w9WgXcQ"
+    scanner = VideoIdScanner(limit=1)
+    assert not scanner.feed(b"<html>" + link[:split])
+    assert scanner.feed(link[split:] + b"</html>")
+    assert scanner.ids == ["dQw4w9WgXcQ"]
+
+def test_duplicates_are_counted_once():
+    scanner = VideoIdScanner(limit=3)
+    data = results_page(IDS[:2], repeat=5)
+    assert not feed_chunks(scanner, data, 16)
+    assert scanner.ids == IDS[:2]
+
+def test_stops_once_limit_is_reached():
+    scanner = VideoIdScanner(limit=2)
+    data = results_page(IDS)
+    chunks = [data[offset:offset + 32] for offset in range(0, len(data), 32)]
+    fed = 0
+    for chunk in chunks:
+        fed += 1
+        if scanner.feed(chunk):
+            break
+    assert scanner.done
+    assert scanner.ids == IDS[:2]
+    assert fed < len(chunks)
+
+def test_rejects_characters_outside_the_id_alphabet():
+    scanner = VideoIdScanner(limit=5)
+    scanner.feed(b'/watch?v=abc"def<ghi /watch?v=RgKAFK5djSk')
+    assert scanner.ids == ["RgKAFK5djSk"]
@@ -0,0 +1,98 @@
+import re
+from utils.cache import TTLCache
+from utils.word_filter import BannedWordMatcher
+
+# Patrones compilados una sola vez para todos los servidores
+LINK_PATTERN = re.compile(r'https?://\S+')
+INVITE_PATTERN = re.compile(r'discord(?:\.gg|app\.com/invite)/\S+')
+
+# Matchers de palabras prohibidas ya compilados, por (lista de palabras, whole_word).
+# Cambiar otro ajuste de un servidor recompila sus reglas pero reutiliza el matcher,
+# que es lo único caro de construir con listas grandes.
+_matchers = TTLCache(maxsize=256, ttl=86400)
+
+def get_banned_word_matcher(words, whole_word=False):
+    """Devuelve el matcher de una lista de palabras, compilándolo solo si la lista es nueva"""
+    key = (tuple(words), bool(whole_word))
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = BannedWordMatcher(words, whole_word=whole_word)
+        _matchers.set(key, matcher)
+    return matcher
+
+def _caps_filter(threshold):
+    """Crea el filtro de mayúsculas excesivas con su umbral ya resuelto"""
+    def check(content):
+        if len(content) < 8:  # Only check messages with at least 8 characters
+            return False
+        caps_count = sum(1 for c in content if c.isupper())
+        total_chars = sum(1 for c in content if c.isalpha())
+        return total_chars > 0 and (caps_count / total_chars) * 100 >= threshold
+    return check
+
+def _rate_settings(filter_config, **defaults):
+    """Resuelve los umbrales de un detector de spam, o None si está desactivado"""
+    if not filter_config.get("enabled", False):
+        return None
+    return {name: filter_config.get(name, default) for name, default in defaults.items()}
+
+class GuildRules:
+    """Reglas de AutoMod de un servidor, compiladas a partir de su configuración JSON
+
+    Se construyen cuando se carga o cambia la configuración y no se modifican después:
+    las exenciones son frozensets de IDs, las expresiones regulares están precompiladas
+    y los filtros activos forman una tupla ordenada de (nombre, función).
+    """
+
+    __slots__ = ('exempt_roles', 'exempt_channels', 'filters', 'punishments', 'spam', 'duplicates', 'mentions', 'raid')
+
+    def __init__(self, guild_config):
+        filters = guild_config.get("filters", {})
+
+        self.exempt_roles = frozenset(int(role_id) for role_id in guild_config.get("exempt_roles", []))
+        self.exempt_channels = frozenset(int(channel_id) for channel_id in guild_config.get("exempt_channels", []))
+        self.punishments = dict(guild_config.get("punishments", {}))
+
+        # Filtros activos, en el orden en que se comprueban
+        active_filters = []
+
+        banned_words = filters.get("banned_words", {})
+        if banned_words.get("enabled", False):
+            matcher = get_banned_word_matcher(banned_words.get("words", []), banned_words.get("whole_word", False))
+            active_filters.append(("banned_words", matcher.search))
+
+        caps = filters.get("caps", {})
+        if caps.get("enabled", False):
+            active_filters.append(("caps", _caps_filter(caps.get("threshold", 70))))
+
+        if filters.get("links", {}).get("enabled", False):
+            active_filters.append(("links", LINK_PATTERN.search))
+
+        if filters.get("invites", {}).get("enabled", False):
+            active_filters.append(("invites", INVITE_PATTERN.search))
+
+        self.filters = tuple(active_filters)
+
+        # Umbrales de los detectores de spam (None si están desactivados)
+        self.spam = _rate_settings(filters.get("spam", {}), message_limit=5, time_window=5)
+        self.duplicates = _rate_settings(filters.get("duplicates", {}), duplicate_limit=3, channel_limit=5, time_window=30)
+        self.mentions = _rate_settings(filters.get("mentions", {}), mention_limit=5, time_window=10)
+        self.raid = _rate_settings(filters.get("raid", {}), join_limit=10, time_window=60, account_age_days=7)
+
+    def is_exempt(self, message):
+        """Comprueba si el canal o alguno de los roles del autor están exentos"""
+        if message.channel.id in self.exempt_channels:
+            return True
+        if self.exempt_roles:
+            return any(role.id in self.exempt_roles for role in message.author.roles)
+        return False
+
+    def check(self, content):
+        """Devuelve el nombre del primer filtro que incumple el mensaje, o None"""
+        for name, check in self.filters:
+            if check(content):
+                return name
+        return None
+
+    def punishment_for(self, violation):
+        return self.punishments.get(violation, "delete")
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Caché LRU en memoria con expiración por tiempo
+
+    Guarda como máximo maxsize entradas; al llenarse descarta la usada hace más tiempo.
+    Cada entrada caduca ttl segundos después de escribirse (o los que se indiquen en set).
+    """
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """Devuelve el valor guardado para key, o default si no existe o ha caducado"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Guarda value para key, descartando la entrada menos usada si hace falta"""
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Elimina una entrada, o todas si no se indica key"""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def items(self):
+        """Pares (clave, valor) de las entradas que no han caducado"""
+        now = time.monotonic()
+        return [(key, value) for key, (value, expires_at) in self._data.items() if expires_at > now]
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Devuelve los contadores de aciertos y fallos de la caché"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
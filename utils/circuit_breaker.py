@@ -0,0 +1,59 @@
+import time
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuito está abierto y se rechaza una llamada"""
+    pass
+
+class CircuitBreaker:
+    """Circuit breaker sencillo para un servicio externo
+
+    Tras failure_threshold fallos seguidos el circuito se abre y las llamadas se rechazan
+    al instante durante reset_timeout segundos. Pasado ese tiempo queda semiabierto:
+    solo la siguiente llamada se deja pasar como prueba (las demás se siguen rechazando
+    mientras dura); si tiene éxito el circuito se cierra y si falla se vuelve a abrir.
+    Si la prueba no informa de su resultado en reset_timeout segundos se admite otra.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self):
+        """Indica si se puede hacer una llamada ahora mismo"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+
+        # Semiabierto: admitir una sola llamada de prueba
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+            return False
+        self.probe_started_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
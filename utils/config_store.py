@@ -0,0 +1,195 @@
+import os
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Configuración de la persistencia de los ficheros config/*.json
+CONFIG_FLUSH_DELAY = float(os.getenv("CONFIG_FLUSH_DELAY_MS", "1000")) / 1000
+CONFIG_JOURNAL = os.getenv("CONFIG_JOURNAL", "0").lower() in ("1", "true", "yes")
+CONFIG_JOURNAL_PATH = os.getenv("CONFIG_JOURNAL_PATH", "config/.journal")
+
+def _write_atomic(path, payload):
+    """Escribe el fichero completo en un temporal y lo renombra sobre el original"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class ConfigStore:
+    """Persistencia compartida para los ficheros JSON de configuración de los cogs
+
+    Los cogs modifican sus diccionarios en memoria y llaman a save(path, data), que solo
+    marca el fichero como modificado. Los ficheros modificados se escriben juntos
+    flush_delay segundos después del primer cambio (varios cambios seguidos se
+    agrupan en una sola escritura), en un hilo aparte y de forma atómica (temporal + rename).
+
+    En modo journal cada cambio se añade además a un registro (una línea JSON con el
+    estado completo del fichero) antes de la escritura diferida; al arrancar, load()
+    recupera del registro los cambios que no llegaron a escribirse por una caída.
+    """
+
+    def __init__(self, flush_delay=CONFIG_FLUSH_DELAY, journal=CONFIG_JOURNAL, journal_path=CONFIG_JOURNAL_PATH):
+        self.flush_delay = flush_delay
+        self.journal = journal
+        self.journal_path = journal_path
+        self.dirty = {}
+        self.writes = 0
+        self.saves = 0
+        self.last_flush_duration = 0.0
+        # Un único hilo: las escrituras y el registro se hacen en el orden en que se pidieron
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-io")
+        self._flush_handle = None
+        self._flush_task = None
+        self._closed = False
+        self._journal_entries = None
+
+    def load(self, path, default=None):
+        """Lee un fichero JSON (aplicando los cambios pendientes del registro) o devuelve default"""
+        if path in self.dirty:
+            return self.dirty[path]
+
+        pending = self._read_journal().get(path)
+        if pending is not None:
+            # El registro es más reciente que el fichero: se reescribe en la próxima escritura
+            self.save(path, pending)
+            return pending
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+        return default
+
+    def save(self, path, data):
+        """Marca un fichero como modificado; se escribirá en la próxima escritura diferida"""
+        self.dirty[path] = data
+        self.saves += 1
+
+        loop = asyncio.get_running_loop()
+        if self.journal:
+            entry = json.dumps({'path': path, 'data': data}) + "\n"
+            loop.run_in_executor(self._executor, self._append_journal, entry)
+
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is None and not self._closed:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        # Se guarda la referencia: el loop solo mantiene referencias débiles a las tareas
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Escribe todos los ficheros modificados
+
+        Los ficheros que no se pudieron serializar o escribir vuelven a marcarse como
+        modificados y se reintentan en la siguiente escritura diferida.
+        """
+        self._flush_handle = None
+        if not self.dirty:
+            return
+
+        start = time.perf_counter()
+        dirty, self.dirty = self.dirty, {}
+
+        # Se serializa en el event loop para tomar una instantánea coherente de los datos;
+        # la escritura en disco (lo lento) se hace en el hilo de E/S
+        payloads = []
+        failed = []
+        for path, data in dirty.items():
+            try:
+                payloads.append((path, json.dumps(data, indent=4)))
+            except Exception as e:
+                failed.append(path)
+                print(f"Error serializing {path}: {e}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            write_failed = await loop.run_in_executor(self._executor, self._write_all, payloads)
+        except Exception as e:
+            write_failed = [path for path, payload in payloads]
+            print(f"Error flushing config files: {e}")
+        failed += write_failed
+
+        self.writes += len(payloads) - len(write_failed)
+        self.last_flush_duration = time.perf_counter() - start
+
+        if failed:
+            for path in failed:
+                # Si se volvió a guardar mientras tanto, la versión nueva tiene prioridad
+                self.dirty.setdefault(path, dirty[path])
+            self._schedule_flush()
+
+    async def close(self):
+        """Cancela la escritura programada y escribe lo pendiente"""
+        self._closed = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self.flush()
+        if self.dirty:
+            print(f"Config files not saved on shutdown: {', '.join(self.dirty)}")
+        # shutdown(wait=True) bloquea hasta que acabe el hilo de E/S: se espera fuera del loop
+        await asyncio.to_thread(self._executor.shutdown, True)
+
+    def stats(self):
+        return {
+            'pending': len(self.dirty),
+            'saves': self.saves,
+            'writes': self.writes,
+            'journal': self.journal,
+            'last_flush_ms': round(self.last_flush_duration * 1000, 2)
+        }
+
+    def _write_all(self, payloads):
+        """Escribe los ficheros y devuelve las rutas que fallaron"""
+        failed = []
+        for path, payload in payloads:
+            try:
+                _write_atomic(path, payload)
+            except Exception as e:
+                failed.append(path)
+                print(f"Error saving {path}: {e}")
+
+        # Todo está en disco: el registro ya no hace falta
+        if self.journal and not failed:
+            try:
+                with open(self.journal_path, 'w'):
+                    pass
+            except Exception as e:
+                print(f"Error truncating config journal: {e}")
+        return failed
+
+    def _append_journal(self, entry):
+        try:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            with open(self.journal_path, 'a') as f:
+                f.write(entry)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error writing config journal: {e}")
+
+    def _read_journal(self):
+        """Último estado registrado de cada fichero (solo se lee una vez, al arrancar)"""
+        if self._journal_entries is None:
+            self._journal_entries = {}
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'r') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # Línea a medio escribir durante la caída
+                            continue
+                        self._journal_entries[entry['path']] = entry['data']
+        return self._journal_entries
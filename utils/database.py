@@ -1,9 +1,17 @@
 import os
 import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from dotenv import load_dotenv
 import datetime
 import discord
+from utils.cache import TTLCache
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 # Load environment variables
 load_dotenv()
@@ -11,7 +19,200 @@ load_dotenv()
 # Supabase configuration
 url = os.getenv("URL_SUPABASE")
 key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+
+# Configuración del pool de conexiones y de la política de reintentos
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "8"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", str(DB_MAX_WORKERS)))
+DB_KEEPALIVE_EXPIRY = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+DB_MAX_RETRIES = int(os.getenv("DB_MAX_RETRIES", "3"))
+DB_RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.2"))
+
+supabase: Client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT))
+
+def configure_http_pool(client):
+    """Replace the PostgREST HTTP session with a pooled keep-alive session"""
+    try:
+        old_session = client.postgrest.session
+        client.postgrest.session = httpx.Client(
+            base_url=old_session.base_url,
+            headers=old_session.headers,
+            timeout=httpx.Timeout(DB_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=DB_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_MAX_CONNECTIONS,
+                keepalive_expiry=DB_KEEPALIVE_EXPIRY
+            ),
+            follow_redirects=True
+        )
+        old_session.close()
+    except Exception as e:
+        print(f"Error configuring database HTTP pool, using default session: {e}")
+
+configure_http_pool(supabase)
+
+# El cliente de Supabase es síncrono: cada .execute() es una petición HTTP bloqueante.
+# Las consultas se ejecutan en un pool de hilos propio para no bloquear el event loop,
+# y el tamaño del pool limita cuántas peticiones pueden estar en vuelo a la vez.
+db_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="supabase")
+
+# Si la base de datos deja de responder, las llamadas fallan al instante en lugar de acumularse
+db_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("DB_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("DB_BREAKER_RESET", "30"))
+)
+
+# Errores en los que la petición no llegó a enviarse: siempre es seguro reintentar
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Errores en los que la petición pudo llegar al servidor: solo se reintentan las lecturas
+RETRYABLE_READ_ERRORS = (httpx.TransportError,)
+
+# Códigos de APIError que indican una caída y no un error de la consulta:
+# PostgREST no pudo conectar con Postgres (la consulta no llegó a ejecutarse)...
+UNAVAILABLE_CODES = {'PGRST000', 'PGRST001', 'PGRST002'}
+# ...o el gateway devolvió un 5xx sin respuesta de PostgREST (pudo ejecutarse o no)
+GATEWAY_CODES = {'502', '503', '504'}
+
+db_stats = {
+    'queries': 0,
+    'failures': 0,
+    'retries': 0,
+    'rejected': 0,
+    'in_flight': 0,
+    'peak_in_flight': 0,
+    'total_time': 0.0
+}
+
+def api_error_code(error):
+    return str(error.code) if isinstance(error, APIError) else None
+
+def is_outage(error):
+    """Check if an error means the database is unreachable (a circuit breaker failure)"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return api_error_code(error) in UNAVAILABLE_CODES | GATEWAY_CODES
+
+def is_retryable(query, error):
+    """Check if a failed query can be safely retried"""
+    if isinstance(error, RETRYABLE_ERRORS) or api_error_code(error) in UNAVAILABLE_CODES:
+        return True
+    # The request may have been executed: only repeat idempotent reads
+    return is_outage(error) and getattr(query, 'http_method', None) in ('GET', 'HEAD')
+
+async def run_query(query):
+    """Execute a Supabase query builder in the database thread pool
+    
+    Transient network and gateway errors are retried with jittered exponential backoff,
+    and the circuit breaker rejects calls right away while the database is unreachable.
+    """
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while True:
+        if not db_breaker.allow_request():
+            db_stats['rejected'] += 1
+            raise CircuitOpenError("Database circuit is open, skipping query")
+        
+        db_stats['queries'] += 1
+        db_stats['in_flight'] += 1
+        db_stats['peak_in_flight'] = max(db_stats['peak_in_flight'], db_stats['in_flight'])
+        start = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(db_executor, query.execute)
+        except Exception as e:
+            if not is_outage(e):
+                # The database answered (e.g. a constraint error): not an outage
+                db_breaker.record_success()
+                raise
+            
+            db_stats['failures'] += 1
+            db_breaker.record_failure()
+            if attempt >= DB_MAX_RETRIES or not is_retryable(query, e):
+                raise
+        else:
+            db_breaker.record_success()
+            return result
+        finally:
+            db_stats['in_flight'] -= 1
+            db_stats['total_time'] += time.perf_counter() - start
+        
+        # Full jitter backoff: random delay between 0 and base * 2^attempt
+        attempt += 1
+        db_stats['retries'] += 1
+        await asyncio.sleep(random.uniform(0, DB_RETRY_BASE_DELAY * (2 ** attempt)))
+
+def get_pool_stats():
+    """Get database pool utilization and reliability metrics"""
+    return {
+        'workers': DB_MAX_WORKERS,
+        'max_connections': DB_MAX_CONNECTIONS,
+        'in_flight': db_stats['in_flight'],
+        'peak_in_flight': db_stats['peak_in_flight'],
+        'utilization': min(db_stats['in_flight'] / DB_MAX_WORKERS, 1.0),
+        'queued': max(db_stats['in_flight'] - DB_MAX_WORKERS, 0),
+        'queries': db_stats['queries'],
+        'failures': db_stats['failures'],
+        'retries': db_stats['retries'],
+        'rejected': db_stats['rejected'],
+        'avg_latency': db_stats['total_time'] / db_stats['queries'] if db_stats['queries'] else 0.0,
+        'circuit': db_breaker.state,
+        'circuit_opened': db_breaker.times_opened
+    }
+
+# Caché de filas de la tabla users por discord_id. get_user lee de aquí y todas las funciones
+# que escriben datos de un usuario la actualizan (write-through) o invalidan su entrada.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "300"))
+)
+
+def invalidate_user(discord_id=None):
+    """Drop a user (or every user if no ID is given) from the user cache"""
+    user_cache.invalidate(discord_id)
+
+# Índice en memoria de los discord_id que ya existen en la tabla users.
+# Se carga una vez al arrancar (load_known_users) y se actualiza con cada alta,
+# así comprobar si un usuario existe no requiere una consulta.
+known_users = set()
+
+async def load_known_users(page_size=1000):
+    """Load every discord_id in the users table into the known-user index"""
+    ids = set()
+    start = 0
+    while True:
+        # PostgREST limits the rows per response, so read the IDs in pages
+        response = await run_query(
+            supabase.table('users').select('discord_id').order('discord_id').range(start, start + page_size - 1)
+        )
+        ids.update(row['discord_id'] for row in response.data)
+        if len(response.data) < page_size:
+            break
+        start += page_size
+    
+    known_users.clear()
+    known_users.update(ids)
+    return len(known_users)
+
+async def ensure_user(discord_id, username=None, discriminator="0000"):
+    """Make sure a user exists in the database, creating it if needed
+    
+    Known users are checked in memory; new users are created with an idempotent upsert.
+    """
+    if discord_id in known_users:
+        return True
+    
+    try:
+        user_data = {
+            'discord_id': discord_id,
+            'username': username or f"User_{discord_id}",
+            'discriminator': discriminator
+        }
+        await run_query(supabase.table('users').upsert(user_data, on_conflict='discord_id', ignore_duplicates=True))
+        known_users.add(discord_id)
+        invalidate_user(discord_id)
+        return True
+    except Exception as e:
+        print(f"Error ensuring user exists: {e}")
+        return False
 
 async def create_tables():
     """Create all necessary tables in the database if they don't exist"""
@@ -19,16 +220,22 @@ async def create_tables():
     # This function is a placeholder for any additional setup or validation
     try:
         # Check if we can connect to the database
-        response = supabase.table('users').select('id').limit(1).execute()
+        response = await run_query(supabase.table('users').select('id').limit(1))
         print("Database connection successful!")
     except Exception as e:
         print(f"Error connecting to database: {e}")
 
 async def get_user(discord_id):
     """Get a user from the database by Discord ID"""
+    user = user_cache.get(discord_id)
+    if user is not None:
+        return user
+    
     try:
-        response = supabase.table('users').select('*').eq('discord_id', discord_id).execute()
+        response = await run_query(supabase.table('users').select('*').eq('discord_id', discord_id))
         if response.data:
+            known_users.add(discord_id)
+            user_cache.set(discord_id, response.data[0])
             return response.data[0]
         return None
     except Exception as e:
@@ -43,68 +250,70 @@ async def create_user(discord_id, username, discriminator):
             'username': username,
             'discriminator': discriminator
         }
-        response = supabase.table('users').insert(user_data).execute()
-        return response.data[0] if response.data else None
+        response = await run_query(supabase.table('users').insert(user_data))
+        if response.data:
+            known_users.add(discord_id)
+            user_cache.set(discord_id, response.data[0])
+            return response.data[0]
+        return None
     except Exception as e:
         print(f"Error creating user: {e}")
         return None
 
-async def update_user_xp(discord_id, xp_amount):
-    """Update a user's XP and check for level up"""
+async def bulk_create_users(users, chunk_size=500, progress=None):
+    """Create many users with chunked multi-row upserts
+    
+    Args:
+        users: List of {'discord_id', 'username', 'discriminator'} rows
+        chunk_size: Rows per upsert request
+        progress: Optional callback called as progress(created, total) after each chunk
+    """
+    created = 0
+    for start in range(0, len(users), chunk_size):
+        chunk = users[start:start + chunk_size]
+        await run_query(supabase.table('users').upsert(chunk, on_conflict='discord_id', ignore_duplicates=True))
+        for user in chunk:
+            known_users.add(user['discord_id'])
+            invalidate_user(user['discord_id'])
+        created += len(chunk)
+        if progress:
+            progress(created, len(users))
+    return created
+
+async def update_user_xp(discord_id, xp_amount, username=None):
+    """Update a user's XP and check for level up
+    
+    XP and level are computed atomically by the add_user_xp function (sql/functions.sql),
+    so concurrent updates for the same user never lose XP. The user is created if needed.
+    """
     try:
-        # Get current user data
-        user = await get_user(discord_id)
-        
-        # If user doesn't exist, create them
-        if not user:
-            user = await create_user(discord_id, f"User_{discord_id}", "0000")
-            if not user:
-                return None
-        
-        # Calculate current XP and level
-        current_xp = user.get('xp', 0) + xp_amount
-        current_level = user.get('level', 1)
-        
-        # Check if user should level up
-        # Formula: 100 * level^2 XP needed for next level
-        xp_needed = 100 * (current_level ** 2)
-        
-        # Level up if enough XP
-        level_up = False
-        while current_xp >= xp_needed:
-            current_level += 1
-            current_xp -= xp_needed
-            xp_needed = 100 * (current_level ** 2)
-            level_up = True
-        
-        # Update user data
-        update_data = {
-            'xp': current_xp,
-            'level': current_level,
-            'last_active': 'now()'
+        params = {
+            'p_discord_id': discord_id,
+            'p_xp_amount': xp_amount,
+            'p_username': username
         }
+        response = await run_query(supabase.rpc('add_user_xp', params))
+        if not response.data:
+            return None
         
-        response = supabase.table('users').update(update_data).eq('discord_id', discord_id).execute()
+        # Cache the updated row (without the level_up flag)
+        updated_user = response.data
+        known_users.add(discord_id)
+        user_cache.set(discord_id, {k: v for k, v in updated_user.items() if k != 'level_up'})
         
         # Return updated user data with level_up flag
-        if response.data:
-            updated_user = response.data[0]
-            updated_user['level_up'] = level_up
-            return updated_user
-        return None
+        return updated_user
     except Exception as e:
+        # The update may or may not have been applied: don't keep serving the old row
+        invalidate_user(discord_id)
         print(f"Error updating user XP: {e}")
         return None
 
 async def record_message(discord_id, content):
     """Record a message in the database"""
     try:
-        # First check if user exists
-        user = await get_user(discord_id)
-        
-        # If user doesn't exist, create them
-        if not user:
-            await create_user(discord_id, f"User_{discord_id}", "0000")
+        # Make sure the user exists
+        await ensure_user(discord_id)
         
         # Record the message
         message_data = {
@@ -112,24 +321,67 @@ async def record_message(discord_id, content):
             'content': content[:500]  # Limit content length to 500 chars
         }
         
-        response = supabase.table('messages').insert(message_data).execute()
+        response = await run_query(supabase.table('messages').insert(message_data))
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error recording message: {e}")
         return None
 
+def write_not_applied(error):
+    """Check if a failed write certainly did not change the database, so repeating it is safe
+    
+    False means the outcome is unknown (e.g. a timeout after the request was sent).
+    """
+    if isinstance(error, (CircuitOpenError,) + RETRYABLE_ERRORS):
+        return True
+    if api_error_code(error) in UNAVAILABLE_CODES:
+        return True
+    # Any other database error rolled the statement back
+    return isinstance(error, APIError) and not is_outage(error)
+
+async def apply_xp_batch(xp_deltas, usernames):
+    """Apply buffered XP deltas (creating missing users) in a single atomic call
+    
+    Args:
+        xp_deltas: Dict of discord_id -> XP to add
+        usernames: Dict of discord_id -> username, used for users that don't exist yet
+    """
+    deltas = [
+        {
+            'discord_id': discord_id,
+            'xp': xp,
+            'username': usernames.get(discord_id)
+        }
+        for discord_id, xp in xp_deltas.items()
+    ]
+    if not deltas:
+        return
+    
+    try:
+        response = await run_query(supabase.rpc('add_users_xp', {'p_deltas': deltas}))
+    except Exception:
+        for discord_id in xp_deltas:
+            invalidate_user(discord_id)
+        raise
+    
+    # Write the updated rows through to the user cache
+    for user in response.data or []:
+        known_users.add(user['discord_id'])
+        user_cache.set(user['discord_id'], {k: v for k, v in user.items() if k != 'level_up'})
+
+async def insert_messages_batch(messages):
+    """Insert buffered message rows ({'user_id', 'content'}) in one request"""
+    if messages:
+        await run_query(supabase.table('messages').insert(messages))
+
 async def add_achievement(discord_id, achievement_name):
     """Add an achievement for a user"""
     try:
-        # First check if user exists
-        user = await get_user(discord_id)
-        
-        # If user doesn't exist, create them
-        if not user:
-            await create_user(discord_id, f"User_{discord_id}", "0000")
+        # Make sure the user exists
+        await ensure_user(discord_id)
         
         # Check if achievement already exists for this user
-        response = supabase.table('achievements').select('*').eq('user_id', discord_id).eq('achievement_name', achievement_name).execute()
+        response = await run_query(supabase.table('achievements').select('*').eq('user_id', discord_id).eq('achievement_name', achievement_name))
         
         # Only add if the user doesn't already have this achievement
         if not response.data:
@@ -138,7 +390,7 @@ async def add_achievement(discord_id, achievement_name):
                 'achievement_name': achievement_name
             }
             
-            response = supabase.table('achievements').insert(achievement_data).execute()
+            response = await run_query(supabase.table('achievements').insert(achievement_data))
             return response.data[0] if response.data else None
         else:
             return response.data[0]
@@ -149,7 +401,7 @@ async def add_achievement(discord_id, achievement_name):
 async def get_user_achievements(discord_id):
     """Get all achievements for a user"""
     try:
-        response = supabase.table('achievements').select('*').eq('user_id', discord_id).execute()
+        response = await run_query(supabase.table('achievements').select('*').eq('user_id', discord_id))
         return response.data
     except Exception as e:
         print(f"Error getting user achievements: {e}")
@@ -159,7 +411,7 @@ async def add_role(role_name, description, permissions=None):
     """Add a role to the database"""
     try:
         # Check if role already exists
-        response = supabase.table('roles').select('*').eq('role_name', role_name).execute()
+        response = await run_query(supabase.table('roles').select('*').eq('role_name', role_name))
         
         if not response.data:
             role_data = {
@@ -168,7 +420,7 @@ async def add_role(role_name, description, permissions=None):
                 'permissions': permissions or []
             }
             
-            response = supabase.table('roles').insert(role_data).execute()
+            response = await run_query(supabase.table('roles').insert(role_data))
             return response.data[0] if response.data else None
         else:
             return response.data[0]
@@ -179,7 +431,7 @@ async def add_role(role_name, description, permissions=None):
 async def get_roles():
     """Get all roles from the database"""
     try:
-        response = supabase.table('roles').select('*').execute()
+        response = await run_query(supabase.table('roles').select('*'))
         return response.data
     except Exception as e:
         print(f"Error getting roles: {e}")
@@ -188,7 +440,7 @@ async def get_roles():
 async def get_user_balance(discord_id):
     """Get a user's economy balance"""
     try:
-        response = supabase.table('economy').select('balance').eq('user_id', discord_id).execute()
+        response = await run_query(supabase.table('economy').select('balance').eq('user_id', discord_id))
         if response.data:
             return response.data[0]['balance']
         return 0
@@ -196,36 +448,70 @@ async def get_user_balance(discord_id):
         print(f"Error getting user balance: {e}")
         return 0
 
-async def update_user_balance(discord_id, amount_to_add):
-    """Update a user's economy balance"""
+async def increment_user_balance(discord_id, delta, required=0):
+    """Atomically add delta to a user's balance and return the new balance
+    
+    Runs the increment_balance function (sql/functions.sql) in a single round trip.
+    Returns None if the user doesn't have enough coins (the balance would go negative,
+    or is lower than required) or if the query fails.
+    """
     try:
-        # Check if user has an economy record
-        response = supabase.table('economy').select('*').eq('user_id', discord_id).execute()
-        
-        if response.data:
-            # Update existing record
-            current_balance = response.data[0]['balance']
-            new_balance = current_balance + amount_to_add
-            response = supabase.table('economy').update({'balance': new_balance}).eq('user_id', discord_id).execute()
-        else:
-            # Create new record
-            response = supabase.table('economy').insert({'user_id': discord_id, 'balance': amount_to_add}).execute()
-        
-        return response.data[0] if response.data else None
+        params = {
+            'p_user_id': discord_id,
+            'p_delta': delta,
+            'p_required': required
+        }
+        response = await run_query(supabase.rpc('increment_balance', params))
+        return response.data
     except Exception as e:
-        print(f"Error updating user balance: {e}")
+        print(f"Error incrementing user balance: {e}")
         return None
+    finally:
+        invalidate_user(discord_id)
 
-async def add_punishment(discord_id, punishment_type, reason, duration=None):
-    """Add a punishment record for a user"""
+async def transfer_balance(from_id, to_id, amount):
+    """Atomically move coins from one user to another
+    
+    Returns {'from_balance', 'to_balance'} with the new balances, or None if the
+    sender doesn't have enough coins or the query fails. Raises ValueError for a transfer
+    to the same user or a non-positive amount, which the RPC would also reject with null.
+    """
+    if from_id == to_id:
+        raise ValueError("Cannot transfer coins to the same user")
+    if amount <= 0:
+        raise ValueError("The amount to transfer must be positive")
+    
     try:
-        # Primero verificamos si el usuario existe
-        user = await get_user(discord_id)
-        
-        # Si el usuario no existe, lo creamos primero
-        if not user:
-            # Creamos un usuario con valores predeterminados ya que no tenemos el nombre de usuario real
-            await create_user(discord_id, f"User_{discord_id}", "0000")
+        params = {
+            'p_from': from_id,
+            'p_to': to_id,
+            'p_amount': amount
+        }
+        response = await run_query(supabase.rpc('transfer_balance', params))
+        return response.data
+    except Exception as e:
+        print(f"Error transferring balance: {e}")
+        return None
+    finally:
+        invalidate_user(from_id)
+        invalidate_user(to_id)
+
+async def update_user_balance(discord_id, amount_to_add):
+    """Update a user's economy balance"""
+    new_balance = await increment_user_balance(discord_id, amount_to_add)
+    if new_balance is None:
+        return None
+    return {'user_id': discord_id, 'balance': new_balance}
+
+async def add_punishment(discord_id, punishment_type, reason, duration=None, guild_id=None):
+    """Add a punishment record for a user
+    
+    guild_id is not stored (punishments has no guild column); for bans and unbans it keeps
+    recorded_bans in sync so the periodic ban sync doesn't record the same ban twice.
+    """
+    try:
+        # Nos aseguramos de que el usuario exista (sin consulta si ya es conocido)
+        await ensure_user(discord_id)
         
         # Convertir la duración a un formato de timestamp si es un número
         if duration is not None and isinstance(duration, (int, float)):
@@ -240,16 +526,78 @@ async def add_punishment(discord_id, punishment_type, reason, duration=None):
             'reason': reason,
             'duration': duration_timestamp
         }
-        response = supabase.table('punishments').insert(punishment_data).execute()
+        response = await run_query(supabase.table('punishments').insert(punishment_data))
+        if guild_id is not None:
+            if punishment_type == "ban":
+                recorded_bans.add((guild_id, discord_id))
+            elif punishment_type == "unban":
+                recorded_bans.discard((guild_id, discord_id))
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding punishment: {e}")
         return None
 
+# (guild_id, discord_id) de los bans vigentes que ya están registrados en punishments.
+# La sincronización de bans la compara con la lista de bans de cada servidor: solo inserta
+# los que faltan y quita los que ya no están (desbaneos), así un ban posterior del mismo
+# usuario, o su ban en otro servidor, vuelve a registrarse.
+recorded_bans = set()
+
+async def load_recorded_bans(current_bans):
+    """Mark which of the current bans already have a row in punishments
+    
+    current_bans is the set of (guild_id, discord_id) from the servers' ban lists. The table
+    doesn't store the guild, so each user's ban rows minus their unban rows is the number of
+    their current bans that count as recorded.
+    """
+    counts = await get_punishment_counts(("ban", "unban"))
+    outstanding = {
+        user_id: types.get("ban", 0) - types.get("unban", 0)
+        for user_id, types in counts.items()
+    }
+    recorded_bans.clear()
+    for guild_id, user_id in sorted(current_bans):
+        if outstanding.get(user_id, 0) > 0:
+            outstanding[user_id] -= 1
+            recorded_bans.add((guild_id, user_id))
+    return len(recorded_bans)
+
+async def get_punishment_counts(punishment_types, page_size=1000):
+    """Count the punishments of the given types per user: {user_id: {punishment_type: count}}"""
+    counts = {}
+    start = 0
+    while True:
+        response = await run_query(
+            supabase.table('punishments').select('user_id, punishment_type')
+            .in_('punishment_type', list(punishment_types))
+            .order('id').range(start, start + page_size - 1)
+        )
+        for row in response.data:
+            types = counts.setdefault(row['user_id'], {})
+            types[row['punishment_type']] = types.get(row['punishment_type'], 0) + 1
+        if len(response.data) < page_size:
+            break
+        start += page_size
+    return counts
+
+async def bulk_add_punishments(punishments, chunk_size=500, progress=None):
+    """Insert many punishment rows ({'user_id', 'punishment_type', 'reason', 'duration'}) in chunks
+    
+    progress, if given, is called as progress(inserted, total) after each chunk.
+    """
+    inserted = 0
+    for start in range(0, len(punishments), chunk_size):
+        chunk = punishments[start:start + chunk_size]
+        await run_query(supabase.table('punishments').insert(chunk))
+        inserted += len(chunk)
+        if progress:
+            progress(inserted, len(punishments))
+    return inserted
+
 async def get_user_punishments(discord_id):
     """Get all punishments for a user"""
     try:
-        response = supabase.table('punishments').select('*').eq('user_id', discord_id).execute()
+        response = await run_query(supabase.table('punishments').select('*').eq('user_id', discord_id))
         return response.data
     except Exception as e:
         print(f"Error getting user punishments: {e}")
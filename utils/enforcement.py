@@ -0,0 +1,218 @@
+import os
+import asyncio
+import datetime
+import time
+import discord
+from utils.database import add_punishment
+
+# Configuración del ejecutor de sanciones de AutoMod
+ENFORCEMENT_BATCH_DELAY = float(os.getenv("ENFORCEMENT_BATCH_DELAY_MS", "500")) / 1000
+ENFORCEMENT_MAX_QUEUE = int(os.getenv("ENFORCEMENT_MAX_QUEUE", "1000"))
+ENFORCEMENT_IDLE_TIMEOUT = 60
+MUTE_DURATION = 3600
+
+# Gravedad de cada sanción: si un usuario acumula varias en un mismo lote se aplica solo la mayor
+SEVERITY = {"delete": 0, "warn": 1, "mute": 2, "kick": 3, "ban": 4}
+
+class Enforcement:
+    """Una sanción pendiente de AutoMod"""
+
+    __slots__ = ('guild', 'member', 'channel', 'message', 'violation', 'punishment')
+
+    def __init__(self, guild, member, violation, punishment, channel=None, message=None):
+        self.guild = guild
+        self.member = member
+        self.violation = violation
+        self.punishment = punishment
+        self.channel = channel
+        self.message = message
+
+class PunishmentExecutor:
+    """Cola de sanciones de AutoMod con un worker por servidor
+
+    La detección solo encola la sanción y sigue con el siguiente mensaje. Cada worker
+    espera ENFORCEMENT_BATCH_DELAY segundos para juntar las sanciones de una ráfaga y las
+    aplica en lote: los mensajes de un canal se borran con un solo delete_messages, cada
+    usuario recibe una única sanción (la más grave), y los avisos y el registro en el canal
+    de moderación se envían como un mensaje por canal. Las llamadas de un mismo servidor
+    son secuenciales, así que nunca compiten por los mismos buckets de rate limit.
+    """
+
+    def __init__(self, bot, batch_delay=ENFORCEMENT_BATCH_DELAY, max_queue=ENFORCEMENT_MAX_QUEUE):
+        self.bot = bot
+        self.batch_delay = batch_delay
+        self.max_queue = max_queue
+        self.queues = {}
+        self.workers = {}
+        self.stats = {'queued': 0, 'dropped': 0, 'batches': 0, 'deleted': 0, 'punished': 0, 'errors': 0}
+
+    def submit(self, enforcement):
+        """Encola una sanción sin esperar a que se aplique"""
+        guild_id = enforcement.guild.id
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = asyncio.Queue(maxsize=self.max_queue)
+
+        try:
+            queue.put_nowait(enforcement)
+            self.stats['queued'] += 1
+        except asyncio.QueueFull:
+            # Durante un raid enorme es preferible perder sanciones a acumular memoria sin límite
+            self.stats['dropped'] += 1
+            return
+
+        worker = self.workers.get(guild_id)
+        if worker is None or worker.done():
+            self.workers[guild_id] = asyncio.create_task(self._worker(guild_id, queue))
+
+    async def close(self):
+        """Detiene los workers y aplica lo que quede en las colas"""
+        for worker in self.workers.values():
+            worker.cancel()
+        self.workers.clear()
+
+        for queue in self.queues.values():
+            batch = []
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch:
+                try:
+                    await self._apply_batch(batch)
+                except Exception as e:
+                    print(f"Error applying AutoMod punishments: {e}")
+        self.queues.clear()
+
+    async def _worker(self, guild_id, queue):
+        while True:
+            try:
+                first = await asyncio.wait_for(queue.get(), timeout=ENFORCEMENT_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Servidor inactivo: el worker termina y se vuelve a crear con la siguiente sanción
+                if queue.empty():
+                    self.workers.pop(guild_id, None)
+                    self.queues.pop(guild_id, None)
+                    return
+                continue
+
+            # Pequeña espera para agrupar el resto de la ráfaga en el mismo lote
+            await asyncio.sleep(self.batch_delay)
+            batch = [first]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self._apply_batch(batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error applying AutoMod punishments: {e}")
+
+    async def _apply_batch(self, batch):
+        start = time.perf_counter()
+        guild = batch[0].guild
+        self.stats['batches'] += 1
+
+        # 1. Borrar los mensajes, agrupados por canal
+        messages_by_channel = {}
+        for enforcement in batch:
+            if enforcement.message is not None:
+                messages_by_channel.setdefault(enforcement.channel, []).append(enforcement.message)
+
+        for channel, messages in messages_by_channel.items():
+            await self._delete_messages(channel, messages)
+
+        # 2. Una sola sanción por usuario: la más grave del lote
+        strongest = {}
+        for enforcement in batch:
+            current = strongest.get(enforcement.member.id)
+            if current is None or SEVERITY.get(enforcement.punishment, 0) > SEVERITY.get(current.punishment, 0):
+                strongest[enforcement.member.id] = enforcement
+
+        notices = {}
+        log_lines = []
+        for enforcement in strongest.values():
+            outcome = await self._punish(enforcement)
+            if outcome is None:
+                continue
+            log_lines.append(f"{enforcement.member.mention} — {outcome} ({enforcement.violation})")
+            if enforcement.channel is not None and enforcement.punishment != "delete":
+                notices.setdefault(enforcement.channel, []).append(f"{enforcement.member.mention} has been {outcome} for violating the {enforcement.violation} filter.")
+
+        # 3. Un aviso por canal y un único registro para todo el lote
+        for channel, lines in notices.items():
+            try:
+                await channel.send("\n".join(lines)[:2000], delete_after=5)
+            except Exception:
+                pass
+
+        await self._log_batch(guild, log_lines, len(batch), time.perf_counter() - start)
+
+    async def _delete_messages(self, channel, messages):
+        # delete_messages borra hasta 100 mensajes con una sola llamada
+        for i in range(0, len(messages), 100):
+            chunk = messages[i:i + 100]
+            try:
+                if len(chunk) == 1:
+                    await chunk[0].delete()
+                else:
+                    await channel.delete_messages(chunk)
+                self.stats['deleted'] += len(chunk)
+            except discord.NotFound:
+                pass
+            except discord.HTTPException:
+                # Mensajes demasiado antiguos para el borrado en bloque: se borran uno a uno
+                for message in chunk:
+                    try:
+                        await message.delete()
+                        self.stats['deleted'] += 1
+                    except Exception:
+                        pass
+
+    async def _punish(self, enforcement):
+        """Aplica la sanción a un usuario y devuelve cómo se describe en el registro"""
+        member = enforcement.member
+        reason = f"AutoMod: {enforcement.violation}"
+        punishment = enforcement.punishment
+
+        try:
+            if punishment == "delete":
+                return "message deleted" if enforcement.message is not None else None
+            elif punishment == "warn":
+                await add_punishment(member.id, "warn", reason)
+                outcome = "warned"
+            elif punishment == "mute":
+                until = discord.utils.utcnow() + datetime.timedelta(seconds=MUTE_DURATION)
+                await member.timeout(until, reason=reason)
+                await add_punishment(member.id, "mute", reason, MUTE_DURATION)
+                outcome = "muted"
+            elif punishment == "kick":
+                await member.kick(reason=reason)
+                await add_punishment(member.id, "kick", reason)
+                outcome = "kicked"
+            elif punishment == "ban":
+                await member.ban(reason=reason, delete_message_seconds=0)
+                await add_punishment(member.id, "ban", reason, guild_id=member.guild.id)
+                outcome = "banned"
+            else:
+                return None
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error applying AutoMod {punishment} to {member.id}: {e}")
+            return None
+
+        self.stats['punished'] += 1
+        return outcome
+
+    async def _log_batch(self, guild, log_lines, total, duration):
+        """Envía un resumen del lote al canal de registro de moderación"""
+        logging_cog = self.bot.get_cog("Logging")
+        if logging_cog is None or not log_lines:
+            return
+
+        embed = discord.Embed(
+            title="AutoMod Actions",
+            description="\n".join(log_lines)[:4000],
+            color=discord.Color.orange(),
+            timestamp=datetime.datetime.now()
+        )
+        embed.set_footer(text=f"{total} violations handled in {duration * 1000:.0f} ms")
+        await logging_cog.log_event(guild, "moderation", embed)
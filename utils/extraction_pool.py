@@ -0,0 +1,128 @@
+import os
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Hilos dedicados a yt-dlp; el resto del bot sigue usando el executor por defecto del loop
+YTDL_WORKERS = int(os.getenv("YTDL_WORKERS", "3"))
+
+# Prioridades de extracción (menor = antes)
+PRIORITY_NOW_PLAYING = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_NOW_PLAYING: 'now_playing',
+    PRIORITY_PREFETCH: 'prefetch',
+    PRIORITY_BACKGROUND: 'background',
+}
+
+class ExtractionPool:
+    """Pool acotado de hilos para las extracciones de yt-dlp, con cola por prioridad
+
+    Como mucho se ejecutan workers extracciones a la vez. Las pendientes esperan en una
+    cola de prioridad, así que la canción que va a sonar adelanta a las pistas de una
+    playlist que se está cargando en segundo plano. Los trabajos de un servidor se pueden
+    cancelar (por ejemplo al desconectarse del canal de voz): los que aún esperan no llegan
+    a ejecutarse y el resultado de los que ya están en marcha se descarta.
+    """
+
+    def __init__(self, workers=YTDL_WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytdl")
+        self.queue = None
+        self._tasks = []
+        self._sequence = itertools.count()
+        self._jobs = {}  # guild_id -> futuros pendientes o en ejecución
+        self.queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self.running = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _start(self):
+        if self.queue is None:
+            self.queue = asyncio.PriorityQueue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def run(self, func, *args, priority=PRIORITY_BACKGROUND, guild_id=None):
+        """Ejecuta func(*args) en el pool y devuelve su resultado"""
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((priority, next(self._sequence), func, args, future, time.perf_counter()))
+        self.queued[priority] += 1
+        self.peak_queued = max(self.peak_queued, sum(self.queued.values()))
+
+        jobs = self._jobs.setdefault(guild_id, set())
+        jobs.add(future)
+        try:
+            return await future
+        finally:
+            jobs.discard(future)
+            if not jobs and self._jobs.get(guild_id) is jobs:
+                del self._jobs[guild_id]
+
+    def cancel_guild(self, guild_id):
+        """Cancela los trabajos de un servidor; devuelve cuántos se han cancelado"""
+        jobs = self._jobs.pop(guild_id, set())
+        count = 0
+        for future in jobs:
+            if future.cancel():
+                count += 1
+        self.cancelled += count
+        return count
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, func, args, future, queued_at = await self.queue.get()
+            self.queued[priority] -= 1
+            try:
+                if future.done():
+                    # Cancelado mientras esperaba en la cola
+                    continue
+
+                wait = time.perf_counter() - queued_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+                self.running += 1
+                try:
+                    result = await loop.run_in_executor(self.executor, func, *args)
+                except Exception as e:
+                    self.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.completed += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    self.running -= 1
+            finally:
+                self.queue.task_done()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        started = self.completed + self.failed
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'queued': {PRIORITY_NAMES[priority]: count for priority, count in self.queued.items()},
+            'peak_queued': self.peak_queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'avg_wait_ms': self.total_wait / started * 1000 if started else 0.0,
+            'max_wait_ms': self.max_wait * 1000
+        }
@@ -0,0 +1,119 @@
+import time
+from utils.database import get_user
+
+# Orden de las etapas del pipeline de mensajes (menor = antes)
+STAGE_MODERATION = 0
+STAGE_COMMANDS = 10
+STAGE_ACCOUNTING = 20
+STAGE_ACHIEVEMENTS = 30
+
+class MessageContext:
+    """Contexto compartido por todas las etapas que procesan un mismo mensaje"""
+
+    def __init__(self, bot, message):
+        self.bot = bot
+        self.message = message
+        self.author = message.author
+        self.guild = message.guild
+        self.channel = message.channel
+        self.content = message.content
+        self.content_lower = message.content.lower()
+        self.is_command = message.content.startswith(bot.command_prefix)
+        self.stopped = False
+        self.stop_reason = None
+        self.timings = {}
+        # Nivel alcanzado si la etapa de XP subió de nivel al autor con este mensaje
+        self.new_level = None
+        self._user = None
+        self._user_loaded = False
+
+    async def get_user(self):
+        """Fila del autor en la tabla users (se consulta como mucho una vez por mensaje)"""
+        if not self._user_loaded:
+            self._user = await get_user(self.author.id)
+            self._user_loaded = True
+        return self._user
+
+    def set_user(self, user):
+        """Sustituye la fila del autor (p. ej. por la que devuelve una escritura) para las etapas siguientes"""
+        self._user = user
+        self._user_loaded = True
+
+    def stop(self, reason=None):
+        """Detiene el pipeline: las etapas siguientes no procesan este mensaje"""
+        self.stopped = True
+        self.stop_reason = reason
+
+class MessagePipeline:
+    """Procesa cada mensaje a través de una lista ordenada de etapas
+
+    Sustituye a los listeners on_message independientes de cada cog: las etapas se
+    ejecutan en orden (moderación, comandos, contabilidad de XP/estadísticas y logros),
+    comparten un MessageContext y cualquiera puede cortar el procesamiento con ctx.stop().
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.stages = []
+        self.messages_processed = 0
+        self.messages_stopped = 0
+        self.stop_reasons = {}
+        self.stage_stats = {}
+
+    def add_stage(self, name, handler, order, cog=None):
+        """Registra una etapa; handler es una corrutina que recibe el MessageContext"""
+        self.remove_stage(name)
+        self.stages.append((order, name, handler, cog))
+        self.stages.sort(key=lambda stage: stage[0])
+
+    def remove_stage(self, name):
+        self.stages = [stage for stage in self.stages if stage[1] != name]
+
+    async def process(self, message):
+        """Ejecuta todas las etapas para un mensaje"""
+        ctx = MessageContext(self.bot, message)
+        self.messages_processed += 1
+
+        for order, name, handler, cog in self.stages:
+            start = time.perf_counter()
+            try:
+                await self.bot.perf.measure(f"pipeline.{name}", cog, handler(ctx))
+            except Exception as e:
+                print(f"Error in message pipeline stage {name}: {e}")
+            ctx.timings[name] = time.perf_counter() - start
+            self._record_timing(name, ctx.timings[name])
+
+            if ctx.stopped:
+                self.messages_stopped += 1
+                reason = ctx.stop_reason or name
+                self.stop_reasons[reason] = self.stop_reasons.get(reason, 0) + 1
+                break
+
+        return ctx
+
+    def _record_timing(self, name, duration):
+        stats = self.stage_stats.get(name)
+        if stats is None:
+            stats = self.stage_stats[name] = {'calls': 0, 'total_time': 0.0, 'max_time': 0.0}
+        stats['calls'] += 1
+        stats['total_time'] += duration
+        stats['max_time'] = max(stats['max_time'], duration)
+
+    def stats(self):
+        """Contadores del pipeline y tiempos por etapa, en el orden en que se ejecutan"""
+        stages = {}
+        for order, name, handler, cog in self.stages:
+            stats = self.stage_stats.get(name, {'calls': 0, 'total_time': 0.0, 'max_time': 0.0})
+            stages[name] = {
+                'order': order,
+                'cog': cog,
+                'calls': stats['calls'],
+                'avg_ms': stats['total_time'] / stats['calls'] * 1000 if stats['calls'] else 0.0,
+                'max_ms': stats['max_time'] * 1000
+            }
+        return {
+            'processed': self.messages_processed,
+            'stopped': self.messages_stopped,
+            'stop_reasons': dict(self.stop_reasons),
+            'stages': stages
+        }
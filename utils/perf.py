@@ -0,0 +1,179 @@
+import os
+import asyncio
+import json
+import time
+import types
+from collections import deque
+
+# Configuración del monitor de rendimiento
+LAG_SAMPLE_INTERVAL = float(os.getenv("PERF_LAG_INTERVAL", "0.5"))
+SLOW_CALLBACK_THRESHOLD = float(os.getenv("PERF_SLOW_THRESHOLD", "0.1"))
+PERF_EXPORT_PATH = os.getenv("PERF_EXPORT_PATH", "perf_stats.json")
+PERF_EXPORT_INTERVAL = float(os.getenv("PERF_EXPORT_INTERVAL", "30"))
+
+@types.coroutine
+def _drive_timed(coro, timing):
+    """Ejecuta coro midiendo cuánto bloquea el event loop cada paso síncrono
+
+    Cada llamada a coro.send() es un tramo en el que el loop no puede atender nada más.
+    timing['blocking'] acaba con el tramo más largo y timing['busy'] con la suma de todos.
+    """
+    value, error = None, None
+    while True:
+        start = time.perf_counter()
+        try:
+            if error is not None:
+                future = coro.throw(error)
+            else:
+                future = coro.send(value)
+        except StopIteration as e:
+            return e.value
+        finally:
+            step = time.perf_counter() - start
+            timing['busy'] += step
+            timing['blocking'] = max(timing['blocking'], step)
+
+        try:
+            value, error = (yield future), None
+        except BaseException as e:
+            value, error = None, e
+
+class PerfMonitor:
+    """Instrumentación del event loop del bot
+
+    Mide el retraso del event loop con una tarea que duerme a intervalos fijos y registra
+    los handlers (eventos, listeners de cogs y comandos) que tardan más que el umbral,
+    indicando el cog y el handler responsables.
+    """
+
+    def __init__(self, lag_interval=LAG_SAMPLE_INTERVAL, slow_threshold=SLOW_CALLBACK_THRESHOLD):
+        self.lag_interval = lag_interval
+        self.slow_threshold = slow_threshold
+        self.started_at = time.time()
+        self.lag_samples = deque(maxlen=600)
+        self.max_lag = 0.0
+        self.handlers = {}
+        self.slow_callbacks = deque(maxlen=100)
+        self.sources = {}
+        self._tasks = []
+
+    def start(self):
+        """Inicia el muestreo del retraso del loop y la exportación periódica"""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._sample_lag()),
+                asyncio.create_task(self._export_loop())
+            ]
+
+    def add_source(self, name, stats):
+        """Añade al resumen exportado las métricas de otro componente (stats() -> dict serializable)"""
+        self.sources[name] = stats
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _sample_lag(self):
+        """Mide cuánto se retrasa el loop en despertar de un sleep"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(loop.time() - start - self.lag_interval, 0.0)
+            self.lag_samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    async def _export_loop(self):
+        """Escribe periódicamente un resumen en JSON para el panel de control (app.py)"""
+        while True:
+            await asyncio.sleep(PERF_EXPORT_INTERVAL)
+            try:
+                # El resumen se construye y serializa en el loop, que es quien modifica las
+                # métricas; en el hilo solo se escribe el fichero
+                payload = json.dumps(self.snapshot())
+                await asyncio.to_thread(self._write_export, PERF_EXPORT_PATH, payload)
+            except Exception as e:
+                print(f"Error exporting perf stats: {e}")
+
+    async def measure(self, name, cog, coro):
+        """Ejecuta coro registrando su duración y su tramo bloqueante más largo"""
+        timing = {'busy': 0.0, 'blocking': 0.0}
+        start = time.perf_counter()
+        try:
+            return await _drive_timed(coro, timing)
+        finally:
+            self.record(name, cog, time.perf_counter() - start, timing['blocking'], timing['busy'])
+
+    def record(self, name, cog, duration, blocking, busy):
+        """Acumula las estadísticas de una ejecución de un handler"""
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = {
+                'cog': cog,
+                'calls': 0,
+                'total_time': 0.0,
+                'max_time': 0.0,
+                'busy_time': 0.0,
+                'max_blocking': 0.0,
+                'slow_calls': 0
+            }
+        stats['calls'] += 1
+        stats['total_time'] += duration
+        stats['max_time'] = max(stats['max_time'], duration)
+        stats['busy_time'] += busy
+        stats['max_blocking'] = max(stats['max_blocking'], blocking)
+
+        if blocking >= self.slow_threshold:
+            stats['slow_calls'] += 1
+            self.slow_callbacks.append({
+                'time': time.time(),
+                'handler': name,
+                'cog': cog,
+                'duration': duration,
+                'blocking': blocking
+            })
+
+    def lag_summary(self):
+        """Devuelve el retraso actual, medio, p95 y máximo del event loop en segundos"""
+        samples = sorted(self.lag_samples)
+        if not samples:
+            return {'current': 0.0, 'avg': 0.0, 'p95': 0.0, 'max': self.max_lag}
+        return {
+            'current': self.lag_samples[-1],
+            'avg': sum(samples) / len(samples),
+            'p95': samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+            'max': self.max_lag
+        }
+
+    def top_handlers(self, key='max_blocking', limit=10):
+        """Devuelve los handlers ordenados por la métrica indicada"""
+        ranked = sorted(self.handlers.items(), key=lambda item: item[1][key], reverse=True)
+        return ranked[:limit]
+
+    def snapshot(self):
+        """Resumen serializable de todas las métricas"""
+        snapshot = {
+            'uptime': time.time() - self.started_at,
+            'slow_threshold': self.slow_threshold,
+            'loop_lag': self.lag_summary(),
+            'handlers': self.handlers,
+            'slow_callbacks': list(self.slow_callbacks)
+        }
+        for name, stats in self.sources.items():
+            try:
+                snapshot[name] = stats()
+            except Exception as e:
+                print(f"Error collecting {name} perf stats: {e}")
+        return snapshot
+
+    def export(self, path):
+        """Escribe el resumen en un archivo JSON (debe llamarse desde el event loop)"""
+        self._write_export(path, json.dumps(self.snapshot()))
+
+    def _write_export(self, path, payload):
+        # Se reemplaza de forma atómica para que app.py nunca lea un fichero a medias
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
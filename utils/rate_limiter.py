@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """Limitador de ritmo token bucket
+
+    Se rellenan rate fichas por segundo hasta un máximo de capacity. Cada llamada a acquire
+    consume una ficha y espera lo justo si no queda ninguna, así que se permiten ráfagas
+    cortas sin superar el ritmo medio (en lugar de dormir un tiempo fijo entre llamadas).
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.acquired = 0
+        self.total_wait = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Espera hasta que haya una ficha disponible y la consume"""
+        start = time.monotonic()
+        # El lock mantiene el orden de llegada entre las tareas que esperan
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+        self.acquired += 1
+        self.total_wait += time.monotonic() - start
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'acquired': self.acquired,
+            'avg_wait_ms': self.total_wait / self.acquired * 1000 if self.acquired else 0.0
+        }
@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+class Scheduler:
+    """Planificador de temporizadores compartido basado en un montículo (min-heap)
+
+    Una única tarea duerme hasta el siguiente vencimiento y se despierta antes si se
+    programa algo más temprano. Programar y cancelar cuestan O(log n) y O(1): las
+    entradas canceladas se marcan y se descartan cuando llegan a la cima del montículo.
+
+    Las claves son tuplas (namespace, id), por ejemplo ("reminders", "123"); volver a
+    programar una clave sustituye al temporizador anterior. Los tiempos son timestamps
+    de época (time.time()), los mismos que guardan los cogs en sus documentos.
+
+    No se ejecuta nada hasta llamar a start(): los cogs restauran sus temporizadores en
+    cog_load, antes de que el bot inicie sesión, y los que ya vencieron no deben
+    dispararse (y perderse) antes de que el bot pueda entregarlos.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running = set()
+        self._started = asyncio.Event()
+        self.fired = 0
+        self.on_time = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def schedule(self, key, when, callback, *args):
+        """Ejecuta callback(*args) (una corrutina) en el instante when"""
+        self.cancel(key)
+        # El último campo indica si ya estaba vencido al programarse (p. ej. al restaurar tras
+        # un reinicio): esos no cuentan para las estadísticas de retraso
+        entry = [when, next(self._counter), key, callback, args, False, when <= time.time()]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+        # Solo hace falta despertar al bucle si el nuevo temporizador es el más próximo
+        if self._heap[0] is entry:
+            self._wakeup.set()
+        self._ensure_running()
+
+    def cancel(self, key):
+        """Cancela el temporizador de una clave (no hace nada si no existe)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[5] = True
+            return True
+        return False
+
+    def cancel_namespace(self, namespace):
+        """Cancela todos los temporizadores de un namespace (por ejemplo al descargar un cog)"""
+        for key in [key for key in self._entries if key[0] == namespace]:
+            self.cancel(key)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self):
+        """Empieza a ejecutar los temporizadores (los programados antes esperan hasta aquí)"""
+        self._started.set()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self):
+        return {
+            'pending': len(self._entries),
+            'started': self._started.is_set(),
+            'fired': self.fired,
+            'avg_lateness_ms': round(self.total_lateness / self.on_time * 1000, 2) if self.on_time else 0.0,
+            'max_lateness_ms': round(self.max_lateness * 1000, 2)
+        }
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        await self._started.wait()
+        while True:
+            # Descartar las entradas canceladas de la cima
+            while self._heap and self._heap[0][5]:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            entry = heapq.heappop(self._heap)
+            when, _, key, callback, args, _, overdue = entry
+            self._entries.pop(key, None)
+
+            self.fired += 1
+            if not overdue:
+                self.on_time += 1
+                lateness = time.time() - when
+                self.total_lateness += lateness
+                self.max_lateness = max(self.max_lateness, lateness)
+
+            # Cada temporizador se ejecuta en su propia tarea para no retrasar a los siguientes
+            task = asyncio.create_task(self._fire(key, callback, args))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key, callback, args):
+        try:
+            await callback(*args)
+        except Exception as e:
+            print(f"Error running scheduled task {key}: {e}")
@@ -0,0 +1,124 @@
+import datetime
+import time
+import discord
+from collections import OrderedDict, deque
+
+class RateWindow:
+    """Suma de eventos (con peso) ocurridos en los últimos window segundos
+
+    Cada evento entra y sale de la cola una sola vez, así que el coste es O(1) amortizado.
+    """
+
+    __slots__ = ('window', 'events', 'total', 'last')
+
+    def __init__(self, window):
+        self.window = window
+        self.events = deque()
+        self.total = 0
+        self.last = 0.0
+
+    def add(self, now, weight=1):
+        """Registra un evento y devuelve el total dentro de la ventana"""
+        self.events.append((now, weight))
+        self.total += weight
+        self.last = now
+
+        expired_before = now - self.window
+        while self.events[0][0] < expired_before:
+            _, old_weight = self.events.popleft()
+            self.total -= old_weight
+        return self.total
+
+class WindowStore:
+    """Contadores RateWindow por clave con memoria acotada
+
+    Las claves sin actividad durante ttl segundos se eliminan automáticamente, y nunca
+    se guardan más de maxsize claves (se descartan las que llevan más tiempo inactivas).
+    """
+
+    def __init__(self, ttl=300, maxsize=50000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._windows = OrderedDict()
+
+    def add(self, key, window, now, weight=1):
+        """Registra un evento para key en una ventana de window segundos y devuelve el total"""
+        entry = self._windows.pop(key, None)
+        if entry is None or entry.window != window:
+            entry = RateWindow(window)
+        self._windows[key] = entry
+        total = entry.add(now, weight)
+        self._expire(now)
+        return total
+
+    def _expire(self, now):
+        # Las claves están ordenadas de menos a más reciente: basta con mirar el principio
+        while self._windows:
+            key, entry = next(iter(self._windows.items()))
+            if len(self._windows) <= self.maxsize and entry.last >= now - self.ttl:
+                break
+            self._windows.popitem(last=False)
+
+    def __len__(self):
+        return len(self._windows)
+
+class SpamDetector:
+    """Detección de flood, mensajes duplicados, menciones masivas y raids
+
+    Mantiene contadores de ventana deslizante por usuario y por canal; cada mensaje
+    actualiza un número fijo de contadores, por lo que el coste es O(1).
+    """
+
+    def __init__(self, ttl=300, maxsize=50000):
+        self.messages = WindowStore(ttl, maxsize)
+        self.duplicates = WindowStore(ttl, maxsize)
+        self.channel_duplicates = WindowStore(ttl, maxsize)
+        self.mentions = WindowStore(ttl, maxsize)
+        self.joins = WindowStore(ttl, maxsize)
+
+    def check_message(self, message, rules):
+        """Devuelve la infracción de spam que comete el mensaje ("spam", "duplicates", "mentions") o None"""
+        now = time.monotonic()
+        guild_id = message.guild.id
+        user_key = (guild_id, message.author.id)
+
+        if rules.spam:
+            count = self.messages.add(user_key, rules.spam["time_window"], now)
+            if count > rules.spam["message_limit"]:
+                return "spam"
+
+        if rules.duplicates and message.content:
+            content_hash = hash(message.content.strip().lower())
+            window = rules.duplicates["time_window"]
+
+            count = self.duplicates.add(user_key + (content_hash,), window, now)
+            if count >= rules.duplicates["duplicate_limit"]:
+                return "duplicates"
+
+            # El mismo texto pegado por varios usuarios en un canal
+            count = self.channel_duplicates.add((message.channel.id, content_hash), window, now)
+            if count >= rules.duplicates["channel_limit"]:
+                return "duplicates"
+
+        if rules.mentions:
+            mention_count = len(message.raw_mentions) + len(message.raw_role_mentions)
+            if message.mention_everyone:
+                mention_count += 1
+            if mention_count:
+                count = self.mentions.add(user_key, rules.mentions["time_window"], now, mention_count)
+                if count >= rules.mentions["mention_limit"]:
+                    return "mentions"
+
+        return None
+
+    def check_join(self, member, rules):
+        """Indica si la entrada de member forma parte de un raid de cuentas nuevas"""
+        if not rules.raid:
+            return False
+
+        account_age = discord.utils.utcnow() - member.created_at
+        if account_age > datetime.timedelta(days=rules.raid["account_age_days"]):
+            return False
+
+        count = self.joins.add(member.guild.id, rules.raid["time_window"], time.monotonic())
+        return count >= rules.raid["join_limit"]
@@ -0,0 +1,268 @@
+import os
+import asyncio
+import datetime
+import gzip
+import json
+import time
+
+# Backend de almacenamiento del estado de los cogs: "sqlite" (por defecto) o "json"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+STORAGE_PATH = os.getenv("STORAGE_PATH", "config/zenshell.db")
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "config/archive")
+
+# Retención: tiempo que los elementos terminados siguen en la colección activa antes de archivarse
+REMINDER_RETENTION = float(os.getenv("REMINDER_RETENTION_HOURS", "24")) * 3600
+GIVEAWAY_REROLL_WINDOW = float(os.getenv("GIVEAWAY_REROLL_WINDOW_HOURS", "168")) * 3600
+
+# Colecciones y los campos de cada documento que se copian a columnas indexadas:
+# due (fecha en la que vence), done (ya procesado) y owner (usuario propietario)
+COLLECTIONS = {
+    'reminders': {'file': 'config/reminders.json', 'due': 'due_time', 'done': 'completed', 'owner': 'user_id'},
+    'giveaways': {'file': 'config/giveaways.json', 'due': 'end_time', 'done': 'ended', 'owner': 'host_id'},
+    'polls': {'file': 'config/polls.json', 'due': 'created_at', 'done': None, 'owner': 'creator_id'},
+    'todos': {'file': 'config/todos.json', 'due': None, 'done': None, 'owner': None},
+    'streaks': {'file': 'config/streaks.json', 'due': 'last_claim', 'done': None, 'owner': None},
+}
+
+class JsonStorage:
+    """Backend que guarda cada colección como un único fichero JSON (el formato original)
+
+    Cada cambio reescribe el fichero completo, aunque la escritura es diferida y
+    atómica gracias al ConfigStore.
+
+    Como en SQLite, load() devuelve un diccionario propio del llamador: los cogs pueden
+    quitar elementos del suyo antes de llamar a archive() o delete() sin afectar a la copia
+    que se guarda aquí.
+    """
+
+    name = "json"
+
+    def __init__(self, config_store):
+        self.config_store = config_store
+        self.collections = {}
+
+    async def load(self, collection):
+        """Devuelve todos los documentos de una colección como un diccionario {clave: documento}"""
+        return dict(self._collection(collection))
+
+    def _collection(self, collection):
+        if collection not in self.collections:
+            self.collections[collection] = self.config_store.load(COLLECTIONS[collection]['file'], {})
+        return self.collections[collection]
+
+    async def put(self, collection, key, document):
+        data = self._collection(collection)
+        data[key] = document
+        self.config_store.save(COLLECTIONS[collection]['file'], data)
+
+    async def delete(self, collection, key):
+        await self.delete_many(collection, [key])
+
+    async def delete_many(self, collection, keys):
+        data = self._collection(collection)
+        for key in keys:
+            data.pop(key, None)
+        self.config_store.save(COLLECTIONS[collection]['file'], data)
+
+    async def archive(self, collection, keys):
+        """Mueve documentos terminados a un segmento comprimido JSONL (uno por mes) y los quita de la colección"""
+        data = self._collection(collection)
+        archived_at = time.time()
+        lines = []
+        for key in keys:
+            document = data.pop(key, None)
+            if document is not None:
+                lines.append(json.dumps({'key': key, 'data': document, 'archived_at': archived_at}) + "\n")
+        if not lines:
+            return
+
+        segment = os.path.join(ARCHIVE_DIR, f"{collection}-{datetime.datetime.now():%Y-%m}.jsonl.gz")
+        await asyncio.to_thread(self._append_segment, segment, lines)
+        self.config_store.save(COLLECTIONS[collection]['file'], data)
+
+    async def get_archived(self, collection, key):
+        """Busca un documento archivado (recorre los segmentos, solo para consultas puntuales)"""
+        return await asyncio.to_thread(self._find_archived, collection, key)
+
+    def _append_segment(self, segment, lines):
+        # Cada escritura añade un miembro gzip nuevo: el fichero nunca se reescribe
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with gzip.open(segment, 'at') as f:
+            f.writelines(lines)
+
+    def _find_archived(self, collection, key):
+        if not os.path.isdir(ARCHIVE_DIR):
+            return None
+        for filename in sorted(os.listdir(ARCHIVE_DIR), reverse=True):
+            if not filename.startswith(f"{collection}-"):
+                continue
+            with gzip.open(os.path.join(ARCHIVE_DIR, filename), 'rt') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry['key'] == key:
+                        return entry['data']
+        return None
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {'backend': self.name, 'collections': {name: len(data) for name, data in self.collections.items()}}
+
+class SQLiteStorage:
+    """Backend SQLite (aiosqlite) con una tabla indexada por colección
+
+    Cada documento es una fila (clave primaria + JSON), así que crear, modificar o borrar
+    un elemento es una escritura O(log n) en lugar de reescribir la colección entera.
+    La base de datos usa WAL para que las lecturas no bloqueen las escrituras. La primera
+    vez que se abre una colección se importa su fichero JSON (migración única).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=STORAGE_PATH):
+        self.path = path
+        self.db = None
+        self.writes = 0
+        self.write_time = 0.0
+        self._open_lock = asyncio.Lock()
+
+    async def open(self):
+        """Abre la base de datos, crea las tablas y migra los ficheros JSON existentes"""
+        async with self._open_lock:
+            if self.db is not None:
+                return
+
+            import aiosqlite
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = await aiosqlite.connect(self.path)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute("PRAGMA synchronous=NORMAL")
+            await db.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, migrated_at REAL NOT NULL)")
+
+            for collection in COLLECTIONS:
+                await db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {collection} ("
+                    "key TEXT PRIMARY KEY, data TEXT NOT NULL, due REAL, done INTEGER NOT NULL DEFAULT 0, owner TEXT)"
+                )
+                await db.execute(f"CREATE INDEX IF NOT EXISTS idx_{collection}_due ON {collection} (done, due)")
+                await db.execute(f"CREATE INDEX IF NOT EXISTS idx_{collection}_owner ON {collection} (owner)")
+                # Archivo de solo inserción para los elementos terminados
+                await db.execute(f"CREATE TABLE IF NOT EXISTS {collection}_archive (key TEXT NOT NULL, data TEXT NOT NULL, archived_at REAL NOT NULL)")
+                await db.execute(f"CREATE INDEX IF NOT EXISTS idx_{collection}_archive_key ON {collection}_archive (key)")
+            await db.commit()
+
+            self.db = db
+            for collection in COLLECTIONS:
+                await self._migrate_json(collection)
+
+    async def close(self):
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    async def load(self, collection):
+        """Devuelve todos los documentos de una colección como un diccionario {clave: documento}"""
+        await self.open()
+        async with self.db.execute(f"SELECT key, data FROM {collection}") as cursor:
+            rows = await cursor.fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    async def put(self, collection, key, document):
+        """Inserta o reemplaza un documento"""
+        await self.open()
+        start = time.perf_counter()
+        await self.db.execute(
+            f"INSERT INTO {collection} (key, data, due, done, owner) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, due = excluded.due, done = excluded.done, owner = excluded.owner",
+            self._row(collection, key, document)
+        )
+        await self.db.commit()
+        self._record_write(start)
+
+    async def delete(self, collection, key):
+        await self.delete_many(collection, [key])
+
+    async def delete_many(self, collection, keys):
+        await self.open()
+        start = time.perf_counter()
+        await self.db.executemany(f"DELETE FROM {collection} WHERE key = ?", [(key,) for key in keys])
+        await self.db.commit()
+        self._record_write(start)
+
+    async def archive(self, collection, keys):
+        """Mueve documentos terminados a la tabla de archivo en una sola transacción"""
+        await self.open()
+        start = time.perf_counter()
+        archived_at = time.time()
+        rows = [(archived_at, str(key)) for key in keys]
+        await self.db.executemany(
+            f"INSERT INTO {collection}_archive (key, data, archived_at) SELECT key, data, ? FROM {collection} WHERE key = ?",
+            rows
+        )
+        await self.db.executemany(f"DELETE FROM {collection} WHERE key = ?", [(key,) for _, key in rows])
+        await self.db.commit()
+        self._record_write(start)
+
+    async def get_archived(self, collection, key):
+        """Busca un documento archivado"""
+        await self.open()
+        async with self.db.execute(
+            f"SELECT data FROM {collection}_archive WHERE key = ? ORDER BY archived_at DESC LIMIT 1", (str(key),)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'path': self.path,
+            'writes': self.writes,
+            'avg_write_ms': round(self.write_time / self.writes * 1000, 3) if self.writes else 0.0
+        }
+
+    def _record_write(self, start):
+        self.writes += 1
+        self.write_time += time.perf_counter() - start
+
+    def _row(self, collection, key, document):
+        """Fila de la tabla para un documento, con los campos indexados extraídos"""
+        spec = COLLECTIONS[collection]
+        is_dict = isinstance(document, dict)
+        due = document.get(spec['due']) if is_dict and spec['due'] else None
+        done = 1 if is_dict and spec['done'] and document.get(spec['done'], False) else 0
+        owner = document.get(spec['owner']) if is_dict and spec['owner'] else None
+        return (str(key), json.dumps(document), due, done, str(owner) if owner is not None else None)
+
+    async def _migrate_json(self, collection):
+        """Importa el fichero JSON de la colección una sola vez"""
+        async with self.db.execute("SELECT 1 FROM migrations WHERE name = ?", (collection,)) as cursor:
+            if await cursor.fetchone():
+                return
+
+        path = COLLECTIONS[collection]['file']
+        data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except Exception as e:
+                # No se marca como migrada: se reintentará en el próximo arranque
+                print(f"Error migrating {path} to SQLite: {e}")
+                return
+
+        await self.db.executemany(
+            f"INSERT OR IGNORE INTO {collection} (key, data, due, done, owner) VALUES (?, ?, ?, ?, ?)",
+            [self._row(collection, key, document) for key, document in data.items()]
+        )
+        await self.db.execute("INSERT INTO migrations (name, migrated_at) VALUES (?, ?)", (collection, time.time()))
+        await self.db.commit()
+        if data:
+            print(f"Migrated {len(data)} {collection} from {path} to SQLite")
+
+def create_storage(config_store, backend=STORAGE_BACKEND):
+    """Crea el backend de almacenamiento configurado con STORAGE_BACKEND"""
+    if backend == "json":
+        return JsonStorage(config_store)
+    return SQLiteStorage()
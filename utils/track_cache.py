@@ -0,0 +1,177 @@
+import os
+import time
+import urllib.parse
+from utils.cache import TTLCache
+
+# Configuración de la caché de pistas de música
+TRACK_METADATA_CACHE_SIZE = int(os.getenv("TRACK_METADATA_CACHE_SIZE", "5000"))
+TRACK_METADATA_TTL = int(os.getenv("TRACK_METADATA_TTL", str(7 * 86400)))
+TRACK_STREAM_CACHE_SIZE = int(os.getenv("TRACK_STREAM_CACHE_SIZE", "1000"))
+TRACK_CACHE_PATH = os.getenv("TRACK_CACHE_PATH", "")  # Vacío = sin persistencia en disco
+
+# Correspondencias canción de Spotify -> vídeo de YouTube (siempre se guardan en disco)
+SPOTIFY_MATCH_PATH = os.getenv("SPOTIFY_MATCH_PATH", "config/spotify_matches.json")
+SPOTIFY_MATCH_CACHE_SIZE = int(os.getenv("SPOTIFY_MATCH_CACHE_SIZE", "20000"))
+
+# Las URLs de audio firmadas caducan; se descartan un poco antes para no empezar a reproducir
+# una URL que deje de funcionar a mitad de canción
+STREAM_URL_DEFAULT_TTL = 3600
+STREAM_URL_SAFETY_MARGIN = 300
+
+def video_id_from_url(url):
+    """ID de vídeo de una URL de YouTube (watch?v=, youtu.be/ o shorts/), o None"""
+    parsed = urllib.parse.urlparse(url)
+    if parsed.hostname and parsed.hostname.endswith("youtu.be"):
+        return parsed.path.lstrip("/")[:11] or None
+    video_id = urllib.parse.parse_qs(parsed.query).get("v")
+    if video_id:
+        return video_id[0]
+    if parsed.path.startswith("/shorts/"):
+        return parsed.path[len("/shorts/"):][:11] or None
+    return None
+
+def stream_url_ttl(stream_url):
+    """Segundos que se puede reutilizar una URL de audio, según su parámetro expire"""
+    expire = urllib.parse.parse_qs(urllib.parse.urlparse(stream_url).query).get("expire")
+    if not expire:
+        return STREAM_URL_DEFAULT_TTL
+    try:
+        return max(0, int(expire[0]) - time.time() - STREAM_URL_SAFETY_MARGIN)
+    except ValueError:
+        return STREAM_URL_DEFAULT_TTL
+
+def spotify_search_query(track):
+    """Texto de búsqueda en YouTube para una canción de Spotify"""
+    return f"{track['name']} {' '.join([artist['name'] for artist in track['artists']])}"
+
+def spotify_match_keys(track):
+    """Claves de una canción de Spotify en la caché de correspondencias: ISRC si lo tiene, y título + artistas"""
+    keys = []
+    isrc = (track.get('external_ids') or {}).get('isrc')
+    if isrc:
+        keys.append(f"isrc:{isrc.upper()}")
+    keys.append(f"title:{spotify_search_query(track).lower()}")
+    return keys
+
+class MatchCache:
+    """Caché persistente de qué vídeo de YouTube corresponde a cada canción de Spotify
+
+    Se consulta por ISRC (el mismo en cualquier playlist o álbum) y, si la canción no lo
+    tiene, por título y artistas. Con una correspondencia guardada no hace falta buscar en
+    YouTube, así que volver a cargar una playlist ya conocida es casi instantáneo.
+    """
+
+    def __init__(self, config_store, path=SPOTIFY_MATCH_PATH, maxsize=SPOTIFY_MATCH_CACHE_SIZE):
+        self.config_store = config_store
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.matches = config_store.load(path, {}) if config_store is not None else {}
+
+    def get(self, track):
+        """ID de vídeo guardado para una canción de Spotify, o None"""
+        for key in spotify_match_keys(track):
+            video_id = self.matches.get(key)
+            if video_id:
+                self.hits += 1
+                return video_id
+        self.misses += 1
+        return None
+
+    def set(self, track, video_id):
+        for key in spotify_match_keys(track):
+            # Se reinserta al final para que las más antiguas sean las primeras en descartarse
+            self.matches.pop(key, None)
+            self.matches[key] = video_id
+        while len(self.matches) > self.maxsize:
+            del self.matches[next(iter(self.matches))]
+        self._save()
+
+    def invalidate(self, track, video_id):
+        """Olvida la correspondencia de una canción si apunta a video_id (p. ej. un vídeo borrado)"""
+        removed = False
+        for key in spotify_match_keys(track):
+            if self.matches.get(key) == video_id:
+                del self.matches[key]
+                removed = True
+        if removed:
+            self.invalidations += 1
+            self._save()
+        return removed
+
+    def _save(self):
+        if self.config_store is not None:
+            self.config_store.save(self.path, self.matches)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.matches),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+class TrackCache:
+    """Caché en dos niveles para los resultados de yt-dlp, indexada por ID de vídeo
+
+    - Metadatos (título, duración, canal, miniatura): duran días y pueden guardarse en disco.
+    - URLs de audio firmadas: duran hasta el parámetro expire de la propia URL.
+
+    Con ambas entradas en caché, reproducir una pista no necesita llamar a yt-dlp.
+    """
+
+    def __init__(self, config_store=None, path=TRACK_CACHE_PATH):
+        self.metadata = TTLCache(TRACK_METADATA_CACHE_SIZE, TRACK_METADATA_TTL)
+        self.streams = TTLCache(TRACK_STREAM_CACHE_SIZE, STREAM_URL_DEFAULT_TTL)
+        self.config_store = config_store if path else None
+        self.path = path
+        self._snapshot = {}
+
+        if self.config_store is not None:
+            self._load()
+
+    def get_metadata(self, video_id):
+        entry = self.metadata.get(video_id)
+        return dict(entry['info']) if entry else None
+
+    def set_metadata(self, video_id, info):
+        entry = {'info': dict(info), 'cached_at': time.time()}
+        self.metadata.set(video_id, entry)
+        self._persist(video_id, entry)
+
+    def get_stream_url(self, video_id):
+        return self.streams.get(video_id)
+
+    def set_stream_url(self, video_id, stream_url):
+        ttl = stream_url_ttl(stream_url)
+        if ttl > 0:
+            self.streams.set(video_id, stream_url, ttl=ttl)
+
+    def invalidate_stream_url(self, video_id):
+        """Descarta una URL de audio que ha dejado de funcionar"""
+        self.streams.invalidate(video_id)
+
+    def stats(self):
+        return {'metadata': self.metadata.stats(), 'streams': self.streams.stats()}
+
+    def _persist(self, video_id, entry):
+        if self.config_store is None:
+            return
+        self._snapshot[video_id] = entry
+        # Las entradas descartadas por el LRU se eliminan del fichero de vez en cuando
+        if len(self._snapshot) > self.metadata.maxsize * 2:
+            self._snapshot = dict(self.metadata.items())
+        self.config_store.save(self.path, self._snapshot)
+
+    def _load(self):
+        data = self.config_store.load(self.path, {})
+        now = time.time()
+        for video_id, entry in data.items():
+            remaining = TRACK_METADATA_TTL - (now - entry.get('cached_at', 0))
+            if remaining > 0:
+                self.metadata.set(video_id, entry, ttl=remaining)
+                self._snapshot[video_id] = entry
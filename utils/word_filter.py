@@ -0,0 +1,109 @@
+import re
+import unicodedata
+
+# Caracteres invisibles que se usan para partir palabras sin que se note
+INVISIBLE_CHARS = dict.fromkeys(map(ord, "​‌‍⁠﻿­"))
+
+# Letras de otros alfabetos que se ven igual que las latinas, y sustituciones leetspeak
+CONFUSABLES = str.maketrans({
+    # Cirílico
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j", "ѕ": "s",
+    # Griego
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+    # Leetspeak
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "!": "i", "|": "i", "+": "t", "€": "e",
+})
+
+def normalize(text):
+    """Normaliza un texto para comparar palabras prohibidas
+
+    Pasa a minúsculas, elimina acentos y caracteres invisibles, convierte variantes
+    Unicode (ancho completo, letras matemáticas, etc.) y homógrafos a letras latinas,
+    y deshace las sustituciones leetspeak más comunes.
+    """
+    text = unicodedata.normalize("NFKD", text).translate(INVISIBLE_CHARS)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.casefold().translate(CONFUSABLES)
+
+def _trie_pattern(words):
+    """Construye una expresión regular con forma de trie para una lista de palabras
+
+    El motor de re recorre el trie en lugar de probar cada palabra por separado,
+    así que el coste por posición del texto no crece con el número de palabras.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return None
+
+        alternatives = []
+        single_chars = []
+        for char in sorted(key for key in node if key):
+            sub_pattern = build(node[char])
+            if sub_pattern is None:
+                single_chars.append(re.escape(char))
+            else:
+                alternatives.append(re.escape(char) + sub_pattern)
+
+        if single_chars:
+            alternatives.append(single_chars[0] if len(single_chars) == 1 else "[" + "".join(single_chars) + "]")
+
+        pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie) if trie else None
+
+class BannedWordMatcher:
+    """Detector compilado de palabras prohibidas para un servidor
+
+    Todas las palabras se combinan en una sola expresión regular que se compila una vez
+    y solo se reconstruye cuando cambia la lista. Las palabras pueden usar * como comodín
+    (cualquier secuencia de letras), y con whole_word solo se detectan palabras completas.
+    """
+
+    def __init__(self, words, whole_word=False):
+        self.words = list(words)
+        self.whole_word = whole_word
+
+        plain_words = set()
+        wildcard_patterns = []
+        for word in self.words:
+            word = normalize(word).strip()
+            if not word.strip("*"):
+                continue
+            if "*" in word:
+                wildcard_patterns.append(r"\w*".join(re.escape(part) for part in word.split("*")))
+            else:
+                plain_words.add(word)
+
+        patterns = wildcard_patterns
+        trie = _trie_pattern(plain_words)
+        if trie:
+            patterns = [trie] + wildcard_patterns
+
+        if not patterns:
+            self.pattern = None
+            return
+
+        combined = "|".join(patterns)
+        if whole_word:
+            combined = rf"(?<!\w)(?:{combined})(?!\w)"
+        self.pattern = re.compile(combined)
+
+    def search(self, text):
+        """Devuelve el fragmento (normalizado) que coincide con una palabra prohibida, o None"""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(normalize(text))
+        return match.group(0) if match else None
@@ -0,0 +1,138 @@
+import os
+import asyncio
+import time
+from utils.database import apply_xp_batch, insert_messages_batch, write_not_applied
+
+# Configuración del buffer de escritura diferida
+FLUSH_INTERVAL = float(os.getenv("WRITE_BUFFER_FLUSH_MS", "2000")) / 1000
+FLUSH_EVENTS = int(os.getenv("WRITE_BUFFER_FLUSH_EVENTS", "200"))
+MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING", "5000"))
+
+class WriteBehindBuffer:
+    """Buffer de escritura diferida para mensajes y XP
+
+    Acumula las filas de mensajes y el XP ganado por cada usuario en memoria y los
+    escribe en la base de datos en bloque cada FLUSH_INTERVAL segundos o cada
+    FLUSH_EVENTS eventos, lo que ocurra primero.
+
+    El XP y los mensajes se escriben en dos peticiones independientes y cada una se
+    reintenta por separado. Un lote solo se devuelve al buffer si es seguro que no llegó
+    a aplicarse; si el resultado es dudoso se descarta para no sumar el XP dos veces ni
+    duplicar filas de mensajes.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_events=FLUSH_EVENTS, max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+        self.max_pending = max_pending
+        self.messages = []
+        self.xp_deltas = {}
+        self.usernames = {}
+        self.events = 0
+        self.flushes = 0
+        self.xp_dropped = 0
+        self.messages_dropped = 0
+        self.last_flush_duration = 0.0
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """Inicia la tarea de vaciado periódico"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Detiene la tarea periódica y escribe todo lo pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def add_message(self, discord_id, username, content, xp_amount=1):
+        """Encola un mensaje y el XP que otorga"""
+        self.messages.append({
+            'user_id': discord_id,
+            'content': content[:500]  # Limit content length to 500 chars
+        })
+        self.xp_deltas[discord_id] = self.xp_deltas.get(discord_id, 0) + xp_amount
+        self.usernames[discord_id] = username
+        self.events += 1
+
+        if self.events >= self.max_pending:
+            # Back-pressure: si la base de datos no da abasto, el llamador espera al vaciado
+            await self.flush()
+        elif self.events >= self.flush_events:
+            self._wakeup.set()
+
+    async def _run(self):
+        """Vacía el buffer cada flush_interval segundos o al llenarse"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Escribe en bloque todos los eventos pendientes"""
+        async with self._flush_lock:
+            if not self.events and not self.xp_deltas:
+                return
+
+            messages, self.messages = self.messages, []
+            xp_deltas, self.xp_deltas = self.xp_deltas, {}
+            usernames, self.usernames = self.usernames, {}
+            self.events = 0
+
+            start = time.perf_counter()
+            failed = False
+            try:
+                await apply_xp_batch(xp_deltas, usernames)
+            except Exception as e:
+                failed = True
+                if write_not_applied(e):
+                    print(f"Error applying buffered XP ({len(xp_deltas)} users), will retry: {e}")
+                    self._requeue_xp(xp_deltas, usernames)
+                else:
+                    # The batch may already be applied: retrying could award the XP twice
+                    self.xp_dropped += sum(xp_deltas.values())
+                    print(f"Buffered XP ({len(xp_deltas)} users) may not have been applied, not retrying: {e}")
+
+            try:
+                await insert_messages_batch(messages)
+            except Exception as e:
+                failed = True
+                if write_not_applied(e):
+                    print(f"Error inserting buffered messages ({len(messages)}), will retry: {e}")
+                    self._requeue_messages(messages)
+                else:
+                    # The rows may already be inserted: retrying could duplicate them
+                    self.messages_dropped += len(messages)
+                    print(f"Buffered messages ({len(messages)}) may have been inserted, not retrying: {e}")
+
+            if not failed:
+                self.flushes += 1
+            self.last_flush_duration = time.perf_counter() - start
+
+    def _requeue_xp(self, xp_deltas, usernames):
+        """Devuelve al buffer un lote de XP que no se llegó a aplicar"""
+        for discord_id, xp in xp_deltas.items():
+            self.xp_deltas[discord_id] = self.xp_deltas.get(discord_id, 0) + xp
+        for discord_id, username in usernames.items():
+            self.usernames.setdefault(discord_id, username)
+
+    def _requeue_messages(self, messages):
+        """Devuelve al buffer los mensajes que no se pudieron insertar"""
+        # Si no caben, se descartan los más antiguos
+        room = max(self.max_pending - len(self.messages) - 1, 0)
+        dropped = max(len(messages) - room, 0)
+        if dropped:
+            print(f"Write buffer full, dropping {dropped} buffered messages")
+        self.messages[:0] = messages[dropped:]
+        self.events = len(self.messages)
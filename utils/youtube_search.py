@@ -0,0 +1,92 @@
+import os
+import re
+import time
+import urllib.parse
+import aiohttp
+
+# Configuración de la búsqueda en YouTube
+YOUTUBE_RESULTS_URL = 'https://www.youtube.com/results?'
+YOUTUBE_SEARCH_TIMEOUT = float(os.getenv("YOUTUBE_SEARCH_TIMEOUT", "8"))
+YOUTUBE_SEARCH_CHUNK_SIZE = 16384
+
+VIDEO_ID_PATTERN = re.compile(rb'/watch\?v=([A-Za-z0-9_-]{11})')
+# Una coincidencia puede quedar partida entre dos bloques: se conserva el final del bloque anterior
+_OVERLAP = len(b'/watch?v=') + 11
+
+class VideoIdScanner:
+    """Extrae IDs de vídeo únicos de una página de resultados que llega por bloques
+
+    Deja de aceptar datos en cuanto tiene limit IDs distintos, así que normalmente no hace
+    falta descargar ni analizar la página completa.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.ids = []
+        self._seen = set()
+        self._tail = b''
+
+    @property
+    def done(self):
+        return len(self.ids) >= self.limit
+
+    def feed(self, chunk):
+        """Procesa un bloque de la respuesta; devuelve True cuando ya no hacen falta más datos"""
+        data = self._tail + chunk
+        for match in VIDEO_ID_PATTERN.finditer(data):
+            video_id = match.group(1).decode()
+            if video_id not in self._seen:
+                self._seen.add(video_id)
+                self.ids.append(video_id)
+                if self.done:
+                    return True
+        self._tail = data[-_OVERLAP:]
+        return False
+
+class YouTubeSearch:
+    """Búsqueda asíncrona en YouTube con una sesión aiohttp compartida"""
+
+    def __init__(self, timeout=YOUTUBE_SEARCH_TIMEOUT):
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+        self.searches = 0
+        self.errors = 0
+        self.total_time = 0.0
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=self.timeout, headers={'Accept-Language': 'en-US,en;q=0.9'})
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def search(self, query, limit=5):
+        """Devuelve hasta limit IDs de vídeo (sin repetir) para una búsqueda"""
+        start = time.perf_counter()
+        scanner = VideoIdScanner(limit)
+        url = YOUTUBE_RESULTS_URL + urllib.parse.urlencode({'search_query': query})
+
+        try:
+            async with self.get_session().get(url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(YOUTUBE_SEARCH_CHUNK_SIZE):
+                    if scanner.feed(chunk):
+                        # Ya tenemos suficientes resultados: se cierra la conexión sin leer el resto
+                        break
+        except Exception as e:
+            self.errors += 1
+            print(f"Error searching YouTube: {e}")
+        finally:
+            self.searches += 1
+            self.total_time += time.perf_counter() - start
+
+        return scanner.ids
+
+    def stats(self):
+        return {
+            'searches': self.searches,
+            'errors': self.errors,
+            'avg_latency': self.total_time / self.searches if self.searches else 0.0
+        }